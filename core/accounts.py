@@ -0,0 +1,34 @@
+"""
+Account creation for the registration views.
+
+The password is hashed before the transaction opens. Hashing is slow on
+purpose (tens to hundreds of milliseconds, see PASSWORD_HASHER_PROFILE);
+doing it inside the transaction would keep it open, and with SQLite the
+database write lock held, for the whole hash while every other writer
+waits. The transaction itself only covers the two INSERTs.
+"""
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+
+def insert_account(username, email, password_hash, profile_model, **profile_fields):
+    """The write half of create_account: both rows in one short transaction."""
+    with transaction.atomic():
+        user = User(
+            username=User.normalize_username(username),
+            email=User.objects.normalize_email(email or ""),
+            password=password_hash,
+        )
+        user.save()
+        profile_model.objects.create(user=user, **profile_fields)
+    return user
+
+
+def create_account(username, email, password, profile_model, **profile_fields):
+    """
+    Create a User with `password` plus its `profile_model` row
+    (CustomerProfile / LawyerProfile). Returns the user.
+    """
+    password_hash = make_password(password)
+    return insert_account(username, email, password_hash, profile_model, **profile_fields)
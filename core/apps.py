@@ -3,3 +3,14 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Model-signal receivers (cache invalidation).
+        from . import signals  # noqa: F401
+
+        # Register background tasks for `manage.py run_tasks`.
+        from . import tasks  # noqa: F401
+
+        # SQLite pragmas on every new connection.
+        from guardianangel import database
+        database.install()
@@ -0,0 +1,197 @@
+"""
+Async versions of the read-only views, for the ASGI profile.
+
+guardianangel/asgi.py serves guardianangel/urls_async.py, which routes
+public_questions, lawyers_list, chat_messages (chat history) and the live
+chat endpoints (chat_stream, chat_poll) here and everything else to
+core.views. Under ASGI a sync view runs on a shared worker thread, so one
+slow request holds up the others; these read through the async ORM
+instead and only hop to a thread for the parts that are still
+synchronous: facet counts, and template rendering, whose context
+processors read the session and core.roles. The live chat endpoints wait
+on core.chat_hub, on the event loop, so an open stream costs no thread.
+
+Responses match their core.views counterparts exactly (same templates,
+JSON shapes, caching and conditional GET).
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from . import caching, facets, feeds, streaming
+from .chat_hub import hub, message_dict
+from .models import ChatRoom, LawyerProfile
+from .pagination import apaginate_request, page_json_response, wants_json
+from .views import (
+    LAWYER_KEYS,
+    MAX_MESSAGE_WINDOW,
+    QUESTION_KEYS,
+    _after_id,
+    _int_param,
+    _lawyer_json,
+    _question_json,
+)
+
+arender = sync_to_async(render)
+
+
+# PUBLIC QUESTIONS -----------------------------------------------------------
+
+@caching.async_list_condition(caching.QUESTIONS)
+@caching.cache_page_for_anonymous(caching.QUESTIONS)
+async def public_questions(request):
+    """core.views.public_questions, async."""
+    if streaming.wants_stream(request):
+        return await streaming.astream_list(
+            request, "public_questions.html", {}, feeds.answered_questions(),
+            "includes/question_card.html", "q", await caching.afragment_versions(request),
+        )
+    page = await apaginate_request(request, feeds.answered_questions(), QUESTION_KEYS)
+    if wants_json(request):
+        return page_json_response(page, _question_json)
+    return await arender(
+        request,
+        "public_questions.html",
+        {"questions": page.items, "page": page, **await caching.afragment_versions(request)},
+    )
+
+
+# LAWYERS LIST ---------------------------------------------------------------
+
+@caching.async_list_condition(caching.LAWYERS)
+@caching.cache_page_for_anonymous(caching.LAWYERS)
+async def lawyers_list(request):
+    """core.views.lawyers_list, async."""
+    filters = facets.parse_filters(request.GET)
+    lawyers = facets.filter_lawyers(
+        LawyerProfile.objects.filter(is_approved=True).select_related("user"),
+        filters,
+    )
+    facet_counts = await sync_to_async(facets.facet_counts)(filters, request)
+    if streaming.wants_stream(request):
+        return await streaming.astream_list(
+            request,
+            "lawyers_list.html",
+            {"facets": facet_counts, "filters": filters},
+            lawyers.order_by(*(("-" if desc else "") + key for key, desc in LAWYER_KEYS)),
+            "includes/lawyer_card.html",
+            "lawyer",
+            await caching.afragment_versions(request),
+        )
+    page = await apaginate_request(request, lawyers, LAWYER_KEYS)
+    if wants_json(request):
+        return page_json_response(page, _lawyer_json, facets=facet_counts)
+    return await arender(
+        request,
+        "lawyers_list.html",
+        {
+            "lawyers": page.items,
+            "page": page,
+            "facets": facet_counts,
+            "filters": filters,
+            **await caching.afragment_versions(request),
+        },
+    )
+
+
+# CHAT HISTORY ---------------------------------------------------------------
+
+async def _aget_room(request, chat_id):
+    user = await request.auser()
+    room = await (
+        ChatRoom.objects.select_related("customer__user", "lawyer__user")
+        .filter(Q(customer__user=user) | Q(lawyer__user=user), pk=chat_id)
+        .afirst()
+    )
+    if room is None:
+        raise Http404("No ChatRoom matches the given query.")
+    return room
+
+
+@login_required
+@require_GET
+async def chat_messages(request, chat_id):
+    """core.views.chat_messages, async."""
+    room = await _aget_room(request, chat_id)
+    limit = _int_param(request, "limit") or getattr(settings, "CHAT_WINDOW_SIZE", 50)
+    limit = max(1, min(limit, MAX_MESSAGE_WINDOW))
+
+    before = _int_param(request, "before")
+    after = _int_param(request, "after")
+    if before is not None:
+        rows, has_more = await room.messages.awindow_before(before, limit)
+    elif after is not None:
+        rows, has_more = await room.messages.awindow_after(after, limit)
+    else:
+        rows, has_more = await room.messages.alatest_window(limit)
+
+    if request.GET.get("format") == "html":
+        response = await arender(
+            request,
+            "includes/chat_messages.html",
+            {"chat_messages": rows},
+        )
+        response["X-Has-More"] = "1" if has_more else "0"
+        return response
+
+    return JsonResponse(
+        {"messages": [message_dict(m) for m in rows], "has_more": has_more}
+    )
+
+
+# LIVE CHAT ------------------------------------------------------------------
+
+async def _event_stream(room_id, after_id):
+    stream_seconds = getattr(settings, "CHAT_STREAM_SECONDS", 55)
+    keepalive = min(15, stream_seconds)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + stream_seconds
+
+    yield "retry: 2000\n\n"
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        messages = await hub.wait(room_id, after_id, timeout=min(keepalive, remaining))
+        if not messages:
+            yield ": keepalive\n\n"
+            continue
+        for m in messages:
+            after_id = m["id"]
+            yield f"id: {m['id']}\nevent: message\ndata: {json.dumps(m)}\n\n"
+
+
+@login_required
+@require_GET
+async def chat_stream(request, chat_id):
+    """
+    Server-Sent Events: streams only messages newer than ?after= (or the
+    browser's Last-Event-ID on reconnect). The body is an async generator,
+    so each event is sent as soon as it is yielded. Each response lives
+    for CHAT_STREAM_SECONDS; EventSource reconnects on its own.
+    """
+    room = await _aget_room(request, chat_id)
+    response = StreamingHttpResponse(
+        _event_stream(room.pk, _after_id(request)),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+@require_GET
+async def chat_poll(request, chat_id):
+    """Long-poll fallback for clients without EventSource."""
+    room = await _aget_room(request, chat_id)
+    timeout = getattr(settings, "CHAT_LONGPOLL_TIMEOUT", 25)
+    messages = await hub.wait(room.pk, _after_id(request), timeout=timeout)
+    return JsonResponse({"messages": messages})
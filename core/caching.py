@@ -0,0 +1,291 @@
+"""
+Page and fragment caching for the read-mostly public pages.
+
+Cached pages and fragments are grouped ("questions", "lawyers", ...). Each
+group has a generation number, a CacheGeneration row in the database, and
+every key includes it; core.signals bumps the generation whenever a model
+feeding that group is saved or deleted. Old entries are never looked up
+again and simply age out, so invalidation is one UPDATE no matter how many
+pages exist.
+
+The generations live in the database rather than the cache so that a bump
+reaches every worker, even with the default local-memory cache where each
+worker has its own entries. A request reads all groups' generations once
+(one primary-key-sized query) and keeps them on the request.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import partial, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+QUESTIONS = "questions"
+LAWYERS = "lawyers"
+MARKETING = "marketing"
+
+DEFAULT_PAGE_SECONDS = 300
+
+
+def _load_generations() -> dict:
+    from .models import CacheGeneration
+
+    rows = CacheGeneration.objects.values_list("group", "generation", "changed_at")
+    return {group: (gen, changed_at) for group, gen, changed_at in rows}
+
+
+def generations(request=None) -> dict:
+    """
+    {group: (generation, changed_at)}. With a request, loaded once and kept
+    on it, so a page looking up several groups costs one query.
+    """
+    if request is None:
+        return _load_generations()
+    memo = request.__dict__.get("_cache_generations")
+    if memo is None:
+        memo = request._cache_generations = _load_generations()
+    return memo
+
+
+async def agenerations(request) -> dict:
+    """generations(request) through the async ORM."""
+    from .models import CacheGeneration
+
+    memo = request.__dict__.get("_cache_generations")
+    if memo is None:
+        rows = CacheGeneration.objects.values_list("group", "generation", "changed_at")
+        memo = request._cache_generations = {
+            group: (gen, changed_at) async for group, gen, changed_at in rows
+        }
+    return memo
+
+
+def generation(group: str, request=None) -> int:
+    return generations(request).get(group, (1, None))[0]
+
+
+def _bump(groups):
+    from .models import CacheGeneration
+
+    now = datetime.now(timezone.utc)
+    updated = CacheGeneration.objects.filter(group__in=groups).update(
+        generation=F("generation") + 1, changed_at=now
+    )
+    if updated < len(groups):
+        # A group the migration didn't create: start it past the default.
+        CacheGeneration.objects.bulk_create(
+            [CacheGeneration(group=group, generation=2, changed_at=now) for group in groups],
+            ignore_conflicts=True,
+        )
+
+
+def bump_generation(*groups: str):
+    """
+    Move `groups` to a new generation once the current transaction commits
+    (at once outside a transaction), so no request can cache the old data
+    under the new generation.
+    """
+    transaction.on_commit(partial(_bump, groups))
+
+
+def _page_key(group: str, request) -> str:
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"page:{group}:{generation(group, request)}:{path}"
+
+
+def cache_page_for_anonymous(group: str, timeout: int | None = None):
+    """
+    Full-page cache for anonymous GETs, keyed by path + query string (so
+    each cursor page and the ?format=json variant are cached separately).
+    Logged-in users always get a fresh render.
+    """
+
+    def cached_response(cached):
+        response = HttpResponse(cached["content"], status=cached["status"])
+        for name, value in cached["headers"]:
+            response[name] = value
+        return response
+
+    def cacheable(response):
+        if response.status_code != 200 or response.streaming:
+            return None
+        if hasattr(response, "render") and callable(response.render):
+            response.render()
+        return {
+            "content": response.content,
+            "status": response.status_code,
+            "headers": [
+                (name, value)
+                for name, value in response.items()
+                if name.lower() != "set-cookie"
+            ],
+        }
+
+    def seconds():
+        return timeout or getattr(settings, "PAGE_CACHE_SECONDS", DEFAULT_PAGE_SECONDS)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                if request.method != "GET" or user.is_authenticated:
+                    return await view(request, *args, **kwargs)
+
+                await agenerations(request)
+                key = _page_key(group, request)
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return cached_response(cached)
+                response = await view(request, *args, **kwargs)
+                entry = cacheable(response)
+                if entry is not None:
+                    await cache.aset(key, entry, seconds())
+                return response
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET" or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            key = _page_key(group, request)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached_response(cached)
+
+            response = view(request, *args, **kwargs)
+            entry = cacheable(response)
+            if entry is not None:
+                cache.set(key, entry, seconds())
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def fragment_versions(request=None) -> dict:
+    """
+    Context for {% cache %} fragment keys in list templates, so a card's
+    cached HTML is dropped together with the page it belongs to.
+    """
+    return {
+        "questions_version": generation(QUESTIONS, request),
+        "lawyers_version": generation(LAWYERS, request),
+    }
+
+
+async def afragment_versions(request) -> dict:
+    await agenerations(request)
+    return fragment_versions(request)
+
+
+# CONDITIONAL GET -------------------------------------------------------------
+#
+# Validators for django.views.decorators.http.condition, derived only from
+# the database so every worker computes the same ones: row counts, newest
+# ids and timestamps from one aggregate query, plus the group's
+# CacheGeneration.changed_at (which moves on edits and deletes too). The
+# pair is cached under the group's generation, so it is recomputed only
+# after a change.
+
+def _group_stats(group: str):
+    from .models import LawyerProfile, PublicQuestion
+
+    if group == QUESTIONS:
+        return PublicQuestion.objects.aggregate(
+            count=Count("id"),
+            last_id=Max("id"),
+            newest=Max("created_at"),
+            answers=Count("answer_obj"),
+            last_answer_id=Max("answer_obj__id"),
+            newest_answer=Max("answer_obj__created_at"),
+        )
+    if group == LAWYERS:
+        return LawyerProfile.objects.aggregate(
+            count=Count("id"),
+            last_id=Max("id"),
+            newest=Max("created_at"),
+        )
+    return {}
+
+
+def group_validators(group: str, request=None):
+    gen, changed_at = generations(request).get(group, (1, None))
+    key = f"validators:{group}:{gen}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    stats = _group_stats(group)
+    stamps = [v for k, v in stats.items() if k.startswith("newest") and v]
+    if changed_at:
+        stamps.append(changed_at)
+
+    fingerprint = f"{group}:{changed_at and changed_at.isoformat()}:" + ":".join(
+        f"{k}={v}" for k, v in sorted(stats.items())
+    )
+    validators = (
+        hashlib.md5(fingerprint.encode()).hexdigest(),
+        max(stamps) if stamps else None,
+    )
+    cache.set(key, validators, getattr(settings, "PAGE_CACHE_SECONDS", DEFAULT_PAGE_SECONDS))
+    return validators
+
+
+def request_validators(request, group: str):
+    """group_validators(), looked up once per request and group."""
+    memo = request.__dict__.setdefault("_list_validators", {})
+    if group not in memo:
+        memo[group] = group_validators(group, request)
+    return memo[group]
+
+
+def _viewer_suffix(request) -> str:
+    # The nav bar shows the username, so logged-in users get their own tag.
+    return f"-u{request.user.pk}" if request.user.is_authenticated else ""
+
+
+def list_etag(group: str):
+    def etag(request, *args, **kwargs):
+        return request_validators(request, group)[0] + _viewer_suffix(request)
+    return etag
+
+
+def list_last_modified(group: str):
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        return request_validators(request, group)[1]
+    return last_modified
+
+
+def async_list_condition(group: str):
+    """
+    condition(list_etag, list_last_modified) for async views. Django calls
+    the validator functions synchronously, so the user and the group's
+    validators (which may need queries) are loaded off the event loop
+    first and the functions only read them back.
+    """
+    conditional = condition(etag_func=list_etag(group), last_modified_func=list_last_modified(group))
+
+    def decorator(view):
+        inner = conditional(view)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request.user = await request.auser()
+            await sync_to_async(request_validators)(request, group)
+            return await inner(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
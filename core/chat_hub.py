@@ -0,0 +1,194 @@
+"""
+Live chat fan-out on the event loop, for the ASGI profile
+(core.async_views.chat_stream and chat_poll).
+
+Clients waiting for new messages in a room (SSE streams and long-polls)
+await that room's RoomChannel; none of them holds a thread while it
+waits. One watcher task per process checks, every CHAT_POLL_INTERVAL (a
+fraction of a second), which of the rooms someone is waiting on have
+moved: a single query over ChatRoom.last_message_id for all of them.
+ChatRoom.post_message updates that column in the transaction that writes
+the message, so the check sees messages posted by any worker or process,
+with no broker. Only rooms that moved get the "id > latest" query, and
+every waiter in the room is handed the same rows. N clients in M rooms
+therefore cost one cheap query per interval, plus one per new batch of
+messages in a room, not N polls.
+"""
+import asyncio
+import contextvars
+import logging
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .models import ChatMessage, ChatRoom
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.25
+DEFAULT_BUFFER_SIZE = 200
+CATCH_UP_LIMIT = 200
+
+
+def message_dict(message) -> dict:
+    return {
+        "id": message.pk,
+        "sender": message.sender.username,
+        "sender_id": message.sender_id,
+        "message": message.message,
+        "created_at": message.created_at.isoformat(),
+    }
+
+
+def fetch_messages(room_id, after_id, limit=CATCH_UP_LIMIT):
+    rows, _ = ChatMessage.objects.filter(room_id=room_id).window_after(after_id, limit)
+    return [message_dict(m) for m in rows]
+
+
+async def afetch_messages(room_id, after_id, limit=CATCH_UP_LIMIT):
+    rows, _ = await ChatMessage.objects.filter(room_id=room_id).awindow_after(after_id, limit)
+    return [message_dict(m) for m in rows]
+
+
+class RoomChannel:
+    """
+    Shared state for one room.
+
+    `buffer` holds every message with floor < id <= latest, oldest first.
+    Waiters whose last seen id is below `floor` run their own catch-up
+    query; everyone else is served from the buffer. `updated` is set, and
+    replaced, whenever the buffer grows.
+    """
+
+    def __init__(self, room_id, buffer_size):
+        self.room_id = room_id
+        self.buffer_size = buffer_size
+        self.buffer = deque()
+        self.floor = None
+        self.latest = None
+        self.waiters = 0
+        self.updated = asyncio.Event()
+
+    def _since(self, after_id):
+        return [m for m in self.buffer if m["id"] > after_id]
+
+    def extend(self, messages):
+        for m in messages:
+            if m["id"] > self.latest:
+                self.buffer.append(m)
+                self.latest = m["id"]
+        while len(self.buffer) > self.buffer_size:
+            self.floor = self.buffer.popleft()["id"]
+        if messages:
+            self.updated.set()
+            self.updated = asyncio.Event()
+
+    async def wait(self, after_id, timeout):
+        """
+        Wait until there are messages newer than `after_id` or `timeout`
+        seconds pass. Returns a (possibly empty) list of message dicts.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        if self.latest is None:
+            # The baseline comes from the database, never from a client's
+            # ?after=, which one request could set past every future id.
+            last_id = await (
+                ChatRoom.objects.filter(pk=self.room_id)
+                .values_list("last_message_id", flat=True)
+                .afirst()
+            )
+            if self.latest is None:
+                self.floor = self.latest = last_id or 0
+        after_id = min(after_id, self.latest)
+
+        if after_id < self.floor:
+            messages = await afetch_messages(self.room_id, after_id)
+            if messages:
+                return messages
+            # Nothing left between after_id and the buffer (deleted rows).
+            after_id = self.floor
+
+        while True:
+            messages = self._since(after_id)
+            if messages:
+                return messages
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return []
+            try:
+                await asyncio.wait_for(self.updated.wait(), remaining)
+            except TimeoutError:
+                return []
+
+
+class ChatHub:
+    def __init__(self, poll_interval=None, buffer_size=None):
+        self._poll_interval = poll_interval
+        self._buffer_size = buffer_size
+        self._channels = {}
+        self._watcher = None
+
+    @property
+    def poll_interval(self):
+        if self._poll_interval is not None:
+            return self._poll_interval
+        return getattr(settings, "CHAT_POLL_INTERVAL", DEFAULT_POLL_INTERVAL)
+
+    @property
+    def buffer_size(self):
+        if self._buffer_size is not None:
+            return self._buffer_size
+        return getattr(settings, "CHAT_BUFFER_SIZE", DEFAULT_BUFFER_SIZE)
+
+    def _acquire(self, room_id):
+        channel = self._channels.get(room_id)
+        if channel is None:
+            channel = self._channels[room_id] = RoomChannel(room_id, self.buffer_size)
+        channel.waiters += 1
+        loop = asyncio.get_running_loop()
+        if self._watcher is None or self._watcher.done() or self._watcher.get_loop() is not loop:
+            # A fresh context: the watcher outlives the request that starts
+            # it, so its queries must not run on that request's thread.
+            self._watcher = loop.create_task(self._watch(), context=contextvars.Context())
+        return channel
+
+    def _release(self, channel):
+        channel.waiters -= 1
+        if channel.waiters == 0:
+            self._channels.pop(channel.room_id, None)
+
+    async def wait(self, room_id, after_id, timeout):
+        channel = self._acquire(room_id)
+        try:
+            return await channel.wait(after_id, timeout)
+        finally:
+            self._release(channel)
+
+    async def _watch(self):
+        """Poll the watched rooms until nobody is waiting any more."""
+        while self._channels:
+            try:
+                await self._poll()
+            except DatabaseError:
+                logger.exception("Polling chat rooms failed")
+                # Reconnect on the next round.
+                await sync_to_async(connection.close)()
+            await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self):
+        channels = [c for c in self._channels.values() if c.latest is not None]
+        if not channels:
+            return
+        rooms = ChatRoom.objects.filter(pk__in=[c.room_id for c in channels]).values_list(
+            "pk", "last_message_id"
+        )
+        last_ids = {pk: last_id async for pk, last_id in rooms}
+        for channel in channels:
+            if last_ids.get(channel.room_id, 0) > channel.latest:
+                channel.extend(await afetch_messages(channel.room_id, channel.latest))
+
+
+hub = ChatHub()
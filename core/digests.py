@@ -0,0 +1,236 @@
+"""
+Digest emails telling approved lawyers about new public questions in
+their speciality.
+
+Questions are not matched one at a time against every lawyer. Each pass
+(send_digests(), run by the send_question_digests task at most once per
+DIGEST_INTERVAL_SECONDS) does the following:
+
+  1. Read the questions posted since the last pass: one range scan on the
+     primary key, from the QuestionDigestRun cursor.
+  2. Match them to specialities through a keyword index. This is a dict
+     from keyword to speciality keys, built from the speciality labels of
+     approved lawyers (the facet cell table, read fresh) plus
+     DIGEST_SPECIALITY_KEYWORDS. Each question costs one dict lookup per
+     distinct word, however many lawyers there are.
+  3. Render one digest body per speciality. Every lawyer in a speciality
+     gets the same list.
+  4. Stream the matching lawyers' addresses in one indexed query and send
+     one email each through core.mailer's connection pool, recording every
+     address that was mailed (QuestionDigestDelivery).
+
+A pass that fails partway leaves its run unfinished. The next pass (the
+task's retry, or the next scheduled one) resumes it and mails only the
+addresses not recorded yet, so nobody gets the same digest twice.
+
+A pass holds its run under a lease (locked_until, DIGEST_LEASE_SECONDS)
+and renews it each time a batch of deliveries is recorded, so a long
+send is not taken for a dead one. If the lease was lost anyway (another
+pass re-claimed the run), the pass stops queuing mail for it.
+
+The cost is O(questions + lawyers) work and a handful of queries, instead
+of O(questions x lawyers) emails.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import facets, mailer, search
+from .models import LawyerProfile, PublicQuestion, QuestionDigestDelivery, QuestionDigestRun
+
+# Words in speciality labels that say nothing about the subject ("will"
+# from "Wills and estates" is in most questions).
+GENERIC_WORDS = frozenset({"and", "for", "in", "law", "lawyer", "legal", "of", "the", "will"})
+
+
+def _stem(word: str) -> str:
+    """Plural-insensitive form of a word: "estates" and "estate" match."""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def keyword_index(labels) -> dict:
+    """{keyword: {speciality_key, ...}} for the given {speciality_key: label}."""
+    extra = getattr(settings, "DIGEST_SPECIALITY_KEYWORDS", {})
+    index = defaultdict(set)
+    for key, label in labels.items():
+        words = set(search.tokenize(label)) | set(search.tokenize(" ".join(extra.get(key, ()))))
+        for word in {_stem(word) for word in words} - GENERIC_WORDS:
+            index[word].add(key)
+    return index
+
+
+def match(questions, index) -> dict:
+    """{speciality_key: [question, ...]}. Each question appears at most once per speciality."""
+    matched = defaultdict(list)
+    for question in questions:
+        keys = set()
+        for word in set(search.tokenize(question.question_text)):
+            keys.update(index.get(_stem(word), ()))
+        for key in keys:
+            matched[key].append(question)
+    return matched
+
+
+def _digest(label, questions):
+    limit = getattr(settings, "DIGEST_QUESTIONS_PER_EMAIL", 20)
+    count = len(questions)
+    subject = f"{count} new question{'s' if count != 1 else ''} in {label}"
+    body = render_to_string(
+        "emails/question_digest.txt",
+        {
+            "speciality": label,
+            "questions": questions[:limit],
+            "more": max(0, count - limit),
+            "site_url": getattr(settings, "SITE_URL", "").rstrip("/"),
+        },
+    )
+    return subject, body
+
+
+def build_messages(matched, labels, run=None):
+    """
+    One EmailMessage per approved lawyer whose speciality has matches,
+    generated lazily from a single query. With a run, addresses it has
+    already mailed are left out.
+    """
+    digests = {key: _digest(labels.get(key, key), questions) for key, questions in matched.items()}
+    lawyers = (
+        LawyerProfile.objects.filter(is_approved=True, speciality_key__in=list(digests))
+        .exclude(user__email="")
+        .values_list("speciality_key", "user__email")
+        .order_by()
+    )
+    if run is not None:
+        lawyers = lawyers.exclude(user__email__in=run.deliveries.values("email"))
+    for key, email in lawyers.iterator(chunk_size=2000):
+        subject, body = digests[key]
+        yield EmailMessage(subject, body, to=[email])
+
+
+class LeaseLost(Exception):
+    """Another pass claimed the run this one was sending."""
+
+
+def _lease():
+    seconds = getattr(settings, "DIGEST_LEASE_SECONDS", 600)
+    return timezone.now() + timedelta(seconds=seconds)
+
+
+def _claim_unfinished():
+    """An unfinished run nobody is sending, claimed for this pass, or None."""
+    stale = QuestionDigestRun.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=timezone.now()),
+        completed_at__isnull=True,
+    )
+    for run in stale.order_by("pk")[:5]:
+        # Only one pass wins the update; the others move on.
+        lease = _lease()
+        if stale.filter(pk=run.pk).update(locked_until=lease):
+            run.locked_until = lease
+            return run
+    return None
+
+
+def _claim_new():
+    """A run over the questions posted since the last one, or None."""
+    after = QuestionDigestRun.objects.aggregate(last=Max("last_question_id"))["last"] or 0
+    last = (
+        PublicQuestion.objects.filter(pk__gt=after)
+        .order_by("pk")
+        .values_list("pk", flat=True)[: getattr(settings, "DIGEST_MAX_QUESTIONS_PER_RUN", 5000)]
+    )
+    last = max(last, default=None)
+    if last is None:
+        return None
+    try:
+        with transaction.atomic():
+            return QuestionDigestRun.objects.create(
+                after_question_id=after, last_question_id=last, locked_until=_lease()
+            )
+    except IntegrityError:
+        return None
+
+
+def _held(run):
+    """The run, as long as this pass still holds its lease."""
+    return QuestionDigestRun.objects.filter(
+        pk=run.pk, locked_until=run.locked_until, completed_at__isnull=True
+    )
+
+
+def _send(run, backend=None):
+    """
+    Mail the run's digests and mark it completed. Returns the run, or None
+    if another pass claimed it meanwhile.
+    """
+    rows = list(
+        PublicQuestion.objects.filter(
+            pk__gt=run.after_question_id, pk__lte=run.last_question_id, is_answered=False
+        )
+        .order_by("pk")
+        .only("id", "question_text", "created_at")
+    )
+
+    lost = False
+
+    def record(messages):
+        nonlocal lost
+        # Recorded even once the lease is lost: these went out.
+        QuestionDigestDelivery.objects.bulk_create(
+            [QuestionDigestDelivery(run=run, email=m.to[0]) for m in messages],
+            ignore_conflicts=True,
+        )
+        if lost:
+            return
+        lease = _lease()
+        if not _held(run).update(locked_until=lease):
+            lost = True
+            raise LeaseLost(run.pk)
+        run.locked_until = lease
+
+    try:
+        labels = facets.specialities()
+        matched = match(rows, keyword_index(labels))
+        mailer.send_pooled(build_messages(matched, labels, run), backend=backend, on_sent=record)
+    except LeaseLost:
+        return None
+    except Exception:
+        # Hand the run straight to the retry, which skips the deliveries.
+        _held(run).update(locked_until=None)
+        raise
+    run.questions = len({q.pk for questions in matched.values() for q in questions})
+    run.emails = run.deliveries.count()
+    run.completed_at = timezone.now()
+    if not _held(run).update(
+        questions=run.questions,
+        emails=run.emails,
+        locked_until=None,
+        completed_at=run.completed_at,
+    ):
+        return None
+    run.locked_until = None
+    return run
+
+
+def send_digests(backend=None):
+    """
+    Send one digest pass: first finish any run a failed pass left
+    unfinished, then cover the questions posted since the last run.
+    Returns the last run sent, or None if there was nothing to do (no new
+    questions, or another pass already claimed them).
+    """
+    run = None
+    while (unfinished := _claim_unfinished()) is not None:
+        run = _send(unfinished, backend) or run
+    new = _claim_new()
+    if new is not None:
+        run = _send(new, backend) or run
+    return run
@@ -0,0 +1,223 @@
+"""
+Faceted filtering for the Lawyers List.
+
+Filters are plain equality on LawyerProfile's derived bucket columns
+(speciality_key / experience_bucket / fee_bucket), each covered by a
+partial index on approved lawyers. Facet counts come from LawyerFacetCell,
+one row per bucket combination, which core.signals keeps current; the
+whole cell table is small and cached under the "lawyers" cache
+generation, so counting usually costs no query at all. The generation is
+read from the database, so a change made in one worker reaches all of
+them; the entry also expires after PAGE_CACHE_SECONDS, which bounds how
+long a change that bypassed the signals (QuerySet.update()) can go unseen.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max
+
+from . import caching
+from .models import (
+    EXPERIENCE_BUCKETS,
+    FEE_BUCKETS,
+    FEE_UNLISTED,
+    LawyerFacetCell,
+    LawyerProfile,
+    experience_bucket,
+    fee_bucket,
+    speciality_key,
+)
+
+SPECIALITY = "speciality"
+EXPERIENCE = "experience"
+FEE = "fee"
+
+FIELDS = {
+    SPECIALITY: "speciality_key",
+    EXPERIENCE: "experience_bucket",
+    FEE: "fee_bucket",
+}
+
+EXPERIENCE_LABELS = {key: label for key, label, _, _ in EXPERIENCE_BUCKETS}
+FEE_LABELS = {key: label for key, label, _, _ in FEE_BUCKETS}
+FEE_LABELS[FEE_UNLISTED] = "Fee not listed"
+
+
+def parse_filters(params) -> dict:
+    """
+    Valid facet filters from a QueryDict; unknown bucket keys are ignored.
+    """
+    filters = {}
+    spec = speciality_key(params.get(SPECIALITY, ""))
+    if spec:
+        filters[SPECIALITY] = spec
+    if params.get(EXPERIENCE) in EXPERIENCE_LABELS:
+        filters[EXPERIENCE] = params[EXPERIENCE]
+    if params.get(FEE) in FEE_LABELS:
+        filters[FEE] = params[FEE]
+    return filters
+
+
+def filter_lawyers(queryset, filters):
+    return queryset.filter(**{FIELDS[facet]: value for facet, value in filters.items()})
+
+
+def _cells(request=None):
+    key = f"facetcells:{caching.generation(caching.LAWYERS, request)}"
+    cells = cache.get(key)
+    if cells is None:
+        cells = list(
+            LawyerFacetCell.objects.filter(count__gt=0).values_list(
+                "speciality_key",
+                "speciality_label",
+                "experience_bucket",
+                "fee_bucket",
+                "count",
+            )
+        )
+        timeout = getattr(settings, "PAGE_CACHE_SECONDS", caching.DEFAULT_PAGE_SECONDS)
+        cache.set(key, cells, timeout)
+    return cells
+
+
+def facet_counts(filters, request=None) -> dict:
+    """
+    For each facet, the values available under the *other* active filters,
+    with counts: {"speciality": [{"value", "label", "count", "selected"}], ...}
+    Pass the request to reuse the cache generations it has already read.
+    """
+    position = {SPECIALITY: 0, EXPERIENCE: 2, FEE: 3}
+    totals = {facet: {} for facet in FIELDS}
+    labels = {}
+
+    for cell in _cells(request):
+        spec, spec_label, exp, fee, count = cell
+        labels[spec] = spec_label or spec.title()
+        for facet in FIELDS:
+            if any(
+                cell[position[other]] != value
+                for other, value in filters.items()
+                if other != facet
+            ):
+                continue
+            value = cell[position[facet]]
+            totals[facet][value] = totals[facet].get(value, 0) + count
+
+    def entries(facet, order, label_for):
+        return [
+            {
+                "value": value,
+                "label": label_for(value),
+                "count": totals[facet][value],
+                "selected": filters.get(facet) == value,
+            }
+            for value in order
+            if totals[facet].get(value)
+        ]
+
+    return {
+        SPECIALITY: entries(
+            SPECIALITY,
+            sorted(v for v in totals[SPECIALITY] if v),
+            lambda v: labels.get(v, v.title()),
+        ),
+        EXPERIENCE: entries(EXPERIENCE, list(EXPERIENCE_LABELS), EXPERIENCE_LABELS.get),
+        FEE: entries(FEE, list(FEE_LABELS), FEE_LABELS.get),
+    }
+
+
+def specialities() -> dict:
+    """
+    {speciality_key: label} for every speciality with an approved lawyer.
+    Read from the cell table, not the cached cells: digests run outside
+    any request and must route questions by the current specialities.
+    """
+    rows = (
+        LawyerFacetCell.objects.filter(count__gt=0)
+        .exclude(speciality_key="")
+        .values_list("speciality_key", "speciality_label")
+        .order_by("speciality_key")
+    )
+    labels = {}
+    for spec, spec_label in rows:
+        labels.setdefault(spec, spec_label or spec.title())
+    return labels
+
+
+# MAINTENANCE -----------------------------------------------------------------
+
+def adjust_cell(cell, delta, label=""):
+    """
+    Add `delta` to one bucket combination's count (creating the row on
+    first use). `cell` is LawyerProfile.facet_cell; None means "not counted".
+    """
+    if cell is None or not delta:
+        return
+    spec, exp, fee = cell
+    match = LawyerFacetCell.objects.filter(
+        speciality_key=spec, experience_bucket=exp, fee_bucket=fee
+    )
+    changes = {"count": F("count") + delta}
+    if label and delta > 0:
+        changes["speciality_label"] = label
+
+    if match.update(**changes) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            LawyerFacetCell.objects.create(
+                speciality_key=spec,
+                speciality_label=label,
+                experience_bucket=exp,
+                fee_bucket=fee,
+                count=delta,
+            )
+    except IntegrityError:
+        # Someone else created it first.
+        match.update(**changes)
+
+
+def rebuild():
+    """
+    Recompute every lawyer's derived bucket columns and the cell table from
+    scratch, set-based. Returns the number of cells written.
+    """
+    lawyers = LawyerProfile.objects.only(
+        "id", "speciality", "years_of_practice", "fee_per_chat"
+    )
+    batch = []
+    for lawyer in lawyers.iterator(chunk_size=2000):
+        lawyer.speciality_key = speciality_key(lawyer.speciality)
+        lawyer.experience_bucket = experience_bucket(lawyer.years_of_practice)
+        lawyer.fee_bucket = fee_bucket(lawyer.fee_per_chat)
+        batch.append(lawyer)
+        if len(batch) >= 2000:
+            LawyerProfile.objects.bulk_update(
+                batch, ["speciality_key", "experience_bucket", "fee_bucket"]
+            )
+            batch = []
+    if batch:
+        LawyerProfile.objects.bulk_update(
+            batch, ["speciality_key", "experience_bucket", "fee_bucket"]
+        )
+
+    groups = (
+        LawyerProfile.objects.filter(is_approved=True)
+        .values("speciality_key", "experience_bucket", "fee_bucket")
+        .annotate(n=Count("id"), label=Max("speciality"))
+        .order_by()
+    )
+    with transaction.atomic():
+        LawyerFacetCell.objects.all().delete()
+        LawyerFacetCell.objects.bulk_create(
+            LawyerFacetCell(
+                speciality_key=g["speciality_key"],
+                speciality_label=(g["label"] or "").strip(),
+                experience_bucket=g["experience_bucket"],
+                fee_bucket=g["fee_bucket"],
+                count=g["n"],
+            )
+            for g in groups
+        )
+    caching.bump_generation(caching.LAWYERS)
+    return LawyerFacetCell.objects.count()
@@ -0,0 +1,27 @@
+"""
+Question feeds shared by the list views.
+
+Views should build their question lists through these helpers instead of
+hand-rolling querysets, so every page gets the same fixed number of queries
+no matter how many rows it shows.
+"""
+from .models import PublicQuestion
+
+
+def answered_questions():
+    """
+    Answered public questions, newest first, with answer + lawyer preloaded.
+    """
+    return PublicQuestion.objects.answered().with_answers().newest_first()
+
+
+def customer_questions(customer):
+    """
+    All questions asked by one customer, newest first.
+    Unanswered questions simply come back with no answer attached.
+    """
+    return (
+        PublicQuestion.objects.filter(customer=customer)
+        .with_answers()
+        .newest_first()
+    )
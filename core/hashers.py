@@ -0,0 +1,48 @@
+"""
+Password hashers with their cost parameters taken from settings.
+
+They keep the stock algorithm names ("argon2", "scrypt"), so hashes they
+produce are ordinary Django hashes, and changing a parameter makes Django
+re-hash a user's password transparently at their next login.
+settings.PASSWORD_HASHER_PROFILE picks which one hashes new passwords.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id; needs the argon2-cffi package."""
+
+    @property
+    def time_cost(self):
+        return getattr(settings, "PASSWORD_ARGON2_TIME_COST", 2)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, "PASSWORD_ARGON2_MEMORY_COST", 19 * 1024)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "PASSWORD_ARGON2_PARALLELISM", 1)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt from hashlib (OpenSSL); no extra dependency."""
+
+    @property
+    def work_factor(self):
+        return getattr(settings, "PASSWORD_SCRYPT_WORK_FACTOR", 2**16)
+
+    @property
+    def block_size(self):
+        return getattr(settings, "PASSWORD_SCRYPT_BLOCK_SIZE", 8)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "PASSWORD_SCRYPT_PARALLELISM", 2)
+
+    @property
+    def maxmem(self):
+        # OpenSSL refuses anything above 32 MiB by default; scrypt needs
+        # 128 * N * r bytes.
+        return 2 * 128 * self.work_factor * self.block_size
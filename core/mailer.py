@@ -0,0 +1,91 @@
+"""
+Bulk email through a small pool of reused connections.
+
+send_pooled() takes any iterable of EmailMessages, such as a generator
+over a large queryset, and splits it into chunks. Each of EMAIL_POOL_SIZE
+threads opens one backend connection and keeps it for every chunk it
+sends, so 10k messages cost a handful of SMTP logins instead of 10k. A
+bounded queue between the producer and the senders keeps only a few
+chunks in memory at a time.
+
+Senders hand messages to the backend one at a time, so after an error the
+caller still knows exactly which ones went out (on_sent) and can retry
+only the rest.
+
+Which backend depends on EMAIL_BACKEND: SMTP in production, the file
+backend (EMAIL_FILE_PATH) for local testing, where every pooled
+connection writes one file.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from queue import Queue
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def send_pooled(messages, backend=None, pool_size=None, chunk_size=None, on_sent=None) -> int:
+    """
+    Send every message in `messages`. Returns how many the backend
+    accepted. If a connection fails, the other threads finish their chunks
+    and then the first error is raised, so some messages may already have
+    gone out. `on_sent`, if given, is called in the calling thread with
+    each list of messages the backend accepted, those sent before an error
+    included.
+    """
+    pool_size = pool_size or getattr(settings, "EMAIL_POOL_SIZE", 4)
+    chunk_size = chunk_size or getattr(settings, "EMAIL_POOL_CHUNK_SIZE", 100)
+    chunks = Queue(maxsize=pool_size * 2)
+    accepted = Queue()
+
+    def sender():
+        sent, error, drained = 0, None, False
+        try:
+            with get_connection(backend) as connection:
+                while (chunk := chunks.get()) is not None:
+                    done = []
+                    try:
+                        for message in chunk:
+                            if connection.send_messages([message]):
+                                done.append(message)
+                    finally:
+                        sent += len(done)
+                        accepted.put(done)
+                drained = True
+        except Exception as exc:
+            error = exc
+            # Keep draining so the producer never blocks on a full queue.
+            while not drained and chunks.get() is not None:
+                pass
+        return sent, error
+
+    def report():
+        while not accepted.empty():
+            done = accepted.get()
+            if done and on_sent is not None:
+                on_sent(done)
+
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as pool:
+            senders = [pool.submit(sender) for _ in range(pool_size)]
+            try:
+                for chunk in _chunks(messages, chunk_size):
+                    chunks.put(chunk)
+                    report()
+            finally:
+                for _ in senders:
+                    chunks.put(None)
+            results = [future.result() for future in senders]
+    finally:
+        report()
+
+    errors = [error for _, error in results if error is not None]
+    if errors:
+        raise errors[0]
+    return sum(sent for sent, _ in results)
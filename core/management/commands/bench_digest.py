@@ -0,0 +1,164 @@
+"""
+Lawyer digest throughput: one email per question per matching lawyer vs.
+core.digests.
+
+    python manage.py bench_digest --lawyers 10000 --questions 500
+    python manage.py bench_digest --backend smtp     # against the configured server
+
+Seeds lawyers and unanswered questions inside a transaction, then rolls
+them back. Both strategies use the same keyword matching, so the
+difference is only in how the work is batched:
+
+    per-question  for each question, query its lawyers and send each one
+                  an email on a fresh connection (what a post_save handler
+                  calling send_mail would do). Only --sample questions are
+                  run; the totals are extrapolated from them.
+    digest        one send_digests() pass: a single lawyer query, one body
+                  per speciality, sent through the mailer's connection pool,
+                  plus one insert per chunk recording who was mailed.
+
+--backend file (default) writes the messages to a temporary directory, so
+the timings include building and serialising every message. Use locmem or
+dummy to leave out I/O, or smtp to include the mail server.
+"""
+import random
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from core import digests, facets
+from core.models import LawyerProfile, PublicQuestion, QuestionDigestRun
+
+SPECIALITIES = [
+    "Family law", "Immigration", "Employment", "Real estate", "Criminal defence",
+    "Wills and estates", "Tax", "Corporate", "Intellectual property", "Personal injury",
+]
+WORDS = (
+    "lease deposit landlord tenant eviction divorce custody support contract employer "
+    "dismissal severance visa permit estate probate insurance accident mortgage police "
+    "trademark company audit the a my is was has can should about after before with"
+).split()
+BACKENDS = {
+    "file": "django.core.mail.backends.filebased.EmailBackend",
+    "locmem": "django.core.mail.backends.locmem.EmailBackend",
+    "dummy": "django.core.mail.backends.dummy.EmailBackend",
+    "smtp": "django.core.mail.backends.smtp.EmailBackend",
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark lawyer notifications: per-question emails vs. digests (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lawyers", type=int, default=10_000)
+        parser.add_argument("--questions", type=int, default=500)
+        parser.add_argument("--sample", type=int, default=10, help="Per-question runs to time.")
+        parser.add_argument("--backend", choices=sorted(BACKENDS), default="file")
+        parser.add_argument("--pool-size", type=int, default=4)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as mail_dir, override_settings(
+            EMAIL_BACKEND=BACKENDS[options["backend"]],
+            EMAIL_FILE_PATH=mail_dir,
+            EMAIL_POOL_SIZE=options["pool_size"],
+        ):
+            try:
+                with transaction.atomic():
+                    self._run(options)
+                    raise Rollback
+            except Rollback:
+                pass
+        cache.clear()
+
+    def _seed(self, n_lawyers, n_questions):
+        rng = random.Random(1)
+        users = User.objects.bulk_create(
+            User(username=f"bench-digest-{i}", email=f"lawyer{i}@example.com")
+            for i in range(n_lawyers)
+        )
+        LawyerProfile.objects.bulk_create(
+            (
+                LawyerProfile(user=user, speciality=rng.choice(SPECIALITIES), is_approved=True)
+                for user in users
+            ),
+            batch_size=2000,
+        )
+        facets.rebuild()
+
+        # Start the digest cursor after any existing questions.
+        start = PublicQuestion.objects.aggregate(last=Max("pk"))["last"] or 0
+        after = QuestionDigestRun.objects.aggregate(last=Max("last_question_id"))["last"] or 0
+        if after < start:
+            QuestionDigestRun.objects.create(
+                after_question_id=after, last_question_id=start, completed_at=timezone.now()
+            )
+        PublicQuestion.objects.bulk_create(
+            PublicQuestion(question_text=" ".join(rng.choices(WORDS, k=25)))
+            for _ in range(n_questions)
+        )
+        return list(PublicQuestion.objects.filter(pk__gt=start).order_by("pk"))
+
+    def _run(self, options):
+        self.stdout.write(
+            f"Seeding {options['lawyers']} lawyers and {options['questions']} questions..."
+        )
+        questions = self._seed(options["lawyers"], options["questions"])
+        labels = facets.specialities()
+        index = digests.keyword_index(labels)
+
+        self.stdout.write(
+            f"{'strategy':14s} {'emails':>9s} {'queries':>8s} {'seconds':>9s} {'emails/s':>9s}"
+        )
+
+        sample = questions[: options["sample"]]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            emails = self._per_question(sample, index, labels)
+            elapsed = time.perf_counter() - started
+        scale = len(questions) / max(len(sample), 1)
+        self._row("per-question", emails * scale, len(queries) * scale, elapsed * scale)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            run = digests.send_digests()
+            elapsed = time.perf_counter() - started
+        self._row("digest", run.emails, len(queries), elapsed)
+        self.stdout.write(
+            f"({run.questions} of {len(questions)} questions matched a speciality;"
+            f" per-question row extrapolated from {len(sample)})"
+        )
+
+    def _per_question(self, questions, index, labels):
+        sent = 0
+        for question in questions:
+            keys = digests.match([question], index)
+            emails = (
+                LawyerProfile.objects.filter(is_approved=True, speciality_key__in=list(keys))
+                .exclude(user__email="")
+                .values_list("speciality_key", "user__email")
+            )
+            for key, email in emails:
+                body = render_to_string(
+                    "emails/question_digest.txt",
+                    {"speciality": labels[key], "questions": [question], "more": 0},
+                )
+                sent += EmailMessage("New question", body, to=[email]).send()
+        return sent
+
+    def _row(self, name, emails, queries, seconds):
+        self.stdout.write(
+            f"{name:14s} {emails:9.0f} {queries:8.0f} {seconds:9.2f} {emails / seconds:9.0f}"
+        )
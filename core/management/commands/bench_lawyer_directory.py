@@ -0,0 +1,102 @@
+"""
+Lawyers List filter + facet benchmark.
+
+    python manage.py bench_lawyer_directory --lawyers 50000
+
+Seeds N lawyers inside a transaction, rebuilds the facet cells, times the
+directory's filtered first-page query and facet counting for a few filter
+combinations, then rolls everything back.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import facets
+from core.models import LawyerProfile
+from core.pagination import paginate
+from core.views import LAWYER_KEYS
+
+SPECIALITIES = [
+    "Family law", "Immigration", "Employment", "Real estate", "Criminal defence",
+    "Wills and estates", "Tax", "Corporate", "Intellectual property", "Personal injury",
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark the faceted Lawyers List at N lawyers (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lawyers", type=int, default=50_000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["lawyers"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+        cache.clear()
+
+    def _run(self, n, repeat):
+        rng = random.Random(1)
+        self.stdout.write(f"Seeding {n} lawyers...")
+        users = User.objects.bulk_create(
+            User(
+                username=f"bench-lawyer-{i}",
+                first_name=f"F{rng.randrange(1000)}",
+                last_name=f"L{rng.randrange(5000):04d}",
+            )
+            for i in range(n)
+        )
+        lawyers = []
+        for user in users:
+            fee = rng.choice([None, Decimal(rng.randrange(20, 400))])
+            lawyer = LawyerProfile(
+                user=user,
+                speciality=rng.choice(SPECIALITIES),
+                years_of_practice=rng.randrange(0, 40),
+                fee_per_chat=fee,
+                is_approved=rng.random() < 0.9,
+            )
+            lawyers.append(lawyer)
+        LawyerProfile.objects.bulk_create(lawyers, batch_size=2000)
+        facets.rebuild()
+
+        cases = [
+            {},
+            {"speciality": "family law"},
+            {"speciality": "tax", "experience": "6-10"},
+            {"experience": "21+", "fee": "100-200"},
+            {"speciality": "immigration", "experience": "0-2", "fee": "unlisted"},
+        ]
+        base = LawyerProfile.objects.filter(is_approved=True).select_related("user")
+
+        self.stdout.write(f"\n{'filters':55s} {'page ms':>8s} {'facets ms':>10s}")
+        for filters in cases:
+            page_ms, facet_ms = [], []
+            for i in range(repeat):
+                started = time.perf_counter()
+                paginate(facets.filter_lawyers(base, filters), LAWYER_KEYS, per_page=20)
+                page_ms.append((time.perf_counter() - started) * 1000)
+
+                if i == 0:
+                    cache.clear()  # first facet call pays for loading the cells
+                started = time.perf_counter()
+                facets.facet_counts(filters)
+                facet_ms.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(
+                f"{str(filters):55s} {statistics.median(page_ms):8.2f}"
+                f" {statistics.median(facet_ms):10.2f}"
+            )
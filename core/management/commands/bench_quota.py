@@ -0,0 +1,103 @@
+"""
+Concurrency check for the free-question quota (core/quota.py).
+
+    python manage.py bench_quota --threads 16 --attempts 50 --allowance 100
+
+Creates a throwaway customer with --allowance free questions, then has
+--threads threads (standing in for concurrent requests from several tabs
+or workers) each try to spend one --attempts times, all released at once.
+Two strategies:
+
+    naive    read the profile, check, decrement in Python, save()
+    atomic   quota.consume(): one conditional UPDATE
+
+Reports successful spends and the final balance; spends plus what is left
+beyond the allowance is over-spend; the command fails if the atomic strategy ever
+over-spends. The customer is deleted afterwards.
+"""
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from core import accounts, quota
+from core.models import CustomerProfile
+
+
+def naive_consume(customer_id) -> bool:
+    profile = CustomerProfile.objects.get(pk=customer_id)
+    if profile.free_public_questions_remaining < 1:
+        return False
+    # Let other threads run between the read and the write, as concurrent
+    # requests would.
+    time.sleep(0)
+    profile.free_public_questions_remaining -= 1
+    profile.save(update_fields=["free_public_questions_remaining"])
+    return True
+
+
+STRATEGIES = {"naive": naive_consume, "atomic": quota.consume}
+
+
+class Command(BaseCommand):
+    help = "Race concurrent quota spends: naive read-modify-write vs. quota.consume()."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=50)
+        parser.add_argument("--allowance", type=int, default=100)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'strategy':9s} {'spent':>6s} {'left':>5s} {'over':>5s} {'errors':>7s} {'ms':>8s}"
+        )
+        failed = False
+        for name, consume in STRATEGIES.items():
+            user = accounts.insert_account(
+                f"bench-quota-{name}-{time.time_ns()}", "", make_password(None), CustomerProfile,
+                free_public_questions_remaining=options["allowance"],
+            )
+            try:
+                spent, errors, elapsed = self._race(consume, user.customer_profile.pk, options)
+                left = quota.remaining(user.customer_profile.pk)
+            finally:
+                user.delete()
+            # Lost updates leave a balance the customer can still spend.
+            over = spent + left - options["allowance"]
+            self.stdout.write(
+                f"{name:9s} {spent:6d} {left:5d} {over:5d} {errors:7d} {elapsed * 1000:8.1f}"
+            )
+            if name == "atomic" and over:
+                failed = True
+        if failed:
+            raise CommandError("quota.consume() over-spent.")
+
+    def _race(self, consume, customer_id, options):
+        barrier = threading.Barrier(options["threads"])
+        lock = threading.Lock()
+        totals = {"spent": 0, "errors": 0}
+
+        def run():
+            spent = errors = 0
+            try:
+                barrier.wait()
+                for _ in range(options["attempts"]):
+                    try:
+                        spent += consume(customer_id)
+                    except OperationalError:
+                        errors += 1
+            finally:
+                connection.close()
+            with lock:
+                totals["spent"] += spent
+                totals["errors"] += errors
+
+        threads = [threading.Thread(target=run) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return totals["spent"], totals["errors"], time.perf_counter() - started
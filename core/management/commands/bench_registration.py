@@ -0,0 +1,122 @@
+"""
+Concurrent signup benchmark: hashing inside vs. before the transaction.
+
+    python manage.py bench_registration --users 200 --threads 8
+    python manage.py bench_registration --profile scrypt
+
+Registers --users customers from --threads threads against the configured
+database, once per mode:
+
+    inside   the old flow: create_user() (which hashes) inside atomic()
+    before   core.accounts: hash first, then a short atomic() for the INSERTs
+
+and reports signups/second, per-signup latency and how long each
+transaction stayed open (for SQLite, how long the write lock can be held).
+The accounts are deleted again afterwards.
+"""
+import statistics
+import threading
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.test.utils import override_settings
+
+from core import accounts
+from core.models import CustomerProfile
+
+PROFILES = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "argon2": "core.hashers.TunedArgon2PasswordHasher",
+    "scrypt": "core.hashers.TunedScryptPasswordHasher",
+}
+
+
+def signup_inside(username):
+    started = time.perf_counter()
+    with transaction.atomic():
+        user = User.objects.create_user(username=username, password="bench-Passw0rd!")
+        CustomerProfile.objects.create(user=user)
+    return time.perf_counter() - started
+
+
+def signup_before(username):
+    password_hash = make_password("bench-Passw0rd!")
+    started = time.perf_counter()
+    accounts.insert_account(username, "", password_hash, CustomerProfile)
+    return time.perf_counter() - started
+
+
+MODES = {"inside": signup_inside, "before": signup_before}
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent registrations with hashing inside vs. before the transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--profile", choices=sorted(PROFILES))
+        parser.add_argument("--mode", choices=sorted(MODES), action="append")
+
+    def handle(self, *args, **options):
+        hashers = None
+        if options["profile"]:
+            hashers = [PROFILES[options["profile"]], *PROFILES.values()]
+        with override_settings(**({"PASSWORD_HASHERS": hashers} if hashers else {})):
+            self.stdout.write(
+                f"{'mode':8s} {'signups/s':>10s} {'p50 ms':>8s} {'p95 ms':>8s}"
+                f" {'tx mean ms':>11s} {'tx max ms':>10s} {'errors':>7s}"
+            )
+            for mode in options["mode"] or ["inside", "before"]:
+                self._run(mode, options["users"], options["threads"])
+
+    def _run(self, mode, n, threads):
+        signup = MODES[mode]
+        prefix = f"bench-signup-{uuid.uuid4().hex[:8]}"
+        queue = list(range(n))
+        lock = threading.Lock()
+        latencies, holds, errors = [], [], []
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if not queue:
+                            return
+                        i = queue.pop()
+                    started = time.perf_counter()
+                    try:
+                        hold = signup(f"{prefix}-{i}")
+                    except OperationalError as exc:  # e.g. "database is locked"
+                        with lock:
+                            errors.append(str(exc))
+                        continue
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed * 1000)
+                        holds.append(hold * 1000)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        wall = time.perf_counter() - started
+
+        User.objects.filter(username__startswith=prefix).delete()
+
+        if not latencies:
+            self.stdout.write(f"{mode:8s} every signup failed: {errors[:1]}")
+            return
+        p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) > 1 else latencies[0]
+        self.stdout.write(
+            f"{mode:8s} {len(latencies) / wall:10.1f} {statistics.median(latencies):8.1f}"
+            f" {p95:8.1f} {statistics.fmean(holds):11.2f} {max(holds):10.2f} {len(errors):7d}"
+        )
@@ -0,0 +1,285 @@
+"""
+Latency / queries / memory benchmark for every named route in core.urls.
+
+    python manage.py seed_data
+    python manage.py bench_routes --requests 200 --output bench-baseline.json
+    python manage.py bench_routes --compare bench-baseline.json
+
+Requests go through the full middleware stack in-process via Django's test
+client, logged in as a seeded customer or lawyer where the route needs it.
+Each case is timed over --requests runs (after --warmup runs) and reported
+as p50/p95/p99 milliseconds and requests/second; a separate, smaller pass
+counts SQL queries and peak Python memory allocated per request (tracing
+allocations slows requests down, so it is kept out of the timed runs).
+
+--output writes the results as JSON. --compare reads such a file and exits
+non-zero if any case got slower than --tolerance (p95, ignoring changes
+under --noise-ms) or started running more queries.
+
+Streaming and state-destroying routes (chat_stream, logout, answering a
+question) are listed as skipped. Anonymous pages are served from the page
+cache after the first hit unless --cold is given.
+"""
+import json
+import logging
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from core.models import ChatRoom, PublicQuestion
+
+SKIPPED = {
+    "chat_stream": "streams on the ASGI stack only; the sync view answers 204",
+    "logout": "ends the session",
+    "answer_public_question": "writes a one-off answer",
+    "instrumentation_report": "staff-only diagnostics",
+}
+
+
+@dataclass
+class Case:
+    label: str
+    route: str
+    role: str = "anonymous"
+    method: str = "get"
+    kwargs: dict = field(default_factory=dict)
+    params: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+
+
+def build_cases(room):
+    chat = {"chat_id": room.pk}
+    return [
+        Case("home", "home"),
+        Case("pricing", "pricing"),
+        Case("public_questions", "public_questions"),
+        Case("public_questions json", "public_questions", params={"format": "json"}),
+        Case("search_public_questions", "search_public_questions", params={"q": "lease"}),
+        Case("lawyers_list", "lawyers_list"),
+        Case("lawyers_list filtered", "lawyers_list", params={"experience": "6-10"}),
+        Case("register_customer", "register_customer"),
+        Case("register_lawyer", "register_lawyer"),
+        Case("login", "login"),
+        Case("settings", "settings", role="customer"),
+        Case("my_questions", "my_questions", role="customer"),
+        Case("my_customers", "my_customers", role="lawyer"),
+        Case("chat_view", "chat_view", role="customer", kwargs=chat),
+        Case("chat_messages", "chat_messages", role="customer", kwargs=chat),
+        Case(
+            "chat_messages older",
+            "chat_messages",
+            role="customer",
+            kwargs=chat,
+            params={"before": room.last_message_id},
+        ),
+        Case("chat_poll", "chat_poll", role="customer", kwargs=chat, params={"after": 0}),
+        Case(
+            "chat_mark_read",
+            "chat_mark_read",
+            role="customer",
+            method="post",
+            kwargs=chat,
+            params={"last_id": room.last_message_id},
+        ),
+        # Writes last, so they do not change what the reads above see.
+        Case(
+            "chat_view post",
+            "chat_view",
+            role="customer",
+            method="post",
+            kwargs=chat,
+            params={"message": "Benchmark message."},
+            headers={"Accept": "application/json"},
+        ),
+    ]
+
+
+def route_names(resolver=None):
+    """Names of every route whose view lives in core.views."""
+    names = []
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            names.extend(route_names(pattern))
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            if getattr(pattern.callback, "__module__", "") == "core.views":
+                names.append(pattern.name)
+    return names
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+class Command(BaseCommand):
+    help = "Benchmark every named core route (latency, queries, memory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--profile-requests", type=int, default=5)
+        parser.add_argument("--only", nargs="*", help="Case labels or route names to run.")
+        parser.add_argument("--cold", action="store_true", help="Clear the cache before every request.")
+        parser.add_argument("--output", help="Write results to this JSON file.")
+        parser.add_argument("--compare", help="Baseline JSON to check for regressions.")
+        parser.add_argument("--tolerance", type=float, default=0.25)
+        parser.add_argument("--noise-ms", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        room = ChatRoom.objects.order_by("-last_message_id").select_related(
+            "customer__user", "lawyer__user"
+        ).first()
+        if room is None or not PublicQuestion.objects.answered().exists():
+            raise CommandError("No chat rooms or answered questions; run seed_data first.")
+
+        users = {
+            "anonymous": None,
+            "customer": room.customer.user,
+            "lawyer": room.lawyer.user,
+        }
+        available = set(route_names())
+        cases = build_cases(room)
+        if options["only"]:
+            wanted = set(options["only"])
+            cases = [c for c in cases if c.label in wanted or c.route in wanted]
+
+        results = {}
+        # Failing routes show up as an HTTP status in the report; a
+        # traceback per request would bury it.
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        hosts = ["testserver", *settings.ALLOWED_HOSTS]
+        try:
+            with override_settings(ALLOWED_HOSTS=hosts):
+                for case in cases:
+                    if case.route not in available:
+                        continue
+                    client = Client(raise_request_exception=False)
+                    if users[case.role] is not None:
+                        client.force_login(users[case.role])
+                    results[case.label] = self._measure(client, case, options)
+                    self._print(case.label, results[case.label])
+        finally:
+            request_logger.setLevel(level)
+
+        covered = {c.route for c in build_cases(room)}
+        for name in sorted(available - covered):
+            reason = SKIPPED.get(name, "no benchmark case")
+            self.stdout.write(f"{name:28s} skipped: {reason}")
+
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "requests": options["requests"],
+                "cold": options["cold"],
+            },
+            "routes": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if options["compare"]:
+            self._compare(results, options)
+
+    def _request(self, client, case, url):
+        send = getattr(client, case.method)
+        return send(url, case.params, secure=True, headers=case.headers)
+
+    def _measure(self, client, case, options):
+        url = reverse(case.route, kwargs=case.kwargs)
+        cold = options["cold"]
+
+        for _ in range(options["warmup"]):
+            self._request(client, case, url)
+
+        samples = []
+        status = None
+        for _ in range(options["requests"]):
+            if cold:
+                cache.clear()
+            started = time.perf_counter()
+            response = self._request(client, case, url)
+            samples.append((time.perf_counter() - started) * 1000)
+            status = response.status_code
+
+        queries, peaks = [], []
+        tracemalloc.start()
+        try:
+            for _ in range(options["profile_requests"]):
+                if cold:
+                    cache.clear()
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                with CaptureQueriesContext(connection) as captured:
+                    self._request(client, case, url)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - baseline)
+                queries.append(len(captured))
+        finally:
+            tracemalloc.stop()
+
+        p50, p95, p99 = percentiles(samples)
+        mean = statistics.fmean(samples)
+        return {
+            "status": status,
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(p95, 3),
+            "p99_ms": round(p99, 3),
+            "rps": round(1000 / mean, 1) if mean else 0.0,
+            "queries": max(queries) if queries else 0,
+            "alloc_kib": round(statistics.median(peaks) / 1024, 1) if peaks else 0.0,
+        }
+
+    def _print(self, label, r):
+        flag = "" if r["status"] < 400 else f"  <- HTTP {r['status']}"
+        self.stdout.write(
+            f"{label:28s} p50 {r['p50_ms']:8.2f}  p95 {r['p95_ms']:8.2f}"
+            f"  p99 {r['p99_ms']:8.2f} ms  {r['rps']:8.1f} req/s"
+            f"  {r['queries']:3d} q  {r['alloc_kib']:8.1f} KiB{flag}"
+        )
+
+    def _compare(self, results, options):
+        with open(options["compare"]) as fh:
+            baseline = json.load(fh).get("routes", {})
+
+        regressions = []
+        for label, base in baseline.items():
+            now = results.get(label)
+            if now is None:
+                continue
+            limit = base["p95_ms"] * (1 + options["tolerance"])
+            if now["p95_ms"] > limit and now["p95_ms"] - base["p95_ms"] > options["noise_ms"]:
+                regressions.append(
+                    f"{label}: p95 {base['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms"
+                )
+            if now["queries"] > base["queries"]:
+                regressions.append(
+                    f"{label}: queries {base['queries']} -> {now['queries']}"
+                )
+            if now["status"] != base["status"]:
+                regressions.append(f"{label}: status {base['status']} -> {now['status']}")
+
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f"{len(regressions)} regression(s) against {options['compare']}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}."))
@@ -0,0 +1,129 @@
+"""
+Search benchmark on synthetic data (never touches the project database).
+
+    python manage.py bench_search --questions 100000
+
+Builds the FTS5 table and the in-memory equivalent of the python backend's
+inverted index over N generated question/answer pairs, then times a mix of
+queries against each, next to the LIKE '%term%' full scan that icontains
+would run.
+"""
+import random
+import sqlite3
+import statistics
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand
+
+from core import search
+
+VOCABULARY = (
+    "lease deposit landlord tenant eviction notice divorce custody support "
+    "alimony contract breach damages employer wrongful dismissal severance "
+    "immigration visa permit citizenship estate will probate executor "
+    "insurance claim denial accident injury negligence liability property "
+    "boundary easement mortgage foreclosure debt collection bankruptcy "
+    "small claims court appeal hearing settlement mediation arbitration "
+    "copyright trademark patent licence privacy defamation harassment"
+).split()
+FILLER = "the a my our their is was has have can should would about after before with".split()
+
+QUERIES = ["lease", "landlord deposit", "divor", "wrongful dismissal", "probate exec", "zzzz"]
+
+
+def make_text(rng, words):
+    return " ".join(
+        rng.choice(VOCABULARY) if rng.random() < 0.4 else rng.choice(FILLER)
+        for _ in range(words)
+    )
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = "Benchmark FTS5 vs the python inverted index vs a LIKE scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        n = options["questions"]
+        repeat = options["repeat"]
+        rng = random.Random(options["seed"])
+
+        self.stdout.write(f"Generating {n} question/answer pairs...")
+        docs = [(make_text(rng, 25), make_text(rng, 60)) for _ in range(n)]
+
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE plain (id INTEGER PRIMARY KEY, q TEXT, a TEXT)")
+        db.executemany("INSERT INTO plain VALUES (?, ?, ?)", ((i, q, a) for i, (q, a) in enumerate(docs, 1)))
+
+        fts = None
+        if search.fts5_available():
+            started = time.perf_counter()
+            db.execute(search.FTS_SCHEMA)
+            db.execute(
+                f"INSERT INTO {search.FTS_TABLE} (rowid, question_text, answer_text)"
+                " SELECT id, q, a FROM plain"
+            )
+            self.stdout.write(f"fts5 build:   {time.perf_counter() - started:7.2f}s")
+            fts = search.FTS_TABLE
+
+        started = time.perf_counter()
+        postings = defaultdict(dict)
+        lengths = {}
+        for doc_id, (q, a) in enumerate(docs, 1):
+            tokens = search.tokenize(q) + search.tokenize(a)
+            lengths[doc_id] = len(tokens)
+            for term, freq in Counter(tokens).items():
+                postings[term][doc_id] = freq
+        terms_sorted = sorted(postings)
+        avg = sum(lengths.values()) / len(lengths)
+        self.stdout.write(f"python build: {time.perf_counter() - started:7.2f}s")
+
+        def prefix_postings(term):
+            merged = defaultdict(int)
+            i = bisect_left(terms_sorted, term)
+            while i < len(terms_sorted) and terms_sorted[i].startswith(term):
+                for doc_id, freq in postings[terms_sorted[i]].items():
+                    merged[doc_id] += freq
+                i += 1
+            return merged
+
+        self.stdout.write(f"\n{'query':22s} {'fts5 ms':>9s} {'python ms':>10s} {'LIKE ms':>9s}")
+        for query in QUERIES:
+            terms = search.query_terms(query)
+
+            def run_fts():
+                db.execute(
+                    f"SELECT rowid, bm25({fts}), snippet({fts}, -1, '[', ']', '…', 12)"
+                    f" FROM {fts} WHERE {fts} MATCH ? ORDER BY bm25({fts}) LIMIT 20",
+                    [search.fts_match_expression(terms)],
+                ).fetchall()
+
+            def run_python():
+                scores = search.bm25_scores([prefix_postings(t) for t in terms], lengths, n, avg)
+                sorted(scores.items(), key=lambda item: -item[1])[:20]
+
+            def run_like():
+                where = " AND ".join("(q LIKE ? OR a LIKE ?)" for _ in terms)
+                params = [p for t in terms for p in (f"%{t}%", f"%{t}%")]
+                # No LIMIT: ranking icontains matches means reading all of them.
+                db.execute(f"SELECT id FROM plain WHERE {where}", params).fetchall()
+
+            fts_ms = f"{timed(run_fts, repeat):9.2f}" if fts else f"{'n/a':>9s}"
+            self.stdout.write(
+                f"{query:22s} {fts_ms} {timed(run_python, repeat):10.2f}"
+                f" {timed(run_like, repeat):9.2f}"
+            )
@@ -0,0 +1,157 @@
+"""
+SQLite concurrency benchmark: Django's stock SQLite setup vs. the tuned
+profile in guardianangel/database.py.
+
+    python manage.py bench_sqlite_concurrency --workers 8 --seconds 10
+
+Runs --workers processes (like gunicorn workers) against a scratch database
+file in a temporary directory, each doing a request-shaped mix: mostly
+reads of a recent page, and with probability --write-ratio a read-then-
+insert transaction. Two configurations:
+
+    stock   rollback journal, no pragmas, DEFERRED transactions, a new
+            connection per request (CONN_MAX_AGE=0)
+    tuned   WAL + the pragmas from database.pragmas(), IMMEDIATE
+            transactions, one persistent connection per worker
+
+Reports requests/s, read/write latency and how many requests failed with
+"database is locked". The project database is never touched.
+"""
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from guardianangel import database
+
+STOCK_TIMEOUT = 5.0  # Django's default (Python's sqlite3 default)
+
+
+def _prepare(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE message (id INTEGER PRIMARY KEY, room INTEGER, body TEXT, created REAL)"
+    )
+    conn.execute("CREATE INDEX message_room ON message (room, id)")
+    conn.executemany(
+        "INSERT INTO message (room, body, created) VALUES (?, ?, ?)",
+        ((i % 200, "x" * 120, time.time()) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _connect(path, profile):
+    if profile == "stock":
+        conn = sqlite3.connect(path, timeout=STOCK_TIMEOUT, isolation_level=None)
+    else:
+        busy_ms = dict(database.pragmas())["busy_timeout"]
+        conn = sqlite3.connect(path, timeout=busy_ms / 1000, isolation_level=None)
+        for name, value in database.pragmas():
+            conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def _worker(path, profile, seconds, write_ratio, seed, results):
+    rng = random.Random(seed)
+    begin = "BEGIN" if profile == "stock" else "BEGIN IMMEDIATE"
+    persistent = _connect(path, profile) if profile == "tuned" else None
+    reads, writes, locked = [], [], 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        conn = persistent or _connect(path, profile)
+        room = rng.randrange(200)
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if is_write:
+                conn.execute(begin)
+                try:
+                    conn.execute(
+                        "SELECT max(id) FROM message WHERE room = ?", (room,)
+                    ).fetchone()
+                    conn.execute(
+                        "INSERT INTO message (room, body, created) VALUES (?, ?, ?)",
+                        (room, "y" * 120, time.time()),
+                    )
+                    conn.execute("COMMIT")
+                except sqlite3.OperationalError:
+                    conn.execute("ROLLBACK")
+                    raise
+            else:
+                conn.execute(
+                    "SELECT id, body FROM message WHERE room = ? ORDER BY id DESC LIMIT 20",
+                    (room,),
+                ).fetchall()
+        except sqlite3.OperationalError as exc:
+            if "locked" not in str(exc) and "busy" not in str(exc):
+                raise
+            locked += 1
+        else:
+            elapsed = (time.perf_counter() - started) * 1000
+            (writes if is_write else reads).append(elapsed)
+        finally:
+            if persistent is None:
+                conn.close()
+
+    results.put((reads, writes, locked))
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent SQLite access: stock settings vs. the tuned profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+        parser.add_argument("--rows", type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'profile':8s} {'req/s':>9s} {'read p50':>9s} {'read p95':>9s}"
+            f" {'write p50':>10s} {'write p95':>10s} {'locked':>7s}"
+        )
+        for profile in ("stock", "tuned"):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.sqlite3")
+                _prepare(path, options["rows"])
+                self._run(path, profile, options)
+
+    def _run(self, path, profile, options):
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(
+                target=_worker,
+                args=(path, profile, options["seconds"], options["write_ratio"], i, results),
+            )
+            for i in range(options["workers"])
+        ]
+        for p in procs:
+            p.start()
+        reads, writes, locked = [], [], 0
+        for _ in procs:
+            r, w, lk = results.get()
+            reads += r
+            writes += w
+            locked += lk
+        for p in procs:
+            p.join()
+
+        def pct(samples, q):
+            if len(samples) < 2:
+                return samples[0] if samples else 0.0
+            return statistics.quantiles(samples, n=100)[q - 1]
+
+        total = len(reads) + len(writes)
+        self.stdout.write(
+            f"{profile:8s} {total / options['seconds']:9.0f}"
+            f" {pct(reads, 50):9.2f} {pct(reads, 95):9.2f}"
+            f" {pct(writes, 50):10.2f} {pct(writes, 95):10.2f} {locked:7d}"
+        )
@@ -0,0 +1,145 @@
+"""
+Sync (WSGI, gunicorn sync workers) vs. async (ASGI, uvicorn workers)
+under concurrent load.
+
+    python manage.py seed_data
+    python manage.py bench_stacks --connections 200 --seconds 15
+
+Starts gunicorn with gunicorn.conf.py once per stack (SERVER_STACK=sync,
+then async) on a local port, against the configured database, and drives
+it with --connections concurrent clients. Each client sends a GET, reads
+the whole response, and repeats until --seconds is up, cycling through
+--path (default: the read-only pages that have async versions). Each
+request gets a unique query parameter so it misses the anonymous page
+cache and really reads the database; --cached turns that off.
+
+Reports requests/s, latency percentiles and errors (non-2xx/3xx or
+connection failures). The load generator shares the machine with the
+server, so compare the two rows with each other rather than with
+production numbers.
+"""
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ["/public-questions/", "/lawyers/", "/public-questions/?format=json"]
+
+
+def _wait_for_port(port, proc, seconds=30):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise CommandError(f"gunicorn exited with status {proc.returncode}.")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"gunicorn did not start listening on port {port}.")
+
+
+async def _fetch(port, path):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()  # until the server closes
+    finally:
+        writer.close()
+    parts = status_line.split()
+    return int(parts[1]) if len(parts) > 1 else 0
+
+
+async def _load(port, paths, connections, seconds, cached):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    counter = 0
+
+    async def client(index):
+        nonlocal errors, counter
+        n = index
+        while time.monotonic() < deadline:
+            path = paths[n % len(paths)]
+            n += 1
+            if not cached:
+                counter += 1
+                path += ("&" if "?" in path else "?") + f"bench={counter}"
+            started = time.perf_counter()
+            try:
+                status = await _fetch(port, path)
+            except OSError:
+                errors += 1
+                continue
+            if status >= 400 or status == 0:
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(i) for i in range(connections)))
+    return latencies, errors, time.monotonic() - started
+
+
+class Command(BaseCommand):
+    help = "Load-test the sync (WSGI) and async (ASGI) gunicorn stacks side by side."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=200)
+        parser.add_argument("--seconds", type=float, default=15)
+        parser.add_argument("--workers", type=int, help="Workers per stack (default: gunicorn.conf.py).")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--path", action="append", dest="paths")
+        parser.add_argument("--stack", action="append", dest="stacks", choices=["sync", "async"])
+        parser.add_argument("--cached", action="store_true", help="Let the page cache answer.")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or DEFAULT_PATHS
+        self.stdout.write(
+            f"{'stack':6s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}"
+            f" {'max ms':>8s} {'errors':>7s}"
+        )
+        for stack in options["stacks"] or ["sync", "async"]:
+            self._run(stack, paths, options)
+
+    def _run(self, stack, paths, options):
+        command = [
+            sys.executable, "-m", "gunicorn",
+            "--config", str(settings.BASE_DIR / "gunicorn.conf.py"),
+            "--bind", f"127.0.0.1:{options['port']}",
+            "--log-level", "warning",
+        ]
+        if options["workers"]:
+            command += ["--workers", str(options["workers"])]
+        proc = subprocess.Popen(
+            command,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "SERVER_STACK": stack},
+        )
+        try:
+            _wait_for_port(options["port"], proc)
+            latencies, errors, elapsed = asyncio.run(
+                _load(options["port"], paths, options["connections"], options["seconds"],
+                      options["cached"])
+            )
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+
+        if len(latencies) < 2:
+            raise CommandError(f"{stack}: only {len(latencies)} successful requests ({errors} errors).")
+        q = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{stack:6s} {len(latencies) / elapsed:8.0f} {q[49]:8.1f} {q[94]:8.1f}"
+            f" {q[98]:8.1f} {max(latencies):8.1f} {errors:7d}"
+        )
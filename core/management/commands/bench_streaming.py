@@ -0,0 +1,90 @@
+"""
+Buffered vs. streamed rendering of the full Public Questions list.
+
+    python manage.py bench_streaming --questions 20000
+
+Seeds N answered questions inside a transaction (rolled back afterwards)
+and renders all of them twice through public_questions.html: once the
+way render() works, the whole page built as one string, and once through
+core.streaming.stream_list. Reports time to first byte, total time and
+peak Python memory (tracemalloc) for each. The card fragment cache is
+swapped for a dummy cache during the run, so its entries are not counted
+as page memory.
+"""
+import time
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from core import caching, feeds, streaming
+
+DUMMY_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+class Rollback(Exception):
+    pass
+
+
+def _measure(produce):
+    """(ttfb ms, total ms, peak KiB, bytes) for an iterable of strings."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    ttfb = None
+    size = 0
+    for chunk in produce():
+        if ttfb is None:
+            ttfb = time.perf_counter() - started
+        size += len(chunk)
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ttfb * 1000, total * 1000, peak / 1024, size
+
+
+class Command(BaseCommand):
+    help = "Compare buffered and streamed rendering of a long list page."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), override_settings(CACHES=DUMMY_CACHE):
+                call_command(
+                    "seed_data", customers=100, lawyers=20, questions=options["questions"],
+                    answered=1.0, rooms=0, messages=0, prefix="bench-stream", verbosity=0,
+                )
+                self._run()
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self):
+        request = RequestFactory().get("/public-questions/?stream=1")
+        request.user = AnonymousUser()
+
+        def buffered():
+            questions = list(feeds.answered_questions())
+            yield render_to_string(
+                "public_questions.html",
+                {"questions": questions, **caching.fragment_versions()},
+                request,
+            )
+
+        def streamed():
+            response = streaming.stream_list(
+                request, "public_questions.html", {}, feeds.answered_questions(),
+                "includes/question_card.html", "q", caching.fragment_versions(),
+            )
+            for chunk in response.streaming_content:
+                yield chunk
+
+        self.stdout.write(f"{'mode':9s} {'ttfb ms':>9s} {'total ms':>9s} {'peak KiB':>9s} {'bytes':>10s}")
+        for name, produce in (("buffered", buffered), ("streamed", streamed)):
+            ttfb, total, peak, size = _measure(produce)
+            self.stdout.write(f"{name:9s} {ttfb:9.1f} {total:9.1f} {peak:9.0f} {size:10d}")
@@ -0,0 +1,112 @@
+"""
+Run EXPLAIN on the queries behind the hot views and fail on bad plans.
+
+    python manage.py explain_queries
+
+A plan is rejected if SQLite has to scan a whole table without an index
+or build a temporary B-tree to sort. Meant to run in CI after migrate, so
+a dropped index or a reshaped query is caught before it ships.
+"""
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core import feeds
+from core.models import ChatMessage, ChatRoom, CustomerProfile, LawyerProfile
+from core.pagination import keyset_queryset
+from core.views import INBOX_KEYS, LAWYER_KEYS, QUESTION_KEYS
+
+# "SCAN core_x" with no index after it is a full table scan.
+FULL_SCAN = re.compile(r"\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE")
+
+
+def view_queries():
+    """
+    (label, queryset) pairs shaped exactly like the views' queries,
+    including a follow-on page so the keyset WHERE clause is covered too.
+    """
+    now = timezone.now()
+    question_cursor = [now, 1]
+    lawyer_cursor = ["m", "m", "m"]
+    customer = CustomerProfile(pk=1)
+
+    answered = feeds.answered_questions()
+    mine = feeds.customer_questions(customer)
+    lawyers = LawyerProfile.objects.filter(is_approved=True).select_related("user")
+    inbox = ChatRoom.objects.inbox_for_lawyer(LawyerProfile(pk=1))
+
+    return [
+        ("public_questions", keyset_queryset(answered, QUESTION_KEYS)[:21]),
+        (
+            "public_questions (cursor)",
+            keyset_queryset(answered, QUESTION_KEYS, question_cursor)[:21],
+        ),
+        ("my_questions", keyset_queryset(mine, QUESTION_KEYS)[:21]),
+        (
+            "my_questions (cursor)",
+            keyset_queryset(mine, QUESTION_KEYS, question_cursor)[:21],
+        ),
+        ("lawyers_list", keyset_queryset(lawyers, LAWYER_KEYS)[:21]),
+        (
+            "lawyers_list (cursor)",
+            keyset_queryset(lawyers, LAWYER_KEYS, lawyer_cursor)[:21],
+        ),
+        ("my_customers inbox", keyset_queryset(inbox, INBOX_KEYS)[:21]),
+        (
+            "my_customers inbox (cursor)",
+            keyset_queryset(inbox, INBOX_KEYS, [now, 1])[:21],
+        ),
+        (
+            "my_questions chats",
+            ChatRoom.objects.inbox_for_customer(customer)[:10],
+        ),
+        ("chat messages", ChatMessage.objects.filter(room_id=1)),
+        (
+            "chat history (before id)",
+            ChatMessage.objects.filter(room_id=1, id__lt=1000)
+            .select_related("sender")
+            .order_by("-id")[:51],
+        ),
+        (
+            "chat history (after id)",
+            ChatMessage.objects.filter(room_id=1, id__gt=1000)
+            .select_related("sender")
+            .order_by("id")[:51],
+        ),
+    ]
+
+
+def plan_problems(plan: str):
+    problems = [f"full scan of {m.group(1)}" for m in FULL_SCAN.finditer(plan)]
+    if TEMP_SORT.search(plan):
+        problems.append("temp B-tree sort")
+    return problems
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot view queries and fail on full scans or temp sorts."
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError(
+                f"explain_queries only understands SQLite plans, not {connection.vendor}."
+            )
+
+        failures = []
+        for label, queryset in view_queries():
+            plan = queryset.explain()
+            problems = plan_problems(plan)
+            status = "FAIL" if problems else "ok"
+            self.stdout.write(f"[{status}] {label}")
+            if options["verbosity"] > 1 or problems:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+            if problems:
+                failures.append(f"{label}: {', '.join(problems)}")
+
+        if failures:
+            raise CommandError("Bad query plans:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All view queries use indexes."))
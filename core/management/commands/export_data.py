@@ -0,0 +1,44 @@
+"""
+Stream one table out as JSONL or CSV.
+
+    python manage.py export_data users users.jsonl
+    python manage.py export_data messages messages.csv
+    python manage.py export_data questions -          # JSONL to stdout
+
+Entities: users, customers, lawyers, questions, answers, chatrooms,
+messages. Rows are read with a server-side iterator, so memory does not
+grow with the table. import_data reads the same files back.
+"""
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import transfer
+
+
+class Command(BaseCommand):
+    help = "Export a core table as JSONL or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("entity", choices=sorted(transfer.ENTITIES))
+        parser.add_argument("path", help="Output file, or - for stdout.")
+        parser.add_argument("--format", choices=["jsonl", "csv"])
+        parser.add_argument("--batch-size", type=int, default=transfer.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        entity = transfer.ENTITIES[options["entity"]]
+        path = options["path"]
+        fmt = transfer.detect_format(path, options["format"])
+        rows = transfer.export_rows(entity, batch_size=options["batch_size"])
+
+        started = time.perf_counter()
+        if path == "-":
+            count = transfer.write_rows(rows, sys.stdout, fmt, entity.fields)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as fh:
+                count = transfer.write_rows(rows, fh, fmt, entity.fields)
+        elapsed = time.perf_counter() - started
+
+        rate = count / elapsed if elapsed else 0
+        self.stderr.write(f"Exported {count} {options['entity']} in {elapsed:.2f}s ({rate:,.0f} rows/s).")
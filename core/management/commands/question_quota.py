@@ -0,0 +1,47 @@
+"""
+Reset or grant free public questions for all customers in one statement.
+
+    python manage.py question_quota reset            # monthly, from cron
+    python manage.py question_quota reset --top-up   # keep larger balances
+    python manage.py question_quota grant 3 --customer 12 --customer 40
+
+`reset` sets every customer to FREE_PUBLIC_QUESTIONS_PER_MONTH (or
+--allowance); `grant` adds to the current balance.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import quota
+
+
+class Command(BaseCommand):
+    help = "Monthly reset and bulk grants of the free public-question quota."
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest="action", required=True)
+        reset = sub.add_parser("reset")
+        reset.add_argument("--allowance", type=int)
+        reset.add_argument(
+            "--top-up", action="store_true",
+            help="Only raise balances below the allowance.",
+        )
+        grant = sub.add_parser("grant")
+        grant.add_argument("amount", type=int)
+        grant.add_argument(
+            "--customer", type=int, action="append", dest="customers",
+            help="CustomerProfile id; repeat for several (default: everyone).",
+        )
+
+    def handle(self, *args, **options):
+        if options["action"] == "reset":
+            allowance = options["allowance"]
+            if allowance is not None and allowance < 0:
+                raise CommandError("--allowance cannot be negative.")
+            count = quota.reset_monthly(allowance, top_up=options["top_up"])
+            self.stdout.write(self.style.SUCCESS(f"Reset the quota of {count} customers."))
+        else:
+            if options["amount"] < 1:
+                raise CommandError("amount must be at least 1.")
+            count = quota.grant(options["amount"], options["customers"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Granted {options['amount']} to {count} customers.")
+            )
@@ -0,0 +1,19 @@
+"""
+Recompute the Lawyers List facet columns and counts from scratch.
+
+    python manage.py rebuild_lawyer_facets
+
+Signals keep the counts current for normal saves; run this after bulk
+imports or raw SQL edits that bypass them.
+"""
+from django.core.management.base import BaseCommand
+
+from core import facets
+
+
+class Command(BaseCommand):
+    help = "Rebuild LawyerProfile facet buckets and LawyerFacetCell counts."
+
+    def handle(self, *args, **options):
+        cells = facets.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {cells} facet cells."))
@@ -0,0 +1,80 @@
+"""
+Background task worker (core.taskqueue).
+
+    python manage.py run_tasks                # run until SIGTERM / Ctrl-C
+    python manage.py run_tasks --once         # run what is due, then exit (cron)
+    python manage.py run_tasks --threads 8 --batch-size 100
+
+Claims up to --batch-size due tasks at a time and runs them on --threads
+threads: one call per task, or one call per name for batch tasks. Several
+workers (processes or machines) can share the table. On SIGTERM the
+current batch is finished before exiting. Finished tasks are purged after
+TASK_KEEP_DONE_SECONDS; failed ones are kept.
+"""
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import taskqueue
+
+PURGE_EVERY = 600  # seconds
+
+
+def _run_unit(spec, tasks):
+    close_old_connections()
+    try:
+        return taskqueue.execute(spec, tasks)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=getattr(settings, "TASK_WORKER_THREADS", 4)
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=getattr(settings, "TASK_BATCH_SIZE", 50)
+        )
+        parser.add_argument("--poll", type=float, default=1.0, help="Idle sleep in seconds.")
+        parser.add_argument("--once", action="store_true", help="Exit when nothing is due.")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, lambda *_: stop.set())
+
+        lease = getattr(settings, "TASK_LEASE_SECONDS", 300)
+        keep = getattr(settings, "TASK_KEEP_DONE_SECONDS", 24 * 60 * 60)
+        ok = failed = 0
+        next_purge = 0.0
+
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            while not stop.is_set():
+                if time.monotonic() >= next_purge:
+                    taskqueue.purge(keep)
+                    next_purge = time.monotonic() + PURGE_EVERY
+
+                claimed = taskqueue.claim(options["batch_size"], lease)
+                if not claimed:
+                    if options["once"]:
+                        break
+                    stop.wait(options["poll"])
+                    continue
+
+                units = list(taskqueue.units(claimed))
+                for success in pool.map(lambda unit: _run_unit(*unit), units):
+                    if success:
+                        ok += 1
+                    else:
+                        failed += 1
+
+        self.stdout.write(f"{ok} task calls succeeded, {failed} failed.")
@@ -0,0 +1,220 @@
+"""
+Seed the database with synthetic customers, lawyers, public questions,
+answers and chat rooms/messages, for benchmarking and local testing.
+
+    python manage.py seed_data --customers 1000 --lawyers 200 \
+        --questions 5000 --rooms 500 --messages 20000
+
+Everything is written with bulk_create in batches, so signals do not fire;
+the derived data they would maintain (chat room counters, lawyer facet
+cells, the search index, cache generations) is rebuilt at the end.
+Usernames start with --prefix (default "seed") and every seeded account
+has the password given by --password. Re-running with a different prefix
+adds another independent set.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import caching, facets, search
+from core.models import (
+    ChatMessage,
+    ChatRoom,
+    CustomerProfile,
+    LawyerProfile,
+    PublicAnswer,
+    PublicQuestion,
+)
+
+BATCH_SIZE = 2000
+
+SPECIALITIES = [
+    "Family law", "Immigration", "Employment", "Real estate", "Criminal defence",
+    "Wills and estates", "Tax", "Corporate", "Intellectual property", "Personal injury",
+]
+WORDS = (
+    "lease deposit landlord tenant eviction notice divorce custody support "
+    "contract breach damages employer dismissal severance visa permit estate "
+    "will probate insurance claim accident injury property mortgage debt "
+    "court appeal hearing settlement mediation privacy the a my is was has "
+    "can should would about after before with"
+).split()
+FIRST_NAMES = "Alex Sam Jordan Taylor Morgan Casey Riley Jamie Avery Quinn".split()
+LAST_NAMES = "Smith Khan Nguyen Martin Roy Singh Brown Tremblay Lee Wilson".split()
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+class Command(BaseCommand):
+    help = "Bulk-insert synthetic users, questions, answers and chats."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--lawyers", type=int, default=200)
+        parser.add_argument("--questions", type=int, default=5000)
+        parser.add_argument(
+            "--answered", type=float, default=0.7,
+            help="Fraction of questions that get an answer.",
+        )
+        parser.add_argument("--rooms", type=int, default=500)
+        parser.add_argument("--messages", type=int, default=20000)
+        parser.add_argument("--prefix", default="seed")
+        parser.add_argument("--password", default="seed-password")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options["customers"] < 1 or options["lawyers"] < 1:
+            raise CommandError("Need at least one customer and one lawyer.")
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(f"Users prefixed {prefix!r} already exist; pick another --prefix.")
+
+        rng = random.Random(options["seed"])
+        # One hash shared by every seeded account: hashing is deliberately
+        # slow and would otherwise dominate the run.
+        password = make_password(options["password"])
+
+        with transaction.atomic():
+            customers = self._customers(rng, prefix, password, options["customers"])
+            lawyers = self._lawyers(rng, prefix, password, options["lawyers"])
+            questions = self._questions(rng, customers, lawyers, options)
+            rooms = self._rooms(rng, customers, lawyers, options["rooms"])
+            messages = self._messages(rng, rooms, options["messages"])
+
+        facets.rebuild()
+        search.rebuild()
+        caching.bump_generation(caching.QUESTIONS)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(customers)} customers, {len(lawyers)} lawyers, "
+                f"{questions} questions, {len(rooms)} chat rooms, {messages} messages."
+            )
+        )
+
+    def _users(self, rng, prefix, role, password, n):
+        return User.objects.bulk_create(
+            (
+                User(
+                    username=f"{prefix}-{role}-{i}",
+                    email=f"{prefix}-{role}-{i}@example.com",
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    password=password,
+                )
+                for i in range(n)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def _customers(self, rng, prefix, password, n):
+        users = self._users(rng, prefix, "customer", password, n)
+        return CustomerProfile.objects.bulk_create(
+            (CustomerProfile(user=user) for user in users),
+            batch_size=BATCH_SIZE,
+        )
+
+    def _lawyers(self, rng, prefix, password, n):
+        users = self._users(rng, prefix, "lawyer", password, n)
+        return LawyerProfile.objects.bulk_create(
+            (
+                LawyerProfile(
+                    user=user,
+                    speciality=rng.choice(SPECIALITIES),
+                    bar_number=f"B{rng.randrange(10**6):06d}",
+                    years_of_practice=rng.randrange(0, 40),
+                    bio=sentence(rng, 30),
+                    fee_per_chat=rng.choice([None, Decimal(rng.randrange(20, 400))]),
+                    is_approved=rng.random() < 0.9,
+                )
+                for user in users
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def _questions(self, rng, customers, lawyers, options):
+        questions = PublicQuestion.objects.bulk_create(
+            (
+                PublicQuestion(
+                    customer=rng.choice(customers),
+                    question_text=sentence(rng, rng.randrange(10, 40)),
+                    is_answered=rng.random() < options["answered"],
+                )
+                for _ in range(options["questions"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        approved = [lawyer for lawyer in lawyers if lawyer.is_approved] or lawyers
+        PublicAnswer.objects.bulk_create(
+            (
+                PublicAnswer(
+                    question=question,
+                    lawyer=rng.choice(approved),
+                    answer_text=sentence(rng, rng.randrange(20, 80)),
+                )
+                for question in questions
+                if question.is_answered
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return len(questions)
+
+    def _rooms(self, rng, customers, lawyers, n):
+        pairs = set()
+        limit = min(n, len(customers) * len(lawyers))
+        while len(pairs) < limit:
+            pairs.add((rng.randrange(len(customers)), rng.randrange(len(lawyers))))
+        return ChatRoom.objects.bulk_create(
+            (ChatRoom(customer=customers[c], lawyer=lawyers[l]) for c, l in pairs),
+            batch_size=BATCH_SIZE,
+        )
+
+    def _messages(self, rng, rooms, n):
+        if not rooms or n <= 0:
+            return 0
+        # A skewed distribution, so a few rooms get long histories.
+        weights = [1 / (i + 1) for i in range(len(rooms))]
+        targets = rng.choices(rooms, weights=weights, k=n)
+        messages = ChatMessage.objects.bulk_create(
+            (
+                ChatMessage(
+                    room=room,
+                    sender_id=rng.choice((room.customer.user_id, room.lawyer.user_id)),
+                    message=sentence(rng, rng.randrange(3, 25)),
+                )
+                for room in targets
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+        # Seeded conversations count as read by both sides.
+        newest = {}
+        for message in messages:
+            current = newest.get(message.room_id)
+            if current is None or message.pk > current.pk:
+                newest[message.room_id] = message
+        for room in rooms:
+            message = newest.get(room.pk)
+            if message is None:
+                continue
+            room.last_message_id = message.pk
+            room.customer_last_read_id = message.pk
+            room.lawyer_last_read_id = message.pk
+            room.last_activity_at = message.created_at
+        ChatRoom.objects.bulk_update(
+            rooms,
+            [
+                "last_message_id",
+                "customer_last_read_id",
+                "lawyer_last_read_id",
+                "last_activity_at",
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        return len(messages)
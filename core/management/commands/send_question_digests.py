@@ -0,0 +1,29 @@
+"""
+Send the lawyer digest of new public questions now (core.digests).
+
+    python manage.py send_question_digests
+    EMAIL_FILE_PATH=/tmp/mail python manage.py send_question_digests   # local test
+
+Normally the send_question_digests background task does this once per
+DIGEST_INTERVAL_SECONDS after questions are posted; run this for a
+manual pass, or from cron if no task worker is running.
+"""
+from django.core.management.base import BaseCommand
+
+from core import digests
+
+
+class Command(BaseCommand):
+    help = "Email approved lawyers a digest of new public questions in their speciality."
+
+    def handle(self, *args, **options):
+        run = digests.send_digests()
+        if run is None:
+            self.stdout.write("No new questions.")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Questions {run.after_question_id + 1}..{run.last_question_id}: "
+                f"{run.questions} matched, {run.emails} digests sent."
+            )
+        )
@@ -0,0 +1,323 @@
+"""
+Opt-in per-request instrumentation.
+
+Add "core.middleware.instrumentation.RequestInstrumentationMiddleware" to
+MIDDLEWARE (as early as possible) to record, for every request, the number
+of SQL queries, time spent in the database, time spent rendering templates
+and total wall time. Numbers are aggregated per URL name into fixed-bucket
+histograms; the staff-only /ops/instrumentation/ view dumps them together
+with the slowest query fingerprints.
+
+Cheap enough to leave on: each thread writes to its own shard of counters,
+so recording a request takes no lock at all. Readers merge the shards.
+Everything is per process; each worker reports its own numbers.
+
+settings.INSTRUMENTATION_PROFILE_RATE (default 0) runs that fraction of
+requests under cProfile; the samples are accumulated per URL name and can
+be read back with ?profile=<url name>.
+"""
+import cProfile
+import io
+import pstats
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+# Upper bounds (ms) of the histogram buckets; one more bucket catches the rest.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+MAX_FINGERPRINTS = 1000
+DEFAULT_TOP_QUERIES = 20
+
+_IN_LIST = re.compile(r"\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals and IN-list lengths collapsed, for grouping."""
+    sql = _IN_LIST.sub("(...)", sql)
+    return _NUMBER.sub("N", sql)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def merge(self, other: "Histogram"):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 3),
+            "buckets": dict(zip([*map(str, BUCKETS_MS), "inf"], self.counts)),
+        }
+
+
+class RouteStats:
+    __slots__ = ("wall", "db", "template", "queries", "max_queries")
+
+    def __init__(self):
+        self.wall = Histogram()
+        self.db = Histogram()
+        self.template = Histogram()
+        self.queries = 0
+        self.max_queries = 0
+
+    def merge(self, other: "RouteStats"):
+        self.wall.merge(other.wall)
+        self.db.merge(other.db)
+        self.template.merge(other.template)
+        self.queries += other.queries
+        self.max_queries = max(self.max_queries, other.max_queries)
+
+
+class Shard:
+    """Counters written by exactly one thread."""
+
+    def __init__(self):
+        self.routes = {}
+        # fingerprint -> [count, total_ms, max_ms]
+        self.queries = {}
+
+
+class Registry:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # only taken to add a shard or reset
+        self._profiles = {}
+        self._profile_lock = threading.Lock()
+
+    def shard(self) -> Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = Shard()
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def reset(self):
+        with self._lock:
+            self._shards = []
+            self._local = threading.local()
+        with self._profile_lock:
+            self._profiles = {}
+
+    def add_profile(self, name, profile):
+        with self._profile_lock:
+            stats = self._profiles.get(name)
+            if stats is None:
+                self._profiles[name] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+
+    def profile_text(self, name, limit=40) -> str | None:
+        with self._profile_lock:
+            stats = self._profiles.get(name)
+            if stats is None:
+                return None
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+
+    def snapshot(self, top=DEFAULT_TOP_QUERIES) -> dict:
+        routes, queries = {}, {}
+        for shard in list(self._shards):
+            for name, stats in list(shard.routes.items()):
+                routes.setdefault(name, RouteStats()).merge(stats)
+            for fp, (count, total, worst) in list(shard.queries.items()):
+                entry = queries.setdefault(fp, [0, 0.0, 0.0])
+                entry[0] += count
+                entry[1] += total
+                entry[2] = max(entry[2], worst)
+
+        slowest = sorted(queries.items(), key=lambda item: -item[1][1])[:top]
+        with self._profile_lock:
+            profiled = sorted(self._profiles)
+        return {
+            "routes": {
+                name: {
+                    "wall": stats.wall.as_dict(),
+                    "db": stats.db.as_dict(),
+                    "template": stats.template.as_dict(),
+                    "queries_per_request": round(stats.queries / stats.wall.count, 2)
+                    if stats.wall.count else 0.0,
+                    "max_queries": stats.max_queries,
+                }
+                for name, stats in sorted(routes.items())
+            },
+            "slowest_queries": [
+                {
+                    "sql": fp,
+                    "count": count,
+                    "total_ms": round(total, 3),
+                    "mean_ms": round(total / count, 3),
+                    "max_ms": round(worst, 3),
+                }
+                for fp, (count, total, worst) in slowest
+            ],
+            "profiled_routes": profiled,
+        }
+
+
+registry = Registry()
+
+
+# TEMPLATE TIMING -------------------------------------------------------------
+
+# [elapsed_ms, depth] for the request being handled, or None outside one.
+_template_timer = ContextVar("template_timer", default=None)
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    timer = _template_timer.get()
+    if timer is None:
+        return _original_render(self, context)
+    # Only the outermost render counts; includes happen inside it.
+    timer[1] += 1
+    started = time.perf_counter() if timer[1] == 1 else None
+    try:
+        return _original_render(self, context)
+    finally:
+        timer[1] -= 1
+        if started is not None:
+            timer[0] += (time.perf_counter() - started) * 1000
+
+
+def _install_template_timer():
+    if Template.render is not _timed_render:
+        Template.render = _timed_render
+
+
+# MIDDLEWARE ------------------------------------------------------------------
+
+class QueryRecorder:
+    """Execute wrapper: times each query and records its fingerprint."""
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.count = 0
+        self.elapsed_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.elapsed_ms += ms
+
+            fp = fingerprint(sql)
+            entry = self.shard.queries.get(fp)
+            if entry is None:
+                if len(self.shard.queries) >= MAX_FINGERPRINTS:
+                    return
+                entry = self.shard.queries[fp] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += ms
+            if ms > entry[2]:
+                entry[2] = ms
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Records query count, DB time, template time and wall time per URL name.
+    See the module docstring for how to read the results.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.profile_rate = float(getattr(settings, "INSTRUMENTATION_PROFILE_RATE", 0.0))
+        self._profiling = threading.Lock()  # cProfile allows one active profiler
+        _install_template_timer()
+
+    def __call__(self, request):
+        shard = registry.shard()
+        recorder = QueryRecorder(shard)
+        timer = [0.0, 0]
+        token = _template_timer.set(timer)
+
+        profile = None
+        if self.profile_rate and random.random() < self.profile_rate:
+            if self._profiling.acquire(blocking=False):
+                profile = cProfile.Profile()
+
+        wrappers = [connections[alias].execute_wrapper(recorder) for alias in connections]
+        started = time.perf_counter()
+        try:
+            for wrapper in wrappers:
+                wrapper.__enter__()
+            if profile is not None:
+                profile.enable()
+            response = self.get_response(request)
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall_ms = (time.perf_counter() - started) * 1000
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+            _template_timer.reset(token)
+
+        match = getattr(request, "resolver_match", None)
+        name = (match.view_name if match else None) or "<unresolved>"
+
+        stats = shard.routes.get(name)
+        if stats is None:
+            stats = shard.routes[name] = RouteStats()
+        stats.wall.add(wall_ms)
+        stats.db.add(recorder.elapsed_ms)
+        stats.template.add(timer[0])
+        stats.queries += recorder.count
+        if recorder.count > stats.max_queries:
+            stats.max_queries = recorder.count
+
+        if profile is not None:
+            try:
+                registry.add_profile(name, profile)
+            finally:
+                self._profiling.release()
+
+        return response
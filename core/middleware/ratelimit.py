@@ -2,19 +2,44 @@ import time
 from django.http import HttpResponse
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = "core.middleware.ratelimit_stores.LocMemStore"
+
+
+def parse_limit(limit_str):
+    """
+    "60:8" -> (60, 8). Falls back to 8 requests / 60s on bad input.
+    """
+    try:
+        seconds, max_requests = map(int, limit_str.split(":"))
+    except ValueError:
+        return 60, 8
+    if seconds <= 0:
+        return 60, 8
+    return seconds, max_requests
+
 
 class SimpleRateLimitMiddleware(MiddlewareMixin):
     """
-    A simple in-memory rate limiter.
+    A simple rate limiter.
 
     Default format (from settings.RATELIMIT_DEFAULT):
         "60:8" -> 8 requests per 60 seconds per IP.
 
-    Not persistent across restarts, but good enough
-    for basic abuse protection on a small deployment.
+    Hits are counted by a pluggable store (settings.RATELIMIT_BACKEND, see
+    core.middleware.ratelimit_stores). The default is in-process and not
+    persistent across restarts; use SQLiteStore or CacheStore to share the
+    limit between gunicorn workers.
     """
 
-    cache = {}
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.seconds, self.max_requests = parse_limit(
+            getattr(settings, "RATELIMIT_DEFAULT", "60:8")
+        )
+        backend = getattr(settings, "RATELIMIT_BACKEND", DEFAULT_BACKEND)
+        self.store = import_string(backend)()
 
     def process_request(self, request):
         path = request.path
@@ -23,23 +48,10 @@ class SimpleRateLimitMiddleware(MiddlewareMixin):
         if path.startswith('/static') or path.startswith('/admin'):
             return None
 
-        # Read limit from settings, fallback to 8 req / 60s
-        limit_str = getattr(settings, "RATELIMIT_DEFAULT", "60:8")
-        try:
-            seconds, max_requests = map(int, limit_str.split(":"))
-        except ValueError:
-            seconds, max_requests = 60, 8
-
         ip = self.get_client_ip(request)
-        now = time.time()
-
-        # Get existing timestamps for this IP and drop old ones
-        timestamps = self.cache.get(ip, [])
-        timestamps = [t for t in timestamps if now - t < seconds]
-        timestamps.append(now)
-        self.cache[ip] = timestamps
+        count = self.store.hit(ip, self.seconds, time.time())
 
-        if len(timestamps) > max_requests:
+        if count > self.max_requests:
             # 429 Too Many Requests (compatible with all Django versions)
             return HttpResponse(
                 "Too many requests. Please slow down.",
@@ -0,0 +1,186 @@
+"""
+Counter stores for SimpleRateLimitMiddleware.
+
+Every store implements the same sliding-window counter: hits are counted in
+fixed windows, and the rate for "the last N seconds" is the current
+window's count plus the previous window's count weighted by how much of it
+still overlaps. That is two integers per client instead of a list of
+timestamps, so a hit costs the same however large the window is.
+
+Pick one with settings.RATELIMIT_BACKEND (dotted path):
+
+    LocMemStore   per-process, LRU/TTL-bounded (default)
+    CacheStore    Django's cache framework (shared if the cache is)
+    SQLiteStore   a small SQLite file shared by every worker on the host
+"""
+import abc
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def sliding_count(prev: int, curr: int, window: int, now: float) -> float:
+    """
+    Estimated number of hits in the `window` seconds ending at `now`.
+    """
+    elapsed = (now % window) / window
+    return prev * (1.0 - elapsed) + curr
+
+
+class RateLimitStore(abc.ABC):
+    """
+    Base class for the stores. Subclasses implement hit().
+    """
+
+    @abc.abstractmethod
+    def hit(self, key: str, window: int, now: float | None = None) -> float:
+        """
+        Record one hit for `key` and return the estimated number of hits
+        (including this one) in the last `window` seconds.
+        """
+
+
+# IN-PROCESS ----------------------------------------------------------------
+
+class LocMemStore(RateLimitStore):
+    """
+    Per-process store. Entries live in an OrderedDict kept in LRU order, so
+    idle clients are evicted from the front once they are two windows old
+    or once RATELIMIT_MAX_KEYS is exceeded. Memory is bounded no matter how
+    many distinct IPs show up.
+    """
+
+    def __init__(self, max_keys: int | None = None):
+        self.max_keys = max_keys or getattr(settings, "RATELIMIT_MAX_KEYS", 10_000)
+        # key -> [window_index, prev_count, curr_count, last_seen]
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, now=None):
+        now = time.time() if now is None else now
+        index = int(now // window)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = [index, 0, 0, now]
+                self._entries[key] = entry
+            else:
+                self._entries.move_to_end(key)
+
+            if entry[0] != index:
+                # Roll forward; anything older than one window is gone.
+                entry[1] = entry[2] if entry[0] == index - 1 else 0
+                entry[2] = 0
+                entry[0] = index
+            entry[2] += 1
+            entry[3] = now
+
+            self._evict(now - 2 * window)
+            return sliding_count(entry[1], entry[2], window, now)
+
+    def _evict(self, expired_before: float):
+        entries = self._entries
+        while entries:
+            oldest = next(iter(entries.values()))
+            if oldest[3] >= expired_before and len(entries) <= self.max_keys:
+                break
+            entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# DJANGO CACHE ----------------------------------------------------------------
+
+class CacheStore(RateLimitStore):
+    """
+    Counts kept in a Django cache (settings.RATELIMIT_CACHE, default
+    "default"). Shared across workers whenever that cache is.
+    """
+
+    def __init__(self, alias: str | None = None):
+        self.cache = caches[alias or getattr(settings, "RATELIMIT_CACHE", "default")]
+
+    def hit(self, key, window, now=None):
+        now = time.time() if now is None else now
+        index = int(now // window)
+        curr_key = f"rl:{window}:{key}:{index}"
+        prev_key = f"rl:{window}:{key}:{index - 1}"
+
+        self.cache.add(curr_key, 0, timeout=2 * window)
+        try:
+            curr = self.cache.incr(curr_key)
+        except ValueError:
+            # Expired between add() and incr().
+            self.cache.set(curr_key, 1, timeout=2 * window)
+            curr = 1
+        prev = self.cache.get(prev_key, 0)
+        return sliding_count(prev, curr, window, now)
+
+
+# SHARED SQLITE FILE ----------------------------------------------------------
+
+class SQLiteStore(RateLimitStore):
+    """
+    Counts kept in their own SQLite file (settings.RATELIMIT_SQLITE_PATH)
+    so every gunicorn worker on the host sees the same numbers. A hit is a
+    single UPSERT on the (key, window, idx) primary key; stale rows are
+    pruned every PRUNE_EVERY hits.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path=None):
+        default = Path(settings.BASE_DIR) / "ratelimit.sqlite3"
+        self.path = str(path or getattr(settings, "RATELIMIT_SQLITE_PATH", default))
+        self._local = threading.local()
+        self._hits = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit ("
+                " key TEXT NOT NULL,"
+                " window INTEGER NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " count INTEGER NOT NULL,"
+                " PRIMARY KEY (key, window, idx)"
+                ") WITHOUT ROWID"
+            )
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, window, now=None):
+        now = time.time() if now is None else now
+        index = int(now // window)
+        conn = self._connection()
+
+        (curr,) = conn.execute(
+            "INSERT INTO ratelimit (key, window, idx, count) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (key, window, idx) DO UPDATE SET count = count + 1 "
+            "RETURNING count",
+            (key, window, index),
+        ).fetchone()
+        row = conn.execute(
+            "SELECT count FROM ratelimit WHERE key = ? AND window = ? AND idx = ?",
+            (key, window, index - 1),
+        ).fetchone()
+        prev = row[0] if row else 0
+
+        self._hits += 1
+        if self._hits % self.PRUNE_EVERY == 0:
+            conn.execute(
+                "DELETE FROM ratelimit WHERE idx < ? - 1 AND window = ?",
+                (index, window),
+            )
+        return sliding_count(prev, curr, window, now)
@@ -0,0 +1,108 @@
+"""
+Replica routing with read-your-writes.
+
+ReplicaRoutingMiddleware marks GET/HEAD requests to the views named in
+REPLICA_READ_VIEWS as safe to read from the replica (see
+guardianangel.routers.ReplicaRouter). A replica lags the primary, so a
+user who just posted a question or registered would otherwise not see it
+on the next page: any successful unsafe request (POST, ...) sets a short
+signed cookie, and while it is valid that client's reads stay on the
+primary. REPLICA_PIN_SECONDS should exceed the worst replication lag.
+
+The cookie is checked without touching the session, so pinning costs no
+query. Without a "replica" database the middleware does nothing.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signing import BadSignature
+from django.db import connections
+
+from guardianangel.database import REPLICA_ALIAS
+from guardianangel.routers import use_replica
+
+PIN_COOKIE = "db_pin"
+PIN_SALT = "core.replica.pin"
+SAFE_METHODS = ("GET", "HEAD")
+
+
+def pin_seconds() -> int:
+    return getattr(settings, "REPLICA_PIN_SECONDS", 10)
+
+
+def is_pinned(request) -> bool:
+    try:
+        request.get_signed_cookie(PIN_COOKIE, salt=PIN_SALT, max_age=pin_seconds())
+    except (KeyError, BadSignature):
+        return False
+    return True
+
+
+def pin(response):
+    """Keep this client on the primary for the next REPLICA_PIN_SECONDS."""
+    response.set_signed_cookie(
+        PIN_COOKIE,
+        "1",
+        salt=PIN_SALT,
+        max_age=pin_seconds(),
+        secure=getattr(settings, "SESSION_COOKIE_SECURE", False),
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = REPLICA_ALIAS in connections
+        self.views = frozenset(
+            getattr(settings, "REPLICA_READ_VIEWS", ("home", "public_questions", "lawyers_list"))
+        )
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            # Django would run a sync process_view in a thread under ASGI.
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        token = use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        return self._finish(request, response)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        token = use_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        return self._finish(request, response)
+
+    def _finish(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin(response)
+        return response
+
+    def _route(self, request):
+        if not self.enabled or request.method not in SAFE_METHODS:
+            return
+        match = request.resolver_match
+        if match and match.url_name in self.views and not is_pinned(request):
+            use_replica.set(True)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self._route(request)
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self._route(request)
+        return None
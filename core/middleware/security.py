@@ -1,43 +1,140 @@
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.deprecation import MiddlewareMixin
 
+# Settings that feed into the header set; changing any of them (in tests via
+# override_settings) throws the precompiled headers away.
+HEADER_SETTINGS = {
+    "SECURE_REFERRER_POLICY",
+    "CSP_DEFAULT_SRC",
+    "CSP_SCRIPT_SRC",
+    "CSP_STYLE_SRC",
+    "CSP_IMG_SRC",
+    "CSP_CONNECT_SRC",
+    "SECURITY_HEADERS_PATH_OVERRIDES",
+}
+
+CSP_DIRECTIVES = (
+    ("default-src", "CSP_DEFAULT_SRC"),
+    ("script-src", "CSP_SCRIPT_SRC"),
+    ("style-src", "CSP_STYLE_SRC"),
+    ("img-src", "CSP_IMG_SRC"),
+    ("connect-src", "CSP_CONNECT_SRC"),
+)
+
+_generation = 0
+
+
+@receiver(setting_changed)
+def _reset_headers(setting, **kwargs):
+    global _generation
+    if setting in HEADER_SETTINGS:
+        _generation += 1
+
+
+def build_csp(directives: dict) -> str:
+    return " ".join(f"{name} {' '.join(sources)};" for name, sources in directives.items())
+
+
+def build_header_set(overrides=None) -> dict:
+    """
+    The full header dictionary for one policy.
+
+    `overrides` is one entry of SECURITY_HEADERS_PATH_OVERRIDES:
+        {"csp": {"script-src": ("'self'",)}, "headers": {"X-Frame-Options": "SAMEORIGIN"}}
+    CSP directives are merged over the site-wide ones; headers replace.
+    """
+    overrides = overrides or {}
+
+    directives = {
+        name: tuple(getattr(settings, setting, ("'self'",)))
+        for name, setting in CSP_DIRECTIVES
+    }
+    directives.update(overrides.get("csp", {}))
+
+    headers = {
+        # Prevent framing (click-jacking)
+        "X-Frame-Options": "DENY",
+        # XSS protection
+        "X-XSS-Protection": "1; mode=block",
+        # MIME-sniffing protection
+        "X-Content-Type-Options": "nosniff",
+        # Referrer policy
+        "Referrer-Policy": getattr(
+            settings, "SECURE_REFERRER_POLICY", "strict-origin-when-cross-origin"
+        ),
+        # Content Security Policy (CSP)
+        "Content-Security-Policy": build_csp(directives),
+    }
+    headers.update(overrides.get("headers", {}))
+    return headers
+
+
+class PathPolicyTrie:
+    """
+    Maps URL path prefixes to header sets, one trie node per path segment.
+    Lookup walks the request path's segments and returns the deepest
+    policy found, i.e. the longest matching prefix.
+    """
+
+    def __init__(self, default: dict):
+        self.root = {"policy": default, "children": {}}
+
+    def insert(self, prefix: str, policy: dict):
+        node = self.root
+        for segment in self._segments(prefix):
+            node = node["children"].setdefault(segment, {"policy": None, "children": {}})
+        node["policy"] = policy
+
+    def lookup(self, path: str) -> dict:
+        node = self.root
+        policy = node["policy"]
+        for segment in self._segments(path):
+            node = node["children"].get(segment)
+            if node is None:
+                break
+            if node["policy"] is not None:
+                policy = node["policy"]
+        return policy
+
+    @staticmethod
+    def _segments(path: str):
+        return [s for s in path.split("/") if s]
+
+
+def build_policies() -> PathPolicyTrie:
+    trie = PathPolicyTrie(build_header_set())
+    overrides = getattr(settings, "SECURITY_HEADERS_PATH_OVERRIDES", {})
+    for prefix, override in overrides.items():
+        trie.insert(prefix, build_header_set(override))
+    return trie
+
+
 class SecurityHeadersMiddleware(MiddlewareMixin):
     """
     Adds strong HTTP security headers to every response.
     These work together with the SECURE_* settings in settings.py.
+
+    All header values are built once, when the middleware is created (and
+    again if one of the settings changes), so a response only pays for a
+    trie lookup and a few setdefault() calls. Per-path policies come from
+    settings.SECURITY_HEADERS_PATH_OVERRIDES, keyed by path prefix.
     """
 
-    def process_response(self, request, response):
-        # Prevent framing (click-jacking)
-        response.setdefault("X-Frame-Options", "DENY")
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self._load()
 
-        # XSS protection
-        response.setdefault("X-XSS-Protection", "1; mode=block")
+    def _load(self):
+        self._generation = _generation
+        self.policies = build_policies()
 
-        # MIME-sniffing protection
-        response.setdefault("X-Content-Type-Options", "nosniff")
-
-        # Referrer policy
-        response.setdefault(
-            "Referrer-Policy",
-            getattr(settings, "SECURE_REFERRER_POLICY", "strict-origin-when-cross-origin"),
-        )
+    def process_response(self, request, response):
+        if self._generation != _generation:
+            self._load()
 
-        # Content Security Policy (CSP)
-        csp = getattr(settings, "CSP_DEFAULT_SRC", ("'self'",))
-        script_src = getattr(settings, "CSP_SCRIPT_SRC", ("'self'",))
-        style_src = getattr(settings, "CSP_STYLE_SRC", ("'self'",))
-        img_src = getattr(settings, "CSP_IMG_SRC", ("'self'",))
-        connect_src = getattr(settings, "CSP_CONNECT_SRC", ("'self'",))
-
-        # Combine to one header
-        csp_directives = [
-            f"default-src {' '.join(csp)};",
-            f"script-src {' '.join(script_src)};",
-            f"style-src {' '.join(style_src)};",
-            f"img-src {' '.join(img_src)};",
-            f"connect-src {' '.join(connect_src)};",
-        ]
-        response.setdefault("Content-Security-Policy", " ".join(csp_directives))
+        for name, value in self.policies.lookup(request.path).items():
+            response.setdefault(name, value)
 
         return response
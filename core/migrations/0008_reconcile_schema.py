@@ -0,0 +1,184 @@
+"""
+Bring the migration state in line with models.py, step 1 of 3.
+
+Migrations 0001-0007 describe an older schema (Chat with auth.User
+participants, PublicAnswer.lawyer -> auth.User, renamed profile fields,
+the Profile/BillingProfile/GeneralQuestion tables) that models.py no
+longer matches. This step renames what maps one-to-one and adds the new
+columns, including nullable *_profile foreign keys next to the old
+auth.User ones. 0009 fills them in; 0010 drops the old columns and takes
+the new ones' final names.
+
+Schema changes, data changes and the cleanup are separate migrations so
+PostgreSQL never alters a table with pending deferred-FK trigger events.
+"""
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_chat_models"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # CustomerProfile.
+        migrations.RenameField(
+            model_name="customerprofile",
+            old_name="free_questions_left",
+            new_name="free_public_questions_remaining",
+        ),
+        migrations.AddField(
+            model_name="customerprofile",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="customerprofile",
+            name="user",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="customer_profile",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        # LawyerProfile.
+        migrations.RenameField(
+            model_name="lawyerprofile",
+            old_name="years_experience",
+            new_name="years_of_practice",
+        ),
+        migrations.RenameField(
+            model_name="lawyerprofile",
+            old_name="approved",
+            new_name="is_approved",
+        ),
+        migrations.AlterField(
+            model_name="lawyerprofile",
+            name="is_approved",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name="lawyerprofile",
+            name="speciality",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="lawyerprofile",
+            name="bio",
+            field=models.TextField(blank=True, default=""),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="lawyerprofile",
+            name="fee_per_chat",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name="lawyerprofile",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="lawyerprofile",
+            name="user",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lawyer_profile",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        # PublicQuestion.
+        migrations.AlterModelOptions(name="publicquestion", options={}),
+        migrations.AddField(
+            model_name="publicquestion",
+            name="is_answered",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="publicquestion",
+            name="customer_profile",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="core.customerprofile",
+            ),
+        ),
+        # PublicAnswer.
+        migrations.AlterField(
+            model_name="publicanswer",
+            name="question",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="answer_obj",
+                to="core.publicquestion",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="publicanswer",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddField(
+            model_name="publicanswer",
+            name="lawyer_profile",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="core.lawyerprofile",
+            ),
+        ),
+        # Chat -> ChatRoom.
+        migrations.AlterUniqueTogether(name="chat", unique_together=set()),
+        migrations.RenameModel(old_name="Chat", new_name="ChatRoom"),
+        migrations.AlterField(
+            model_name="chatroom",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="customer_profile",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="core.customerprofile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="lawyer_profile",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="core.lawyerprofile",
+            ),
+        ),
+        # ChatMessage.
+        migrations.AlterModelOptions(name="chatmessage", options={"ordering": ("created_at",)}),
+        migrations.RenameField(model_name="chatmessage", old_name="chat", new_name="room"),
+        migrations.AlterField(
+            model_name="chatmessage",
+            name="sender",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="chatmessage",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
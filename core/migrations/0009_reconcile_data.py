@@ -0,0 +1,119 @@
+"""
+Step 2 of 3 (see 0008): move data from the old columns to the new ones.
+
+  * questions created before 0005 keep their text in question_text;
+  * each legacy Profile (0006) carries over to the user's CustomerProfile
+    or LawyerProfile: approval, speciality, bio, fee, bar number and
+    years of practice fill what the lawyer profile lacks, a lawyer
+    approved in either place stays approved, and full_name becomes the
+    user's first/last name where those are empty;
+  * question/answer/chat participants move from auth.User to the user's
+    CustomerProfile / LawyerProfile, creating a profile where the user had
+    none (lawyer profiles with no legacy Profile behind them start
+    unapproved);
+  * answers whose lawyer account was deleted can't be kept (the new
+    foreign key is NOT NULL) and are removed;
+  * is_answered is set from the answers that remain;
+  * bar numbers are cut to the new 64-character limit.
+"""
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Length, Substr
+from django.utils import timezone
+
+
+def _profiles(model, user_ids, **defaults):
+    """{user_id: profile_id}, creating missing profiles."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    existing = dict(model.objects.filter(user_id__in=user_ids).values_list("user_id", "pk"))
+    for user_id in user_ids - existing.keys():
+        existing[user_id] = model.objects.create(user_id=user_id, **defaults).pk
+    return existing
+
+
+def _relink(queryset, old, new, mapping):
+    for user_id, profile_id in mapping.items():
+        queryset.filter(**{f"{old}_id": user_id}).update(**{f"{new}_id": profile_id})
+
+
+def _copy_legacy_profiles(apps):
+    Profile = apps.get_model("core", "Profile")
+    CustomerProfile = apps.get_model("core", "CustomerProfile")
+    LawyerProfile = apps.get_model("core", "LawyerProfile")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    this_year = timezone.now().year
+
+    for legacy in Profile.objects.iterator():
+        first, _, last = legacy.full_name.strip().partition(" ")
+        if first:
+            User.objects.filter(pk=legacy.user_id, first_name="", last_name="").update(
+                first_name=first[:150], last_name=last.strip()[:150]
+            )
+        if legacy.role != "lawyer":
+            CustomerProfile.objects.get_or_create(user_id=legacy.user_id)
+            continue
+
+        lawyer, _ = LawyerProfile.objects.get_or_create(
+            user_id=legacy.user_id, defaults={"is_approved": legacy.is_approved}
+        )
+        lawyer.is_approved = lawyer.is_approved or legacy.is_approved
+        lawyer.speciality = lawyer.speciality or legacy.specialty
+        lawyer.bio = lawyer.bio or legacy.bio
+        lawyer.bar_number = lawyer.bar_number or legacy.bar_number
+        if lawyer.fee_per_chat is None:
+            lawyer.fee_per_chat = legacy.fee_per_chat
+        start = legacy.practice_start_year
+        if not lawyer.years_of_practice and start and start <= this_year:
+            lawyer.years_of_practice = this_year - start
+        lawyer.save()
+
+
+def forwards(apps, schema_editor):
+    CustomerProfile = apps.get_model("core", "CustomerProfile")
+    LawyerProfile = apps.get_model("core", "LawyerProfile")
+    PublicQuestion = apps.get_model("core", "PublicQuestion")
+    PublicAnswer = apps.get_model("core", "PublicAnswer")
+    ChatRoom = apps.get_model("core", "ChatRoom")
+
+    PublicQuestion.objects.filter(question_text="").update(question_text=F("text"))
+    # Before the relinking below, so it finds these profiles and doesn't
+    # create unapproved ones for lawyers the old Profile had approved.
+    _copy_legacy_profiles(apps)
+
+    questions = PublicQuestion.objects.all()
+    customers = _profiles(CustomerProfile, questions.values_list("customer_id", flat=True))
+    _relink(questions, "customer", "customer_profile", customers)
+
+    answers = PublicAnswer.objects.all()
+    answers.filter(lawyer__isnull=True).delete()
+    lawyers = _profiles(
+        LawyerProfile, answers.values_list("lawyer_id", flat=True), is_approved=False
+    )
+    _relink(answers, "lawyer", "lawyer_profile", lawyers)
+
+    rooms = ChatRoom.objects.all()
+    customers = _profiles(CustomerProfile, rooms.values_list("customer_id", flat=True))
+    _relink(rooms, "customer", "customer_profile", customers)
+    lawyers = _profiles(
+        LawyerProfile, rooms.values_list("lawyer_id", flat=True), is_approved=False
+    )
+    _relink(rooms, "lawyer", "lawyer_profile", lawyers)
+
+    PublicQuestion.objects.update(
+        is_answered=Exists(PublicAnswer.objects.filter(question=OuterRef("pk")))
+    )
+    LawyerProfile.objects.alias(length=Length("bar_number")).filter(length__gt=64).update(
+        bar_number=Substr("bar_number", 1, 64)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_reconcile_schema"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
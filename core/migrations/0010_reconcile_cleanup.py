@@ -0,0 +1,98 @@
+"""
+Step 3 of 3 (see 0008): drop the old columns and tables, and give the new
+foreign keys their final names and constraints.
+
+Dropped for good: LawyerProfile.law_school / bar_certificate and
+ChatRoom.is_active, which models.py has no more. The legacy Profile,
+BillingProfile and GeneralQuestion tables are left alone here; 0019
+drops them on its own.
+"""
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_reconcile_data"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # LawyerProfile.
+        migrations.RemoveField(model_name="lawyerprofile", name="law_school"),
+        migrations.RemoveField(model_name="lawyerprofile", name="bar_certificate"),
+        migrations.AlterField(
+            model_name="lawyerprofile",
+            name="bar_number",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        # PublicQuestion.
+        migrations.RemoveField(model_name="publicquestion", name="text"),
+        migrations.RemoveField(model_name="publicquestion", name="customer"),
+        migrations.RenameField(
+            model_name="publicquestion",
+            old_name="customer_profile",
+            new_name="customer",
+        ),
+        migrations.AlterField(
+            model_name="publicquestion",
+            name="customer",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="public_questions",
+                to="core.customerprofile",
+            ),
+        ),
+        # PublicAnswer.
+        migrations.RemoveField(model_name="publicanswer", name="lawyer"),
+        migrations.RenameField(
+            model_name="publicanswer",
+            old_name="lawyer_profile",
+            new_name="lawyer",
+        ),
+        migrations.AlterField(
+            model_name="publicanswer",
+            name="lawyer",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="public_answers",
+                to="core.lawyerprofile",
+            ),
+        ),
+        # ChatRoom.
+        migrations.RemoveField(model_name="chatroom", name="is_active"),
+        migrations.RemoveField(model_name="chatroom", name="customer"),
+        migrations.RemoveField(model_name="chatroom", name="lawyer"),
+        migrations.RenameField(
+            model_name="chatroom",
+            old_name="customer_profile",
+            new_name="customer",
+        ),
+        migrations.RenameField(
+            model_name="chatroom",
+            old_name="lawyer_profile",
+            new_name="lawyer",
+        ),
+        migrations.AlterField(
+            model_name="chatroom",
+            name="customer",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="chat_rooms",
+                to="core.customerprofile",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="chatroom",
+            name="lawyer",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="chat_rooms",
+                to="core.lawyerprofile",
+            ),
+        ),
+    ]
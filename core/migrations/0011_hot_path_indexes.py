@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_reconcile_cleanup"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="publicquestion",
+            index=models.Index(
+                condition=models.Q(("is_answered", True)),
+                fields=["-created_at", "-id"],
+                name="pq_answered_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="publicquestion",
+            index=models.Index(
+                fields=["customer", "-created_at", "-id"],
+                name="pq_customer_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lawyerprofile",
+            index=models.Index(
+                condition=models.Q(("is_approved", True)),
+                fields=["user"],
+                name="lawyer_approved_user_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chatmessage",
+            index=models.Index(
+                fields=["room", "created_at", "id"],
+                name="chatmsg_room_created_idx",
+            ),
+        ),
+        # auth_user is not ours to add Meta indexes to, but the Lawyers List
+        # sorts on these columns, so give SQLite an ordered path through it.
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX IF NOT EXISTS core_auth_user_name_idx "
+                "ON auth_user (last_name, first_name, username);"
+            ),
+            reverse_sql="DROP INDEX IF EXISTS core_auth_user_name_idx;",
+        ),
+    ]
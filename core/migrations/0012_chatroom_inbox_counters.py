@@ -0,0 +1,75 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def backfill_inbox_state(apps, schema_editor):
+    """
+    Rooms that already have messages: point last_activity/last_message at
+    the newest one and treat existing history as read.
+    """
+    ChatRoom = apps.get_model("core", "ChatRoom")
+    ChatMessage = apps.get_model("core", "ChatMessage")
+
+    newest = ChatMessage.objects.filter(room=OuterRef("pk")).order_by("-id")
+    ChatRoom.objects.filter(pk__in=ChatMessage.objects.values("room_id")).update(
+        last_activity_at=Subquery(newest.values("created_at")[:1]),
+        last_message_id=Subquery(newest.values("id")[:1]),
+        customer_last_read_id=Subquery(newest.values("id")[:1]),
+        lawyer_last_read_id=Subquery(newest.values("id")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_activity_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_message_id",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="customer_last_read_id",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="lawyer_last_read_id",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="customer_unread",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="lawyer_unread",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="chatroom",
+            index=models.Index(
+                fields=["customer", "-last_activity_at", "-id"],
+                name="chatroom_customer_inbox_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chatroom",
+            index=models.Index(
+                fields=["lawyer", "-last_activity_at", "-id"],
+                name="chatroom_lawyer_inbox_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_inbox_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    """The FTS5 table only exists on SQLite builds that have FTS5."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS core_question_fts USING fts5("
+            " question_text, answer_text,"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        # No FTS5 in this SQLite build; search uses the python backend.
+        pass
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS core_question_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_chatroom_inbox_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "question",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="core.publicquestion",
+                    ),
+                ),
+                ("length", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SearchPosting",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                ("frequency", models.PositiveIntegerField(default=1)),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="postings",
+                        to="core.searchdocument",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["term", "document"], name="search_term_idx"),
+                ],
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
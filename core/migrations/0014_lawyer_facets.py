@@ -0,0 +1,112 @@
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_facets(apps, schema_editor):
+    from core.models import experience_bucket, fee_bucket, speciality_key
+
+    LawyerProfile = apps.get_model("core", "LawyerProfile")
+    LawyerFacetCell = apps.get_model("core", "LawyerFacetCell")
+
+    lawyers = list(LawyerProfile.objects.only("id", "speciality", "years_of_practice", "fee_per_chat"))
+    for lawyer in lawyers:
+        lawyer.speciality_key = speciality_key(lawyer.speciality)
+        lawyer.experience_bucket = experience_bucket(lawyer.years_of_practice)
+        lawyer.fee_bucket = fee_bucket(lawyer.fee_per_chat)
+    LawyerProfile.objects.bulk_update(
+        lawyers, ["speciality_key", "experience_bucket", "fee_bucket"], batch_size=2000
+    )
+
+    groups = (
+        LawyerProfile.objects.filter(is_approved=True)
+        .values("speciality_key", "experience_bucket", "fee_bucket")
+        .annotate(n=Count("id"), label=Max("speciality"))
+        .order_by()
+    )
+    LawyerFacetCell.objects.bulk_create(
+        LawyerFacetCell(
+            speciality_key=g["speciality_key"],
+            speciality_label=(g["label"] or "").strip(),
+            experience_bucket=g["experience_bucket"],
+            fee_bucket=g["fee_bucket"],
+            count=g["n"],
+        )
+        for g in groups
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lawyerprofile",
+            name="speciality_key",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="lawyerprofile",
+            name="experience_bucket",
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name="lawyerprofile",
+            name="fee_bucket",
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name="lawyerprofile",
+            index=models.Index(
+                condition=models.Q(("is_approved", True)),
+                fields=["speciality_key", "experience_bucket", "fee_bucket"],
+                name="lawyer_facet_spec_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lawyerprofile",
+            index=models.Index(
+                condition=models.Q(("is_approved", True)),
+                fields=["experience_bucket", "fee_bucket"],
+                name="lawyer_facet_exp_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lawyerprofile",
+            index=models.Index(
+                condition=models.Q(("is_approved", True)),
+                fields=["fee_bucket"],
+                name="lawyer_facet_fee_idx",
+            ),
+        ),
+        migrations.CreateModel(
+            name="LawyerFacetCell",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("speciality_key", models.CharField(blank=True, max_length=64)),
+                ("speciality_label", models.CharField(blank=True, max_length=255)),
+                ("experience_bucket", models.CharField(max_length=16)),
+                ("fee_bucket", models.CharField(max_length=16)),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("speciality_key", "experience_bucket", "fee_bucket"),
+                        name="lawyer_facet_cell_unique",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
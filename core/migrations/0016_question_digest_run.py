@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_task_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionDigestRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("after_question_id", models.PositiveBigIntegerField(unique=True)),
+                ("last_question_id", models.PositiveBigIntegerField(db_index=True)),
+                ("questions", models.PositiveIntegerField(default=0)),
+                ("emails", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+GROUPS = ["questions", "lawyers", "marketing"]
+
+
+def create_groups(apps, schema_editor):
+    CacheGeneration = apps.get_model("core", "CacheGeneration")
+    CacheGeneration.objects.bulk_create(
+        [CacheGeneration(group=group) for group in GROUPS], ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_question_digest_run"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheGeneration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("group", models.CharField(max_length=32, unique=True)),
+                ("generation", models.PositiveBigIntegerField(default=1)),
+                ("changed_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_groups, migrations.RunPython.noop),
+    ]
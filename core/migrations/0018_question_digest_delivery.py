@@ -0,0 +1,69 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def complete_existing_runs(apps, schema_editor):
+    # Runs from before delivery tracking either finished or were deleted on
+    # failure; none must be resumed and mailed again.
+    QuestionDigestRun = apps.get_model("core", "QuestionDigestRun")
+    QuestionDigestRun.objects.update(completed_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_cache_generation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="questiondigestrun",
+            name="completed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="questiondigestrun",
+            name="locked_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(complete_existing_runs, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="questiondigestrun",
+            index=models.Index(
+                condition=models.Q(("completed_at__isnull", True)),
+                fields=["locked_until"],
+                name="digest_run_unfinished_idx",
+            ),
+        ),
+        migrations.CreateModel(
+            name="QuestionDigestDelivery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("email", models.EmailField(max_length=254)),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deliveries",
+                        to="core.questiondigestrun",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run", "email"), name="digest_delivery_unique"
+                    ),
+                ],
+            },
+        ),
+    ]
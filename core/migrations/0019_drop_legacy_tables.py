@@ -0,0 +1,41 @@
+"""
+Drop the legacy Profile, BillingProfile and GeneralQuestion tables, which
+models.py no longer has.
+
+Profile was copied to CustomerProfile / LawyerProfile by 0009. Billing
+methods and general questions have no home in the current schema, so
+this migration refuses to run while either table still holds rows: copy
+them somewhere first (e.g. `manage.py dbshell`), empty the tables, and
+run migrate again.
+"""
+from django.db import migrations
+
+
+def check_nothing_is_lost(apps, schema_editor):
+    BillingProfile = apps.get_model("core", "BillingProfile")
+    GeneralQuestion = apps.get_model("core", "GeneralQuestion")
+    left = {
+        model._meta.db_table: model.objects.count()
+        for model in (BillingProfile, GeneralQuestion)
+    }
+    left = {table: count for table, count in left.items() if count}
+    if left:
+        rows = ", ".join(f"{table} ({count} rows)" for table, count in sorted(left.items()))
+        raise RuntimeError(
+            f"Not dropping legacy tables that still hold data: {rows}. "
+            "Copy the rows out and delete them, then migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_question_digest_delivery"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_nothing_is_lost, migrations.RunPython.noop),
+        migrations.DeleteModel(name="BillingProfile"),
+        migrations.DeleteModel(name="Profile"),
+        migrations.DeleteModel(name="GeneralQuestion"),
+    ]
@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class CustomerProfile(models.Model):
@@ -21,9 +23,50 @@ class CustomerProfile(models.Model):
         return f"CustomerProfile({self.user.username})"
 
 
+# Lawyers List facet buckets: (key, label, lower bound, upper bound).
+EXPERIENCE_BUCKETS = (
+    ("0-2", "0–2 years", 0, 2),
+    ("3-5", "3–5 years", 3, 5),
+    ("6-10", "6–10 years", 6, 10),
+    ("11-20", "11–20 years", 11, 20),
+    ("21+", "21+ years", 21, None),
+)
+FEE_BUCKETS = (
+    ("under-50", "Under $50", 0, 50),
+    ("50-100", "$50–$100", 50, 100),
+    ("100-200", "$100–$200", 100, 200),
+    ("200+", "$200+", 200, None),
+)
+FEE_UNLISTED = "unlisted"
+
+
+def experience_bucket(years) -> str:
+    years = years or 0
+    for key, _, low, high in EXPERIENCE_BUCKETS:
+        if years >= low and (high is None or years <= high):
+            return key
+    return EXPERIENCE_BUCKETS[0][0]
+
+
+def fee_bucket(fee) -> str:
+    if fee is None:
+        return FEE_UNLISTED
+    for key, _, low, high in FEE_BUCKETS:
+        if fee >= low and (high is None or fee < high):
+            return key
+    return FEE_BUCKETS[0][0]
+
+
+def speciality_key(speciality) -> str:
+    return " ".join((speciality or "").split()).lower()[:64]
+
+
 class LawyerProfile(models.Model):
     """
     Basic lawyer profile used on the Lawyers List page.
+
+    speciality_key / experience_bucket / fee_bucket are derived on save()
+    so the directory can filter on plain indexed equality.
     """
     user = models.OneToOneField(
         User,
@@ -45,15 +88,103 @@ class LawyerProfile(models.Model):
     )  # treat as approved; keeps Lawyers List working
     created_at = models.DateTimeField(auto_now_add=True)
 
+    speciality_key = models.CharField(max_length=64, blank=True, editable=False)
+    experience_bucket = models.CharField(max_length=16, blank=True, editable=False)
+    fee_bucket = models.CharField(max_length=16, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Lawyers List: approved lawyers joined to auth_user, which
+            # carries its own (last_name, first_name, username) index
+            # (added by migration 0011) for the sort.
+            models.Index(
+                fields=["user"],
+                name="lawyer_approved_user_idx",
+                condition=models.Q(is_approved=True),
+            ),
+            # Directory facets (approved lawyers only).
+            models.Index(
+                fields=["speciality_key", "experience_bucket", "fee_bucket"],
+                name="lawyer_facet_spec_idx",
+                condition=models.Q(is_approved=True),
+            ),
+            models.Index(
+                fields=["experience_bucket", "fee_bucket"],
+                name="lawyer_facet_exp_idx",
+                condition=models.Q(is_approved=True),
+            ),
+            models.Index(
+                fields=["fee_bucket"],
+                name="lawyer_facet_fee_idx",
+                condition=models.Q(is_approved=True),
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"LawyerProfile({self.user.username})"
 
+    def save(self, *args, **kwargs):
+        self.speciality_key = speciality_key(self.speciality)
+        self.experience_bucket = experience_bucket(self.years_of_practice)
+        self.fee_bucket = fee_bucket(self.fee_per_chat)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {
+                "speciality_key",
+                "experience_bucket",
+                "fee_bucket",
+            }
+        super().save(*args, **kwargs)
+
+    @property
+    def facet_cell(self):
+        """The LawyerFacetCell this profile counts towards (None if hidden)."""
+        if not self.is_approved:
+            return None
+        return (self.speciality_key, self.experience_bucket, self.fee_bucket)
+
     @property
     def name(self) -> str:
         full = (self.user.get_full_name() or "").strip()
         return full or self.user.username
 
 
+class PublicQuestionQuerySet(models.QuerySet):
+    """
+    Feed queries for PublicQuestion.
+
+    The question pages only render the question text, the answer text and
+    the answering lawyer's name, so the feeds load exactly those columns and
+    pull the answer + lawyer + user in the same JOIN (no per-row lookups).
+    """
+
+    FEED_FIELDS = (
+        "id",
+        "question_text",
+        "created_at",
+        "is_answered",
+        "answer_obj__id",
+        "answer_obj__question",
+        "answer_obj__answer_text",
+        "answer_obj__lawyer",
+        "answer_obj__lawyer__user",
+        "answer_obj__lawyer__user__username",
+        "answer_obj__lawyer__user__first_name",
+        "answer_obj__lawyer__user__last_name",
+    )
+
+    def with_answers(self):
+        return self.select_related("answer_obj__lawyer__user").only(
+            *self.FEED_FIELDS
+        )
+
+    def answered(self):
+        return self.filter(is_answered=True)
+
+    def newest_first(self):
+        return self.order_by("-created_at", "-id")
+
+
 class PublicQuestion(models.Model):
     """
     Public questions shown on the Public Questions page.
@@ -71,6 +202,23 @@ class PublicQuestion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_answered = models.BooleanField(default=False)
 
+    objects = PublicQuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Public Questions feed: answered only, newest first.
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="pq_answered_feed_idx",
+                condition=models.Q(is_answered=True),
+            ),
+            # My Questions: one customer's questions, newest first.
+            models.Index(
+                fields=["customer", "-created_at", "-id"],
+                name="pq_customer_feed_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"PublicQuestion({self.pk})"
 
@@ -106,6 +254,27 @@ class PublicAnswer(models.Model):
         return f"PublicAnswer(q={self.question_id}, lawyer={self.lawyer.user.username})"
 
 
+class ChatRoomQuerySet(models.QuerySet):
+    """
+    Inbox queries: one indexed scan of a participant's rooms, newest
+    activity first, with the other participant preloaded.
+    """
+
+    def inbox_for_customer(self, customer):
+        return (
+            self.filter(customer=customer)
+            .select_related("lawyer__user")
+            .order_by("-last_activity_at", "-id")
+        )
+
+    def inbox_for_lawyer(self, lawyer):
+        return (
+            self.filter(lawyer=lawyer)
+            .select_related("customer__user")
+            .order_by("-last_activity_at", "-id")
+        )
+
+
 class ChatRoom(models.Model):
     """
     Simple chat room between a customer and a lawyer.
@@ -123,9 +292,155 @@ class ChatRoom(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized inbox state, kept current by post_message() / mark_read()
+    # so the inbox never has to look at ChatMessage.
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    last_message_id = models.PositiveBigIntegerField(default=0)
+    customer_last_read_id = models.PositiveBigIntegerField(default=0)
+    lawyer_last_read_id = models.PositiveBigIntegerField(default=0)
+    customer_unread = models.PositiveIntegerField(default=0)
+    lawyer_unread = models.PositiveIntegerField(default=0)
+
+    objects = ChatRoomQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Inboxes: a participant's rooms by most recent activity.
+            models.Index(
+                fields=["customer", "-last_activity_at", "-id"],
+                name="chatroom_customer_inbox_idx",
+            ),
+            models.Index(
+                fields=["lawyer", "-last_activity_at", "-id"],
+                name="chatroom_lawyer_inbox_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"ChatRoom({self.customer.user.username} ↔ {self.lawyer.user.username})"
 
+    def side_for(self, user) -> str:
+        """
+        "customer" or "lawyer": which participant `user` is in this room.
+        """
+        return "lawyer" if user.pk == self.lawyer.user_id else "customer"
+
+    @staticmethod
+    def other_side(side: str) -> str:
+        return "customer" if side == "lawyer" else "lawyer"
+
+    def post_message(self, sender, text):
+        """
+        Write a message and bump the inbox counters in the same transaction.
+        The counters are updated with F() expressions, so concurrent senders
+        never lose an increment.
+        """
+        side = self.side_for(sender)
+        other = self.other_side(side)
+        with transaction.atomic():
+            message = ChatMessage.objects.create(room=self, sender=sender, message=text)
+            ChatRoom.objects.filter(pk=self.pk).update(
+                last_activity_at=message.created_at,
+                last_message_id=message.pk,
+                **{
+                    f"{other}_unread": F(f"{other}_unread") + 1,
+                    f"{side}_last_read_id": message.pk,
+                    f"{side}_unread": 0,
+                },
+            )
+        return message
+
+    def mark_read(self, user, up_to_id):
+        """
+        Move `user`'s read cursor forward to `up_to_id`. Reading up to the
+        latest message is a single UPDATE; if newer messages arrived in the
+        meantime the remaining unread ones are counted from the cursor on.
+
+        `up_to_id` comes from the client, so it is clamped to the room's
+        last message, and ids at or behind the current cursor are ignored.
+        """
+        side = self.side_for(user)
+        up_to_id = min(up_to_id, self.last_message_id)
+        if up_to_id <= getattr(self, f"{side}_last_read_id"):
+            return
+        other_user_id = self.customer.user_id if side == "lawyer" else self.lawyer.user_id
+        rooms = ChatRoom.objects.filter(pk=self.pk, **{f"{side}_last_read_id__lt": up_to_id})
+
+        updated = rooms.filter(last_message_id__lte=up_to_id).update(
+            **{f"{side}_last_read_id": up_to_id, f"{side}_unread": 0}
+        )
+        if updated:
+            return
+
+        remaining = self.messages.filter(id__gt=up_to_id, sender_id=other_user_id).count()
+        rooms.update(**{f"{side}_last_read_id": up_to_id, f"{side}_unread": remaining})
+
+    def unread_for(self, user) -> int:
+        return getattr(self, f"{self.side_for(user)}_unread")
+
+    # Message windows: each returns (messages oldest-first, has_more).
+
+    def latest_messages(self, limit=50):
+        return self.messages.latest_window(limit)
+
+    def messages_before(self, message_id, limit=50):
+        return self.messages.window_before(message_id, limit)
+
+    def messages_after(self, message_id, limit=50):
+        return self.messages.window_after(message_id, limit)
+
+
+class ChatMessageQuerySet(models.QuerySet):
+    """
+    Windowed reads of a room's messages.
+
+    Each window is a keyset query on the message id (which grows with
+    created_at), so "the 50 before X" costs the same at the start of a long
+    consultation as at the end. Every method returns (messages, has_more),
+    with messages oldest first and senders preloaded.
+    """
+
+    @staticmethod
+    def _window_query(qs, limit, newest_first):
+        qs = qs.select_related("sender").order_by("-id" if newest_first else "id")
+        return qs[: limit + 1]
+
+    @staticmethod
+    def _trim(rows, limit, newest_first):
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if newest_first:
+            rows.reverse()
+        return rows, has_more
+
+    def _window(self, qs, limit, newest_first):
+        rows = list(self._window_query(qs, limit, newest_first))
+        return self._trim(rows, limit, newest_first)
+
+    async def _awindow(self, qs, limit, newest_first):
+        rows = [m async for m in self._window_query(qs, limit, newest_first)]
+        return self._trim(rows, limit, newest_first)
+
+    def latest_window(self, limit):
+        return self._window(self, limit, newest_first=True)
+
+    def window_before(self, message_id, limit):
+        return self._window(self.filter(id__lt=message_id), limit, newest_first=True)
+
+    def window_after(self, message_id, limit):
+        return self._window(self.filter(id__gt=message_id), limit, newest_first=False)
+
+    # Async twins, for core.async_views.
+
+    async def alatest_window(self, limit):
+        return await self._awindow(self, limit, newest_first=True)
+
+    async def awindow_before(self, message_id, limit):
+        return await self._awindow(self.filter(id__lt=message_id), limit, newest_first=True)
+
+    async def awindow_after(self, message_id, limit):
+        return await self._awindow(self.filter(id__gt=message_id), limit, newest_first=False)
+
 
 class ChatMessage(models.Model):
     """
@@ -140,8 +455,205 @@ class ChatMessage(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ChatMessageQuerySet.as_manager()
+
     class Meta:
         ordering = ("created_at",)
+        indexes = [
+            # Every message query is "this room, in order".
+            models.Index(
+                fields=["room", "created_at", "id"],
+                name="chatmsg_room_created_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"ChatMessage(room={self.room_id}, sender={self.sender.username})"
+
+
+class SearchDocument(models.Model):
+    """
+    One answered question in the portable search index (core.search's
+    "python" backend; the SQLite build uses an FTS5 table instead).
+    """
+    question = models.OneToOneField(
+        PublicQuestion,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    length = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"SearchDocument(q={self.question_id})"
+
+
+class SearchPosting(models.Model):
+    """
+    Inverted-index entry: how often `term` occurs in one document.
+    """
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(
+        SearchDocument,
+        on_delete=models.CASCADE,
+        related_name="postings",
+    )
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Exact and prefix (a term range, see core.search) lookups.
+            models.Index(fields=["term", "document"], name="search_term_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"SearchPosting({self.term!r}, q={self.document_id})"
+
+
+class LawyerFacetCell(models.Model):
+    """
+    Number of approved lawyers per (speciality, experience, fee) bucket
+    combination. Maintained by core.signals on every LawyerProfile
+    save/delete, so facet counts for any filter are a SUM over this small
+    table instead of a GROUP BY over every lawyer.
+    """
+    speciality_key = models.CharField(max_length=64, blank=True)
+    speciality_label = models.CharField(max_length=255, blank=True)
+    experience_bucket = models.CharField(max_length=16)
+    fee_bucket = models.CharField(max_length=16)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["speciality_key", "experience_bucket", "fee_bucket"],
+                name="lawyer_facet_cell_unique",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f"LawyerFacetCell({self.speciality_key!r}, {self.experience_bucket}, "
+            f"{self.fee_bucket}: {self.count})"
+        )
+
+
+class Task(models.Model):
+    """
+    One unit of background work for core.taskqueue: a registered task name
+    plus its JSON payload. Pending tasks with the same dedup_key collapse
+    into one.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # A running task whose lease has expired belonged to a worker that died;
+    # it is claimed again.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claiming: due pending tasks, oldest first.
+            models.Index(
+                fields=["run_at", "id"],
+                name="task_due_idx",
+                condition=models.Q(status="pending"),
+            ),
+            models.Index(
+                fields=["locked_until"],
+                name="task_lease_idx",
+                condition=models.Q(status="running"),
+            ),
+        ]
+        constraints = [
+            # At most one queued copy per key; a running one doesn't count,
+            # so work enqueued while it runs still gets its own run.
+            models.UniqueConstraint(
+                fields=["dedup_key"],
+                condition=models.Q(status="pending"),
+                name="task_pending_dedup",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Task({self.name}, {self.status})"
+
+
+class QuestionDigestRun(models.Model):
+    """
+    One pass of core.digests over the public questions with
+    after_question_id < id <= last_question_id. The next pass starts after
+    the highest last_question_id. after_question_id is unique, so two
+    overlapping passes can't both claim the same questions.
+
+    A run stays unfinished (completed_at unset) until every digest is
+    sent; a later pass resumes it, skipping its deliveries.
+    """
+    after_question_id = models.PositiveBigIntegerField(unique=True)
+    last_question_id = models.PositiveBigIntegerField(db_index=True)
+    questions = models.PositiveIntegerField(default=0)
+    emails = models.PositiveIntegerField(default=0)
+    # Held while a pass is sending; an unfinished run whose lease has
+    # expired belonged to a pass that failed or died, and is resumed.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["locked_until"],
+                name="digest_run_unfinished_idx",
+                condition=models.Q(completed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"QuestionDigestRun({self.after_question_id}..{self.last_question_id})"
+
+
+class QuestionDigestDelivery(models.Model):
+    """One address a QuestionDigestRun has mailed, so a resumed run skips it."""
+    run = models.ForeignKey(QuestionDigestRun, on_delete=models.CASCADE, related_name="deliveries")
+    email = models.EmailField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["run", "email"], name="digest_delivery_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"QuestionDigestDelivery({self.run_id}, {self.email})"
+
+
+class CacheGeneration(models.Model):
+    """
+    The generation of one core.caching group ("questions", "lawyers", ...).
+    Cached pages, fragments and validators are keyed by it; bumping it
+    (after the writing transaction commits) makes every worker miss its
+    old entries at once, whatever cache backend each one has.
+    """
+    group = models.CharField(max_length=32, unique=True)
+    generation = models.PositiveBigIntegerField(default=1)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"CacheGeneration({self.group}={self.generation})"
@@ -0,0 +1,270 @@
+"""
+Keyset (cursor) pagination for the list pages.
+
+Pages are addressed by an opaque cursor holding the sort-key values of the
+row at the page boundary, and the next page is fetched with a plain
+"WHERE key > boundary ORDER BY key LIMIT n" query. There is never an
+OFFSET, so the last page costs the same as the first.
+
+The ordering passed in must be a total order (end with a unique column),
+otherwise rows sharing a key at a page boundary could be skipped.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+NEXT = "n"
+PREV = "p"
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str | None
+    prev_cursor: str | None
+    # The request's other query parameters (filters), urlencoded, so page
+    # links can carry them along.
+    base_query: str = ""
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.prev_cursor is not None
+
+
+# CURSOR ENCODING -------------------------------------------------------------
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values, direction: str) -> str:
+    payload = json.dumps(
+        {"d": direction, "v": [_jsonable(v) for v in values]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _key_field(model, key: str):
+    """The model field a key path like "user__last_name" ends at."""
+    *relations, name = key.split("__")
+    for part in relations:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(name)
+
+
+def decode_cursor(cursor: str, keys, model):
+    """
+    Returns (direction, values), each value converted by its key field's
+    to_python(). Raises BadRequest for anything malformed (bad encoding,
+    wrong shape, null or wrongly typed values), so a tampered cursor is a
+    400 rather than a 500.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, values = data["d"], data["v"]
+    except (ValueError, TypeError, KeyError):
+        raise BadRequest("Invalid page cursor.")
+
+    if direction not in (NEXT, PREV) or not isinstance(values, list):
+        raise BadRequest("Invalid page cursor.")
+    if len(values) != len(keys):
+        raise BadRequest("Invalid page cursor.")
+
+    converted = []
+    for (key, _), value in zip(keys, values):
+        if value is None:
+            raise BadRequest("Invalid page cursor.")
+        try:
+            value = _key_field(model, key).to_python(value)
+        except (ValidationError, ValueError, TypeError):
+            raise BadRequest("Invalid page cursor.")
+        if value is None:
+            raise BadRequest("Invalid page cursor.")
+        converted.append(value)
+    return direction, converted
+
+
+# QUERYING --------------------------------------------------------------------
+
+def _key_value(obj, key: str):
+    value = obj
+    for part in key.split("__"):
+        value = getattr(value, part)
+    return value
+
+
+def _after(keys, values, reverse: bool) -> Q:
+    """
+    Rows strictly after `values` in the given ordering:
+
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+
+    with the comparison flipped per key for descending columns (and flipped
+    again when walking backwards).
+
+    The redundant leading "k1 >= v1" gives the planner a range to seek on;
+    without it SQLite cannot use the sort index for the OR and falls back
+    to a temp B-tree sort.
+    """
+    condition = Q()
+    for i, (key, descending) in enumerate(keys):
+        lookup = "lt" if descending != reverse else "gt"
+        clause = Q(**{f"{key}__{lookup}": values[i]})
+        for j, (prev_key, _) in enumerate(keys[:i]):
+            clause &= Q(**{prev_key: values[j]})
+        condition |= clause
+
+    first_key, first_desc = keys[0]
+    seek = "lte" if first_desc != reverse else "gte"
+    return Q(**{f"{first_key}__{seek}": values[0]}) & condition
+
+
+def _order_by(keys, reverse: bool):
+    fields = []
+    for key, descending in keys:
+        desc = descending != reverse
+        fields.append(f"-{key}" if desc else key)
+    return fields
+
+
+def keyset_queryset(queryset, keys, values=None, reverse=False):
+    """
+    The ordered, filtered (but not yet sliced) queryset for one page.
+    """
+    keys = list(keys)
+    qs = queryset.order_by(*_order_by(keys, reverse))
+    if values is not None:
+        qs = qs.filter(_after(keys, values, reverse))
+    return qs
+
+
+def _page_query(queryset, keys, cursor, per_page):
+    """(sliced queryset, values, reverse) for one page."""
+    direction, values = NEXT, None
+    if cursor:
+        direction, values = decode_cursor(cursor, keys, queryset.model)
+
+    reverse = direction == PREV
+    qs = keyset_queryset(queryset, keys, values, reverse)
+    return qs[: per_page + 1], values, reverse
+
+
+def paginate(queryset, keys, cursor=None, per_page=DEFAULT_PAGE_SIZE) -> KeysetPage:
+    """
+    Return one KeysetPage of `queryset` ordered by `keys`.
+
+    `keys` is a sequence of (field_path, descending) tuples, e.g.
+    [("created_at", True), ("id", True)] for newest-first.
+    """
+    keys = list(keys)
+    qs, values, reverse = _page_query(queryset, keys, cursor, per_page)
+    return _build_page(list(qs), keys, values, reverse, per_page)
+
+
+async def apaginate(queryset, keys, cursor=None, per_page=DEFAULT_PAGE_SIZE) -> KeysetPage:
+    """paginate() for async views, through the async ORM."""
+    keys = list(keys)
+    qs, values, reverse = _page_query(queryset, keys, cursor, per_page)
+    return _build_page([row async for row in qs], keys, values, reverse, per_page)
+
+
+def _build_page(rows, keys, values, reverse, per_page) -> KeysetPage:
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage(items=[], next_cursor=None, prev_cursor=None)
+
+    first = [_key_value(rows[0], key) for key, _ in keys]
+    last = [_key_value(rows[-1], key) for key, _ in keys]
+
+    # Walking forward we know about the next page from the extra row and
+    # about the previous one from having a cursor at all; walking back it
+    # is the other way round.
+    if reverse:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, values is not None
+
+    return KeysetPage(
+        items=rows,
+        next_cursor=encode_cursor(last, NEXT) if has_next else None,
+        prev_cursor=encode_cursor(first, PREV) if has_prev else None,
+    )
+
+
+# VIEW HELPERS ----------------------------------------------------------------
+
+def page_size() -> int:
+    size = getattr(settings, "LIST_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    return max(1, min(int(size), MAX_PAGE_SIZE))
+
+
+def _base_query(request) -> str:
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    params.pop("format", None)
+    return params.urlencode()
+
+
+def paginate_request(request, queryset, keys) -> KeysetPage:
+    page = paginate(
+        queryset,
+        keys,
+        cursor=request.GET.get("cursor") or None,
+        per_page=page_size(),
+    )
+    page.base_query = _base_query(request)
+    return page
+
+
+async def apaginate_request(request, queryset, keys) -> KeysetPage:
+    page = await apaginate(
+        queryset,
+        keys,
+        cursor=request.GET.get("cursor") or None,
+        per_page=page_size(),
+    )
+    page.base_query = _base_query(request)
+    return page
+
+
+def wants_json(request) -> bool:
+    return request.GET.get("format") == "json"
+
+
+def page_json_response(page: KeysetPage, serialize, **extra) -> JsonResponse:
+    """
+    JSON variant of a list page for infinite-scroll clients. Keyword
+    arguments are added to the payload as-is.
+    """
+    return JsonResponse(
+        {
+            "results": [serialize(item) for item in page.items],
+            "next": page.next_cursor,
+            "previous": page.prev_cursor,
+            **extra,
+        }
+    )
@@ -0,0 +1,69 @@
+"""
+Free public-question quota (CustomerProfile.free_public_questions_remaining).
+
+Every operation is a single UPDATE evaluated by the database, never a
+read-modify-write in Python:
+
+  * consume() is `UPDATE ... SET n = n - 1 WHERE id = ? AND n > 0`; the
+    affected-row count says whether a question was available. Two tabs
+    submitting at once cannot both spend the last one, and no row lock is
+    taken beforehand (select_for_update would serialise every writer, and
+    SQLite has no row locks to begin with).
+  * grant() and reset_monthly() are one set-based statement over all (or
+    the given) customers; see `manage.py question_quota`.
+"""
+from django.conf import settings
+from django.db.models import F
+
+from .models import CustomerProfile
+
+FIELD = "free_public_questions_remaining"
+
+
+def monthly_allowance() -> int:
+    return getattr(settings, "FREE_PUBLIC_QUESTIONS_PER_MONTH", 2)
+
+
+def _customers(customer_ids=None):
+    qs = CustomerProfile.objects.all()
+    if customer_ids is not None:
+        qs = qs.filter(pk__in=customer_ids)
+    return qs
+
+
+def consume(customer_id, amount=1) -> bool:
+    """
+    Spend `amount` free questions for one customer. Returns False, and
+    changes nothing, if fewer than `amount` are left.
+    """
+    updated = CustomerProfile.objects.filter(
+        pk=customer_id, **{f"{FIELD}__gte": amount}
+    ).update(**{FIELD: F(FIELD) - amount})
+    return updated == 1
+
+
+def grant(amount, customer_ids=None) -> int:
+    """Add `amount` free questions to the given customers (default: all)."""
+    return _customers(customer_ids).update(**{FIELD: F(FIELD) + amount})
+
+
+def reset_monthly(allowance=None, top_up=False) -> int:
+    """
+    Start a new month: set every customer's quota to the allowance. With
+    `top_up`, customers holding more (from grants) keep their balance.
+    Returns the number of customers updated.
+    """
+    allowance = monthly_allowance() if allowance is None else allowance
+    qs = _customers()
+    if top_up:
+        qs = qs.filter(**{f"{FIELD}__lt": allowance})
+    return qs.update(**{FIELD: allowance})
+
+
+def remaining(customer_id) -> int:
+    return (
+        CustomerProfile.objects.filter(pk=customer_id)
+        .values_list(FIELD, flat=True)
+        .first()
+        or 0
+    )
@@ -0,0 +1,89 @@
+"""
+Which profiles the logged-in user has, read together with the user.
+
+RolesBackend (AUTHENTICATION_BACKENDS) loads the session's user with its
+customer and lawyer profile ids and the lawyer's approval annotated, in
+the same query the authentication middleware runs anyway. for_request()
+reads them back from the user, so authenticated pages make no role
+queries, and a profile created, deleted or (un)approved by any worker
+shows up on the user's next request: there is no copy in the session or
+the cache to go stale.
+
+Users loaded some other way (just authenticated, or by another backend)
+get their roles from one load() query, once per request.
+"""
+from dataclasses import dataclass
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models import F
+
+
+@dataclass(frozen=True)
+class Roles:
+    customer_id: int | None = None
+    lawyer_id: int | None = None
+    lawyer_approved: bool = False
+
+    @property
+    def is_customer(self) -> bool:
+        return self.customer_id is not None
+
+    @property
+    def is_lawyer(self) -> bool:
+        """An approved lawyer; unapproved ones only have lawyer_id."""
+        return self.lawyer_id is not None and self.lawyer_approved
+
+
+ANONYMOUS = Roles()
+
+
+def load(user_id) -> Roles:
+    row = (
+        User.objects.filter(pk=user_id)
+        .values_list("customer_profile__id", "lawyer_profile__id", "lawyer_profile__is_approved")
+        .first()
+    )
+    if row is None:
+        return ANONYMOUS
+    customer_id, lawyer_id, approved = row
+    return Roles(customer_id, lawyer_id, bool(approved))
+
+
+def with_roles(queryset):
+    """Users annotated with what Roles needs."""
+    return queryset.annotate(
+        roles_customer_id=F("customer_profile__id"),
+        roles_lawyer_id=F("lawyer_profile__id"),
+        roles_lawyer_approved=F("lawyer_profile__is_approved"),
+    )
+
+
+class RolesBackend(ModelBackend):
+    """ModelBackend whose session user comes with its roles annotated."""
+
+    def get_user(self, user_id):
+        user = with_roles(User._default_manager).filter(pk=user_id).first()
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await with_roles(User._default_manager).filter(pk=user_id).afirst()
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+def for_request(request) -> Roles:
+    roles = getattr(request, "_roles", None)
+    if roles is not None:
+        return roles
+
+    user = request.user
+    if not user.is_authenticated:
+        roles = ANONYMOUS
+    elif hasattr(user, "roles_customer_id"):
+        roles = Roles(
+            user.roles_customer_id, user.roles_lawyer_id, bool(user.roles_lawyer_approved)
+        )
+    else:
+        roles = load(user.pk)
+    request._roles = roles
+    return roles
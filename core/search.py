@@ -0,0 +1,355 @@
+"""
+Full-text search over answered public questions and their answers.
+
+Two interchangeable backends, picked by settings.SEARCH_BACKEND:
+
+    "fts5"    SQLite FTS5 virtual table (core_question_fts), BM25 ranking
+              and snippet() highlighting done inside SQLite.
+    "python"  A persistent inverted index in ordinary tables
+              (SearchDocument / SearchPosting) with BM25 scored in Python.
+              Works on any database.
+    "auto"    (default) fts5 when the connection is SQLite with FTS5
+              compiled in, python otherwise.
+
+Both index only answered questions, match every query word as a prefix
+("divor" finds "divorce"), and return SearchHit objects with an HTML-safe
+highlighted snippet. core.signals keeps the index in sync on save/delete;
+`manage.py rebuild_search_index` rebuilds it in bulk.
+"""
+import logging
+import math
+import re
+import sqlite3
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Avg, Count
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import PublicQuestion, SearchDocument, SearchPosting
+
+FTS_TABLE = "core_question_fts"
+# rowid is the question id, so single-question updates are rowid lookups.
+FTS_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    " question_text, answer_text,"
+    " tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+# BM25 parameters (same defaults as FTS5's bm25()).
+K1 = 1.2
+B = 0.75
+
+MAX_QUERY_TERMS = 8
+SNIPPET_WORDS = 12
+
+_HL_OPEN = "\x02"
+_HL_CLOSE = "\x03"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SearchHit:
+    question: PublicQuestion
+    score: float
+    snippet: str
+
+
+def tokenize(text: str):
+    return [t.lower() for t in TOKEN_RE.findall(text or "")]
+
+
+def query_terms(query: str):
+    """Unique query words, in order, capped at MAX_QUERY_TERMS."""
+    seen = []
+    for term in tokenize(query):
+        if term not in seen:
+            seen.append(term)
+    return seen[:MAX_QUERY_TERMS]
+
+
+def _highlighted(marked: str) -> str:
+    """Escape snippet text, then turn the highlight markers into <mark>."""
+    html = escape(marked).replace(_HL_OPEN, "<mark>").replace(_HL_CLOSE, "</mark>")
+    return mark_safe(html)
+
+
+def _answered_rows():
+    return PublicQuestion.objects.answered().select_related("answer_obj__lawyer__user")
+
+
+def _document_text(question):
+    answer = getattr(question, "answer_obj", None)
+    return question.question_text, answer.answer_text if answer else ""
+
+
+# FTS5 BACKEND ----------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def fts5_available() -> bool:
+    try:
+        probe = sqlite3.connect(":memory:")
+        probe.execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+        probe.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def fts_match_expression(terms) -> str:
+    # Each word quoted (so FTS5 syntax in user input is inert) and
+    # prefix-matched; juxtaposition is AND in FTS5.
+    return " ".join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+
+
+class Fts5Backend:
+    name = "fts5"
+
+    def ensure_schema(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                FTS_SCHEMA
+            )
+
+    def index(self, question):
+        question_text, answer_text = _document_text(question)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [question.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, question_text, answer_text)"
+                " VALUES (%s, %s, %s)",
+                [question.pk, question_text, answer_text],
+            )
+
+    def remove(self, question_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [question_id])
+
+    def rebuild(self):
+        self.ensure_schema()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, question_text, answer_text)"
+                " SELECT q.id, q.question_text, COALESCE(a.answer_text, '')"
+                " FROM core_publicquestion q"
+                " LEFT JOIN core_publicanswer a ON a.question_id = q.id"
+                " WHERE q.is_answered"
+            )
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+    def search(self, query, limit):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}) AS rank,"
+                f" snippet({FTS_TABLE}, -1, %s, %s, '…', %s)"
+                f" FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+                " ORDER BY rank LIMIT %s",
+                [_HL_OPEN, _HL_CLOSE, SNIPPET_WORDS, fts_match_expression(terms), limit],
+            )
+            rows = cursor.fetchall()
+
+        questions = _answered_rows().in_bulk([r[0] for r in rows])
+        return [
+            # bm25() is "lower is better"; flip it so scores read naturally.
+            SearchHit(questions[qid], -rank, _highlighted(snippet))
+            for qid, rank, snippet in rows
+            if qid in questions
+        ]
+
+
+# PURE-PYTHON BACKEND ---------------------------------------------------------
+
+def bm25_scores(term_postings, doc_lengths, n_docs, avg_length):
+    """
+    BM25 over an inverted index.
+
+    term_postings: one {doc_id: frequency} dict per query term (a prefix
+    term's postings already merged). Only documents matching every term are
+    scored. Returns {doc_id: score}.
+    """
+    if not term_postings or n_docs == 0:
+        return {}
+    candidates = set(term_postings[0])
+    for postings in term_postings[1:]:
+        candidates &= postings.keys()
+
+    scores = defaultdict(float)
+    for postings in term_postings:
+        df = len(postings)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        for doc_id in candidates:
+            tf = postings[doc_id]
+            norm = K1 * (1 - B + B * doc_lengths.get(doc_id, avg_length) / avg_length)
+            scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+    return scores
+
+
+def python_snippet(question_text, answer_text, terms) -> str:
+    """
+    SNIPPET_WORDS words around the first query hit, hits highlighted;
+    answer text is preferred when it matches.
+    """
+    def is_hit(token):
+        token = token.lower()
+        return any(token.startswith(t) for t in terms)
+
+    def mark(word):
+        return TOKEN_RE.sub(
+            lambda m: f"{_HL_OPEN}{m.group(0)}{_HL_CLOSE}" if is_hit(m.group(0)) else m.group(0),
+            word,
+        )
+
+    for text in (answer_text, question_text):
+        words = (text or "").split()
+        first = next(
+            (i for i, w in enumerate(words) if any(is_hit(t) for t in TOKEN_RE.findall(w))),
+            None,
+        )
+        if first is None:
+            continue
+        start = max(0, first - SNIPPET_WORDS // 3)
+        end = start + SNIPPET_WORDS
+        marked = " ".join(mark(w) for w in words[start:end])
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(words) else ""
+        return _highlighted(prefix + marked + suffix)
+
+    return _highlighted(" ".join((question_text or "").split()[:SNIPPET_WORDS]))
+
+
+def _document_postings(question):
+    question_text, answer_text = _document_text(question)
+    tokens = tokenize(question_text) + tokenize(answer_text)
+    return len(tokens), Counter(t[:64] for t in tokens)
+
+
+class PythonBackend:
+    name = "python"
+
+    def ensure_schema(self):
+        pass
+
+    def index(self, question):
+        length, counts = _document_postings(question)
+        with transaction.atomic():
+            document, _ = SearchDocument.objects.update_or_create(
+                question=question, defaults={"length": length}
+            )
+            document.postings.all().delete()
+            SearchPosting.objects.bulk_create(
+                SearchPosting(document=document, term=term, frequency=freq)
+                for term, freq in counts.items()
+            )
+
+    def remove(self, question_id):
+        SearchDocument.objects.filter(question_id=question_id).delete()
+
+    def rebuild(self, batch_size=500):
+        with transaction.atomic():
+            SearchPosting.objects.all().delete()
+            SearchDocument.objects.all().delete()
+
+        total = 0
+        for question in _answered_rows().iterator(chunk_size=batch_size):
+            self.index(question)
+            total += 1
+        return total
+
+    def search(self, query, limit):
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        term_postings = []
+        for term in terms:
+            postings = defaultdict(int)
+            # A range rather than term__startswith: that compiles to LIKE,
+            # which SQLite can't serve from search_term_idx.
+            rows = SearchPosting.objects.filter(
+                term__gte=term, term__lt=term + "\uffff"
+            ).values_list("document_id", "frequency")
+            for doc_id, freq in rows:
+                postings[doc_id] += freq
+            if not postings:
+                return []
+            term_postings.append(postings)
+
+        stats = SearchDocument.objects.aggregate(n=Count("pk"), avg=Avg("length"))
+        candidates = set(term_postings[0]).intersection(*term_postings[1:])
+        lengths = dict(
+            SearchDocument.objects.filter(pk__in=candidates).values_list("pk", "length")
+        )
+        scores = bm25_scores(term_postings, lengths, stats["n"], stats["avg"] or 1.0)
+        top = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+
+        questions = _answered_rows().in_bulk([doc_id for doc_id, _ in top])
+        hits = []
+        for doc_id, score in top:
+            question = questions.get(doc_id)
+            if question is None:
+                continue
+            question_text, answer_text = _document_text(question)
+            hits.append(
+                SearchHit(question, score, python_snippet(question_text, answer_text, terms))
+            )
+        return hits
+
+
+# ENTRY POINTS ----------------------------------------------------------------
+
+def get_backend():
+    choice = getattr(settings, "SEARCH_BACKEND", "auto")
+    if choice == "auto":
+        choice = "fts5" if connection.vendor == "sqlite" and fts5_available() else "python"
+    return Fts5Backend() if choice == "fts5" else PythonBackend()
+
+
+def search(query: str, limit: int = 20):
+    return get_backend().search(query, limit)
+
+
+def _update_index(operation, question_id, *args):
+    """
+    Run one index update in a savepoint. Called from model signals, so a
+    broken index (say the FTS5 table was never created) is logged instead
+    of failing the question or answer save that triggered it.
+    """
+    try:
+        with transaction.atomic():
+            operation(*args)
+    except DatabaseError:
+        logger.exception(
+            "Search index not updated for question %s; run `manage.py rebuild_search_index`.",
+            question_id,
+        )
+
+
+def index_question(question):
+    """Add, refresh or drop one question depending on whether it is answered."""
+    backend = get_backend()
+    if question.is_answered:
+        _update_index(backend.index, question.pk, question)
+    else:
+        _update_index(backend.remove, question.pk, question.pk)
+
+
+def remove_question(question_id):
+    _update_index(get_backend().remove, question_id, question_id)
+
+
+def rebuild():
+    backend = get_backend()
+    backend.ensure_schema()
+    return backend.name, backend.rebuild()
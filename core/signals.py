@@ -0,0 +1,112 @@
+"""
+Model-signal receivers:
+
+- cache invalidation: bump the page/fragment cache generation of every
+  group a model feeds whenever a row is saved or deleted;
+- search: keep core.search's index in step with questions and answers;
+- facets: move a lawyer between LawyerFacetCell counts when their
+  speciality / experience / fee / approval changes;
+- tasks: queue the asker's "your question was answered" email, and the
+  next lawyer digest pass when a question is posted.
+"""
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, facets, search, tasks
+from .models import LawyerProfile, PublicAnswer, PublicQuestion
+
+
+@receiver([post_save, post_delete], sender=PublicQuestion)
+@receiver([post_save, post_delete], sender=PublicAnswer)
+def invalidate_questions(sender, **kwargs):
+    caching.bump_generation(caching.QUESTIONS)
+
+
+@receiver([post_save, post_delete], sender=LawyerProfile)
+def invalidate_lawyers(sender, **kwargs):
+    # Question cards show the answering lawyer's name.
+    caching.bump_generation(caching.LAWYERS, caching.QUESTIONS)
+
+
+@receiver(post_save, sender=User)
+def invalidate_lawyer_names(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login only; that never shows up on a page.
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    if LawyerProfile.objects.filter(user_id=instance.pk).exists():
+        caching.bump_generation(caching.LAWYERS, caching.QUESTIONS)
+
+
+@receiver(post_save, sender=PublicQuestion)
+def index_question(sender, instance, **kwargs):
+    search.index_question(instance)
+
+
+@receiver(post_delete, sender=PublicQuestion)
+def unindex_question(sender, instance, **kwargs):
+    search.remove_question(instance.pk)
+
+
+@receiver(post_save, sender=PublicAnswer)
+def index_answer(sender, instance, **kwargs):
+    search.index_question(instance.question)
+
+
+@receiver(post_save, sender=PublicQuestion)
+def schedule_digest(sender, created, **kwargs):
+    if created:
+        tasks.queue_question_digest()
+
+
+@receiver(post_save, sender=PublicAnswer)
+def notify_answered(sender, instance, created, **kwargs):
+    if created:
+        tasks.queue_question_answered(instance.question_id)
+
+
+def _reindex_question(question_id):
+    question = PublicQuestion.objects.filter(pk=question_id).first()
+    if question is not None:
+        search.index_question(question)
+
+
+@receiver(post_delete, sender=PublicAnswer)
+def unindex_answer(sender, instance, **kwargs):
+    # After commit: when the answer goes in the question's own cascade, the
+    # question still exists here, and indexing it now would write rows for
+    # a question that is about to disappear.
+    transaction.on_commit(partial(_reindex_question, instance.question_id))
+
+
+@receiver(pre_save, sender=LawyerProfile)
+def remember_facet_cell(sender, instance, **kwargs):
+    before = None
+    if instance.pk:
+        before = (
+            LawyerProfile.objects.filter(pk=instance.pk)
+            .values_list("is_approved", "speciality_key", "experience_bucket", "fee_bucket")
+            .first()
+        )
+    instance._facet_cell_before = before[1:] if before and before[0] else None
+
+
+@receiver(post_save, sender=LawyerProfile)
+def move_facet_cell(sender, instance, **kwargs):
+    before = getattr(instance, "_facet_cell_before", None)
+    after = instance.facet_cell
+    if before == after:
+        return
+    facets.adjust_cell(before, -1)
+    facets.adjust_cell(after, +1, label=instance.speciality.strip())
+    # Again, now that the cells are written, so no request caches old counts.
+    caching.bump_generation(caching.LAWYERS)
+
+
+@receiver(post_delete, sender=LawyerProfile)
+def drop_facet_cell(sender, instance, **kwargs):
+    facets.adjust_cell(instance.facet_cell, -1)
+    caching.bump_generation(caching.LAWYERS)
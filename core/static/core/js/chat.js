@@ -0,0 +1,166 @@
+// Live chat: append messages from the server's event stream (or, where
+// there is none, from polling) and send new ones with a background POST,
+// so the page is never re-rendered.
+(function () {
+    var box = document.getElementById("chat-box");
+    var form = document.getElementById("chat-form");
+    if (!box || !form) {
+        return;
+    }
+
+    var userId = box.dataset.userId;
+    var lastId = parseInt(box.dataset.lastId, 10) || 0;
+
+    function pad(n) {
+        return n < 10 ? "0" + n : "" + n;
+    }
+
+    function formatTime(iso) {
+        var d = new Date(iso);
+        return d.getFullYear() + "-" + pad(d.getMonth() + 1) + "-" + pad(d.getDate()) +
+            " " + pad(d.getHours()) + ":" + pad(d.getMinutes());
+    }
+
+    function line(className, text) {
+        var p = document.createElement("p");
+        p.className = className;
+        p.textContent = text;
+        return p;
+    }
+
+    function append(m) {
+        if (m.id <= lastId) {
+            return;
+        }
+        lastId = m.id;
+
+        var empty = document.getElementById("chat-empty");
+        if (empty) {
+            empty.remove();
+        }
+
+        var div = document.createElement("div");
+        div.className = "chat-message" + (String(m.sender_id) === userId ? " chat-message-own" : "");
+        div.dataset.id = m.id;
+        div.appendChild(line("chat-sender", m.sender));
+        div.appendChild(line("chat-text", m.message));
+        div.appendChild(line("chat-time", formatTime(m.created_at)));
+        box.appendChild(div);
+        box.scrollTop = box.scrollHeight;
+
+        if (String(m.sender_id) !== userId) {
+            scheduleMarkRead();
+        }
+    }
+
+    // Move the read cursor after a burst of incoming messages settles.
+    var readTimer = null;
+    function scheduleMarkRead() {
+        clearTimeout(readTimer);
+        readTimer = setTimeout(function () {
+            var data = new FormData();
+            data.append("last_id", lastId);
+            data.append("csrfmiddlewaretoken", form.elements.csrfmiddlewaretoken.value);
+            fetch(box.dataset.readUrl, {
+                method: "POST",
+                body: data,
+                credentials: "same-origin"
+            });
+        }, 1000);
+    }
+
+    box.scrollTop = box.scrollHeight;
+
+    // Older history is fetched a window at a time as server-rendered
+    // fragments and inserted above what is already on screen.
+    var older = document.getElementById("chat-load-older");
+    if (older) {
+        older.addEventListener("click", function () {
+            var url = older.dataset.url + "?format=html&before=" + older.dataset.firstId;
+            fetch(url, {credentials: "same-origin"}).then(function (response) {
+                var hasMore = response.headers.get("X-Has-More") === "1";
+                return response.text().then(function (html) {
+                    return {html: html, hasMore: hasMore};
+                });
+            }).then(function (page) {
+                var height = box.scrollHeight;
+                older.insertAdjacentHTML("afterend", page.html);
+                var first = older.nextElementSibling;
+                if (first && first.dataset.id) {
+                    older.dataset.firstId = first.dataset.id;
+                }
+                box.scrollTop += box.scrollHeight - height;
+                if (!page.hasMore) {
+                    older.remove();
+                }
+            });
+        });
+    }
+
+    // Fetch messages newer than the last one shown. The ASGI stack holds
+    // the request until there are some; sync workers answer at once.
+    function fetchNew() {
+        return fetch(box.dataset.pollUrl + "?after=" + lastId, {
+            credentials: "same-origin"
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.json();
+        }).then(function (page) {
+            page.messages.forEach(append);
+        });
+    }
+
+    // At most one request per POLL_EVERY_MS; a long poll that waited is
+    // followed by the next one straight away.
+    var POLL_EVERY_MS = 3000;
+    function poll() {
+        var started = Date.now();
+        fetchNew().catch(function () {}).then(function () {
+            setTimeout(poll, Math.max(0, POLL_EVERY_MS - (Date.now() - started)));
+        });
+    }
+
+    var streaming = !!window.EventSource;
+    if (streaming) {
+        var source = new EventSource(box.dataset.streamUrl + "?after=" + lastId);
+        source.addEventListener("message", function (event) {
+            append(JSON.parse(event.data));
+        });
+        source.addEventListener("error", function () {
+            // Closed for good rather than reconnecting: the sync stack
+            // answers 204 and serves no streams.
+            if (source.readyState === EventSource.CLOSED) {
+                streaming = false;
+                poll();
+            }
+        });
+    } else {
+        poll();
+    }
+
+    form.addEventListener("submit", function (event) {
+        event.preventDefault();
+        var data = new FormData(form);
+        fetch(window.location.pathname, {
+            method: "POST",
+            body: data,
+            headers: {"Accept": "application/json"},
+            credentials: "same-origin"
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            form.reset();
+            // The message arrives through the stream or the next fetch, in
+            // order with anyone else's; appending it here could skip one
+            // of theirs.
+            if (!streaming) {
+                fetchNew().catch(function () {});
+            }
+        }).catch(function () {
+            form.submit();
+        });
+    });
+})();
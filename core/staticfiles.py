@@ -0,0 +1,98 @@
+"""
+Static asset pipeline, served by WhiteNoise.
+
+`collectstatic` with OptimizedStaticFilesStorage:
+
+  * re-encodes PNG/JPEG images losslessly at the widths in
+    STATIC_IMAGE_WIDTHS, as WebP and as an optimised copy of the original
+    format ("images/logo.png" -> "images/logo.w96.webp",
+    "images/logo.w96.png"), and re-saves the original itself with the
+    encoder's optimisation turned on when that makes it smaller;
+  * gives every file, variants included, a content-hashed name
+    (ManifestStaticFilesStorage);
+  * writes .gz and .br next to every compressible file (WhiteNoise's
+    compressed storage), so no worker compresses at request time.
+
+core.middleware.static.StaticFilesMiddleware serves hashed files with
+`max-age=STATIC_MAX_AGE, public, immutable` (one year). The
+{% picture %} tag in core/templatetags/responsive_images.py offers the
+WebP variants in a <picture> element; the browser picks a format it
+accepts and the smallest width that fits.
+
+This storage is only used when settings.STATIC_MANIFEST is on (the default
+outside DEBUG and tests), and then collectstatic must have run before the
+app serves pages, since every {% static %} URL is looked up in its
+manifest.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+RESPONSIVE_EXTENSIONS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG"}
+
+
+def image_widths():
+    return sorted(getattr(settings, "STATIC_IMAGE_WIDTHS", (96, 192, 384, 768)))
+
+
+def variant_name(name, width, ext) -> str:
+    base, _ = os.path.splitext(name)
+    return f"{base}.w{width}{ext}"
+
+
+def is_responsive_source(name) -> bool:
+    base, ext = os.path.splitext(name)
+    # Variants are generated from sources only, never from each other.
+    return ext.lower() in RESPONSIVE_EXTENSIONS and ".w" not in os.path.basename(base)
+
+
+def encode(image, fmt, **params) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, "WEBP", lossless=True, quality=100, method=6, **params)
+    elif fmt == "JPEG":
+        image.convert("RGB").save(buffer, "JPEG", quality=95, optimize=True, **params)
+    else:
+        image.save(buffer, fmt, optimize=True, **params)
+    return buffer.getvalue()
+
+
+class OptimizedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in [n for n in paths if is_responsive_source(n)]:
+                for variant in self._write_variants(name):
+                    paths[variant] = (self, variant)
+        yield from super().post_process(paths, dry_run, **options)
+
+    def _replace(self, name, content: bytes):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def _write_variants(self, name):
+        """Resized lossless copies of one collected image; yields their names."""
+        ext = os.path.splitext(name)[1]
+        fmt = RESPONSIVE_EXTENSIONS[ext.lower()]
+        with self.open(name) as fh:
+            original = fh.read()
+        with Image.open(io.BytesIO(original)) as image:
+            image.load()
+
+        optimised = encode(image, fmt)
+        if len(optimised) < len(original):
+            self._replace(name, optimised)
+
+        for width in image_widths():
+            if width >= image.width:
+                break
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            for variant_ext, variant_fmt in ((".webp", "WEBP"), (ext, fmt)):
+                variant = variant_name(name, width, variant_ext)
+                self._replace(variant, encode(resized, variant_fmt))
+                yield variant
@@ -0,0 +1,111 @@
+"""
+Streaming render mode for the long list pages (?stream=1).
+
+A normal render builds the whole page in memory before the first byte is
+sent. stream_list() instead renders the page template once with a marker
+where the cards go, sends everything before the marker (head, navigation,
+filters) straight away, then renders one card per row while reading the
+queryset with .iterator(chunk_size=...) (a server-side cursor on
+PostgreSQL) and sends each chunk of cards as it is done. Only one chunk
+of rows and HTML is held at a time, however long the list is.
+
+The list templates show `{{ stream_marker }}` instead of their card loop
+when `streaming` is set; the cards themselves live in includes/ so both
+modes render them from the same template. astream_list() is the same for
+async views: the body is an async generator over .aiterator(), which the
+ASGI handler streams as is (it would buffer a sync iterator whole).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+STREAM_MARKER = "<!--stream-cards-->"
+DEFAULT_CHUNK_SIZE = 200
+
+
+def wants_stream(request) -> bool:
+    return request.GET.get("stream") == "1"
+
+
+def chunk_size() -> int:
+    return getattr(settings, "STREAMING_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+
+def _card_renderer(card_template, item_name, card_context=None):
+    card = get_template(card_template)
+    card_context = card_context or {}
+    return lambda obj: card.render({**card_context, item_name: obj})
+
+
+def render_cards(items, card_template, item_name, card_context=None, size=None):
+    """Yield the cards for `items` as HTML, `size` rows per string."""
+    render = _card_renderer(card_template, item_name, card_context)
+    size = size or chunk_size()
+    batch = []
+    for obj in items.iterator(chunk_size=size):
+        batch.append(render(obj))
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+async def arender_cards(items, card_template, item_name, card_context=None, size=None):
+    """render_cards() through the async ORM."""
+    render = _card_renderer(card_template, item_name, card_context)
+    size = size or chunk_size()
+    batch = []
+    async for obj in items.aiterator(chunk_size=size):
+        batch.append(render(obj))
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def _shell(request, template_name, context, items):
+    """(head, tail, items pinned to their database) for one streamed page."""
+    shell = render_to_string(
+        template_name,
+        {**context, "streaming": True, "stream_marker": mark_safe(STREAM_MARKER)},
+        request,
+    )
+    head, tail = shell.split(STREAM_MARKER, 1)
+    # Resolve the database now: the body is read after the view (and any
+    # request-scoped routing, see core.middleware.replica) has returned.
+    return head, tail, items.using(items.db)
+
+
+def stream_list(request, template_name, context, items, card_template, item_name,
+                card_context=None):
+    """
+    StreamingHttpResponse of `template_name` with one `card_template` per
+    row of the `items` queryset, rendered with `item_name` bound to it.
+    """
+    head, tail, items = _shell(request, template_name, context, items)
+
+    def body():
+        yield head
+        yield from render_cards(items, card_template, item_name, card_context)
+        yield tail
+
+    return StreamingHttpResponse(body(), content_type="text/html; charset=utf-8")
+
+
+async def astream_list(request, template_name, context, items, card_template, item_name,
+                       card_context=None):
+    """stream_list() for async views."""
+    # The shell runs the context processors, which may query (session, roles).
+    head, tail, items = await sync_to_async(_shell)(request, template_name, context, items)
+
+    async def body():
+        yield head
+        async for chunk in arender_cards(items, card_template, item_name, card_context):
+            yield chunk
+        yield tail
+
+    return StreamingHttpResponse(body(), content_type="text/html; charset=utf-8")
@@ -0,0 +1,220 @@
+"""
+Background tasks backed by the Task table. No broker is needed.
+
+Views and signals call enqueue() and return at once. `manage.py
+run_tasks` claims due tasks and runs them on a thread pool.
+
+  * Enqueueing is an INSERT in the caller's transaction. A task for a
+    write that rolls back disappears with it, and no task is visible
+    before the write it refers to.
+  * dedup_key: a task whose key is already queued is dropped. This is an
+    INSERT that ignores conflicts with the partial unique index on pending
+    tasks, so no read comes first. A burst of chat messages becomes one
+    "unread messages" email.
+  * Claiming is one short transaction. It locks due rows with FOR UPDATE
+    SKIP LOCKED on PostgreSQL; SQLite's IMMEDIATE transactions serialise
+    it. The claimed rows go to "running" with a lease. Several worker
+    processes can share the table, and a task whose worker died is picked
+    up again when its lease runs out.
+  * Batches: a task registered with batch=True receives every claimed
+    payload of that name in one call, for example to send a batch of
+    emails over one SMTP connection. It reports the payloads that failed
+    by raising BatchFailure; only their tasks are retried.
+  * Failures are retried with exponential backoff and jitter, up to
+    max_attempts, then left as "failed" with the error for inspection.
+
+Delivery is at-least-once. Tasks must be safe to run twice, which usually
+means re-checking the database before acting.
+"""
+import logging
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    name: str
+    func: Callable
+    batch: bool
+    max_attempts: int
+    backoff: float
+
+
+REGISTRY: dict[str, TaskSpec] = {}
+
+
+class BatchFailure(Exception):
+    """
+    Raised by a batch task when some of its payloads failed. `errors` maps
+    the index of each failed payload to its exception; the rest succeeded.
+    """
+
+    def __init__(self, errors: dict):
+        super().__init__(f"{len(errors)} payload(s) failed")
+        self.errors = errors
+
+
+def task(name=None, *, batch=False, max_attempts=5, backoff=30):
+    """
+    Register a function as a task. A plain task is called as
+    func(**payload). A batch task is called as func([payload, ...]).
+    `backoff` is the first retry delay in seconds. It doubles on every
+    attempt. If a batch call raises BatchFailure, only the payloads it
+    names are retried; any other exception retries the whole batch.
+    """
+    def decorator(func):
+        task_name = name or func.__name__
+        REGISTRY[task_name] = TaskSpec(task_name, func, batch, max_attempts, backoff)
+        func.task_name = task_name
+        return func
+
+    return decorator
+
+
+def _spec(name_or_func) -> TaskSpec:
+    name = getattr(name_or_func, "task_name", name_or_func)
+    try:
+        return REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown task {name!r}.") from None
+
+
+def enqueue(name_or_func, payload=None, *, dedup_key=None, delay=0):
+    """
+    Queue a task by name or by its registered function. `payload` must be
+    JSON-serialisable. `delay` is in seconds. Does nothing if a pending
+    task with the same dedup_key exists.
+    """
+    spec = _spec(name_or_func)
+    Task.objects.bulk_create(
+        [
+            Task(
+                name=spec.name,
+                payload=payload or {},
+                dedup_key=dedup_key,
+                max_attempts=spec.max_attempts,
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+# WORKER SIDE -----------------------------------------------------------------
+
+def backoff_delay(base, attempts) -> float:
+    """Seconds before retry number `attempts`. Doubles each time, capped, jittered."""
+    cap = getattr(settings, "TASK_MAX_BACKOFF_SECONDS", 3600)
+    delay = min(base * 2 ** (attempts - 1), cap)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim(limit, lease_seconds) -> list[Task]:
+    """
+    Mark up to `limit` due tasks as running. Also picks up tasks whose
+    lease has expired. Returns the claimed tasks.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.PENDING, run_at__lte=now)
+            .order_by("run_at", "id")
+            .values_list("pk", flat=True)[:limit]
+        )
+        if len(ids) < limit:
+            ids += (
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(status=Task.RUNNING, locked_until__lt=now)
+                .values_list("pk", flat=True)[: limit - len(ids)]
+            )
+        if not ids:
+            return []
+        Task.objects.filter(pk__in=ids).update(
+            status=Task.RUNNING,
+            locked_until=now + timedelta(seconds=lease_seconds),
+            attempts=F("attempts") + 1,
+        )
+    return list(Task.objects.filter(pk__in=ids).order_by("run_at", "id"))
+
+
+def units(tasks):
+    """
+    Split claimed tasks into calls: one per plain task, one per task name
+    for batch tasks. Yields (spec or None, [Task, ...]).
+    """
+    batches = {}
+    for t in tasks:
+        spec = REGISTRY.get(t.name)
+        if spec is not None and spec.batch:
+            batches.setdefault(t.name, (spec, []))[1].append(t)
+        else:
+            yield spec, [t]
+    yield from batches.values()
+
+
+def execute(spec, tasks) -> bool:
+    """
+    Run one unit from units() and record the outcome of each task. Returns
+    True if every task succeeded.
+    """
+    try:
+        if spec is None:
+            raise LookupError(f"No task registered as {tasks[0].name!r}.")
+        if spec.batch:
+            spec.func([t.payload for t in tasks])
+        else:
+            spec.func(**tasks[0].payload)
+        errors = {}
+    except BatchFailure as exc:
+        logger.error(
+            "Task %s failed for %d of %d payloads", tasks[0].name, len(exc.errors), len(tasks)
+        )
+        errors = exc.errors
+    except Exception as exc:
+        logger.exception("Task %s failed", tasks[0].name)
+        errors = dict.fromkeys(range(len(tasks)), exc)
+
+    done = [t.pk for i, t in enumerate(tasks) if i not in errors]
+    if done:
+        Task.objects.filter(pk__in=done).update(
+            status=Task.DONE, finished_at=timezone.now(), locked_until=None, last_error=""
+        )
+    for i, t in enumerate(tasks):
+        if i in errors:
+            _failed(spec, t, f"{type(errors[i]).__name__}: {errors[i]}")
+    return not errors
+
+
+def _failed(spec, t, error):
+    now = timezone.now()
+    rows = Task.objects.filter(pk=t.pk)
+    if spec is None or t.attempts >= t.max_attempts:
+        rows.update(status=Task.FAILED, finished_at=now, locked_until=None, last_error=error)
+        return
+    run_at = now + timedelta(seconds=backoff_delay(spec.backoff, t.attempts))
+    try:
+        with transaction.atomic():
+            rows.update(status=Task.PENDING, run_at=run_at, locked_until=None, last_error=error)
+    except IntegrityError:
+        # A newer copy with the same dedup_key is already queued and
+        # covers this one.
+        rows.update(status=Task.DONE, finished_at=now, locked_until=None, last_error=error)
+
+
+def purge(older_than_seconds) -> int:
+    """Delete finished tasks older than the cutoff. Failed ones are kept."""
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    deleted, _ = Task.objects.filter(status=Task.DONE, finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,183 @@
+"""
+Background tasks (core.taskqueue), run by `manage.py run_tasks`.
+
+Each task re-reads the database before it acts, so one that runs late or
+twice sends nothing stale. The queue_* helpers below are what views and
+signals call. They pick the dedup key and the delay.
+"""
+from collections import defaultdict
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, mail_admins
+from django.template.loader import render_to_string
+
+from . import digests
+from .models import ChatRoom, LawyerProfile, PublicQuestion
+from .taskqueue import BatchFailure, enqueue, task
+
+
+def _site_url() -> str:
+    return getattr(settings, "SITE_URL", "").rstrip("/")
+
+
+def _display_name(user) -> str:
+    return user.get_full_name() or user.username
+
+
+# ANSWERED QUESTIONS ----------------------------------------------------------
+
+@task(batch=True)
+def notify_question_answered(payloads):
+    """
+    Email each asker whose question was answered, over one connection.
+    A message that fails is reported with BatchFailure, so the retry
+    covers its payload only and the others are not emailed again.
+    """
+    indexes = defaultdict(list)
+    for i, payload in enumerate(payloads):
+        indexes[payload["question_id"]].append(i)
+    questions = (
+        PublicQuestion.objects.filter(
+            pk__in=list(indexes),
+            answer_obj__isnull=False,
+            customer__isnull=False,
+        )
+        .exclude(customer__user__email="")
+        .select_related("customer__user", "answer_obj__lawyer__user")
+    )
+    messages = [
+        (
+            q.pk,
+            EmailMessage(
+                "Your question has been answered",
+                render_to_string(
+                    "emails/question_answered.txt",
+                    {
+                        "user": q.customer.user,
+                        "question": q,
+                        "lawyer_name": _display_name(q.answer_obj.lawyer.user),
+                        "site_url": _site_url(),
+                    },
+                ),
+                to=[q.customer.user.email],
+            ),
+        )
+        for q in questions
+    ]
+    if not messages:
+        return
+    errors = {}
+    with get_connection() as connection:
+        for question_id, message in messages:
+            try:
+                connection.send_messages([message])
+            except (SMTPException, OSError) as exc:
+                errors.update(dict.fromkeys(indexes[question_id], exc))
+    if errors:
+        raise BatchFailure(errors)
+
+
+def queue_question_answered(question_id):
+    enqueue(
+        notify_question_answered,
+        {"question_id": question_id},
+        dedup_key=f"answered:{question_id}",
+    )
+
+
+# LAWYER REGISTRATION ---------------------------------------------------------
+
+@task()
+def notify_lawyer_registered(lawyer_id):
+    """Tell ADMINS about a new lawyer, so they can review the profile."""
+    lawyer = LawyerProfile.objects.filter(pk=lawyer_id).select_related("user").first()
+    if lawyer is None:
+        return
+    mail_admins(
+        f"New lawyer registered: {lawyer.user.username}",
+        render_to_string(
+            "emails/lawyer_registered.txt",
+            {"lawyer": lawyer, "site_url": _site_url()},
+        ),
+    )
+
+
+def queue_lawyer_registered(lawyer_id):
+    enqueue(
+        notify_lawyer_registered,
+        {"lawyer_id": lawyer_id},
+        dedup_key=f"lawyer-registered:{lawyer_id}",
+    )
+
+
+# UNREAD CHAT MESSAGES --------------------------------------------------------
+
+@task()
+def notify_unread_messages(room_id, side):
+    """
+    Email one participant about the messages they still haven't read.
+    Nothing is sent if they read them before the task ran.
+    """
+    other = ChatRoom.other_side(side)
+    room = (
+        ChatRoom.objects.filter(pk=room_id, **{f"{side}_unread__gt": 0})
+        .select_related(f"{side}__user", f"{other}__user")
+        .first()
+    )
+    if room is None:
+        return
+    user = getattr(room, side).user
+    if not user.email:
+        return
+    unread = getattr(room, f"{side}_unread")
+    EmailMessage(
+        f"{unread} unread message{'s' if unread != 1 else ''}",
+        render_to_string(
+            "emails/unread_messages.txt",
+            {
+                "user": user,
+                "room": room,
+                "unread": unread,
+                "sender_name": _display_name(getattr(room, other).user),
+                "site_url": _site_url(),
+            },
+        ),
+        to=[user.email],
+    ).send()
+
+
+def queue_unread_messages(room, sender):
+    """
+    After `sender` posts in `room`: email the recipient later if they
+    haven't read it by then. Later messages in the same burst are
+    deduplicated into that one email.
+    """
+    side = ChatRoom.other_side(room.side_for(sender))
+    enqueue(
+        notify_unread_messages,
+        {"room_id": room.pk, "side": side},
+        dedup_key=f"chat-unread:{room.pk}:{side}",
+        delay=getattr(settings, "CHAT_UNREAD_EMAIL_DELAY", 600),
+    )
+
+
+# LAWYER DIGESTS --------------------------------------------------------------
+
+@task(max_attempts=3, backoff=300)
+def send_question_digests():
+    """One core.digests pass over the questions posted since the last one."""
+    digests.send_digests()
+
+
+def queue_question_digest():
+    """
+    After a question is posted, run a digest pass DIGEST_INTERVAL_SECONDS
+    from now, unless one is already scheduled. That pass covers every
+    question posted until then.
+    """
+    enqueue(
+        send_question_digests,
+        dedup_key="question-digest",
+        delay=getattr(settings, "DIGEST_INTERVAL_SECONDS", 3600),
+    )
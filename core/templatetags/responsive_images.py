@@ -0,0 +1,67 @@
+"""
+{% picture %}: an <img> with WebP and resized variants from collectstatic.
+
+    {% load responsive_images %}
+    {% picture "images/logo.png" alt="Guardian Angel Logo" class="logo" sizes="48px" %}
+
+Renders a <picture> whose <source> lists the WebP variants and whose <img>
+falls back to the resized originals; the browser takes the first format it
+supports at the smallest adequate width. Without collected variants (DEBUG,
+or an image collectstatic did not process) it is a plain <img>.
+"""
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.staticfiles import image_widths, variant_name
+
+register = template.Library()
+
+
+@lru_cache(maxsize=256)
+def _variants(name):
+    """((width, webp name, fallback name), ...) present in the manifest."""
+    hashed = getattr(staticfiles_storage, "hashed_files", None)
+    if settings.DEBUG or not hashed:
+        return ()
+    ext = "." + name.rsplit(".", 1)[-1]
+    return tuple(
+        (width, variant_name(name, width, ".webp"), variant_name(name, width, ext))
+        for width in image_widths()
+        if variant_name(name, width, ".webp") in hashed
+    )
+
+
+@receiver(setting_changed)
+def _clear_variants(setting, **kwargs):
+    if setting in ("DEBUG", "STORAGES", "STATIC_ROOT", "STATIC_IMAGE_WIDTHS"):
+        _variants.cache_clear()
+
+
+def _srcset(variants, index):
+    return ", ".join(f"{static(v[index])} {v[0]}w" for v in variants)
+
+
+@register.simple_tag
+def picture(name, alt="", sizes="100vw", **attrs):
+    img_attrs = format_html_join("", ' {}="{}"', attrs.items())
+    variants = _variants(name)
+    if not variants:
+        return format_html('<img src="{}" alt="{}"{}>', static(name), alt, img_attrs)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        _srcset(variants, 1),
+        sizes,
+        static(variants[-1][2]),
+        _srcset(variants, 2),
+        sizes,
+        alt,
+        img_attrs,
+    )
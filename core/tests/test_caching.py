@@ -0,0 +1,118 @@
+"""
+Page-cache invalidation through the CacheGeneration rows: a write seen by
+one worker must reach pages cached by every other worker, and every worker
+must hand out the same list validators.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import caching, facets
+from core.models import FEE_UNLISTED, CacheGeneration, LawyerFacetCell, PublicQuestion
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM)
+class GenerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def ask(self, text):
+        return PublicQuestion.objects.create(question_text=text, is_answered=True)
+
+    def test_bump_after_commit(self):
+        before = caching.generation(caching.QUESTIONS)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.ask("Can my landlord keep the deposit?")
+        self.assertEqual(caching.generation(caching.QUESTIONS), before)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(caching.generation(caching.QUESTIONS), before)
+
+    def test_other_workers_bump_invalidates_cached_page(self):
+        url = reverse("public_questions")
+        self.assertNotContains(self.client.get(url), "deposit")
+
+        # Written by another process: no signal runs here, only the shared
+        # generation row moves.
+        with self.captureOnCommitCallbacks(execute=False):
+            self.ask("Can my landlord keep the deposit?")
+        self.assertNotContains(self.client.get(url), "deposit")
+
+        CacheGeneration.objects.filter(group=caching.QUESTIONS).update(
+            generation=F("generation") + 1
+        )
+        self.assertContains(self.client.get(url), "deposit")
+
+    def test_missing_group_row_is_created(self):
+        CacheGeneration.objects.filter(group=caching.MARKETING).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            caching.bump_generation(caching.MARKETING, caching.QUESTIONS)
+        self.assertEqual(caching.generation(caching.MARKETING), 2)
+
+
+@override_settings(CACHES=LOCMEM)
+class ValidatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            PublicQuestion.objects.create(question_text="First?", is_answered=True)
+
+    def etag(self):
+        return self.client.get(reverse("public_questions"))["ETag"]
+
+    def test_same_etag_in_every_worker(self):
+        first = self.etag()
+        cache.clear()  # a worker with its own, empty cache
+        self.assertEqual(self.etag(), first)
+
+    def test_not_modified(self):
+        response = self.client.get(reverse("public_questions"), HTTP_IF_NONE_MATCH=self.etag())
+        self.assertEqual(response.status_code, 304)
+
+    def test_edit_changes_etag(self):
+        before = self.etag()
+        question = PublicQuestion.objects.get()
+        question.question_text = "First, edited?"
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        self.assertNotEqual(self.etag(), before)
+
+
+@override_settings(CACHES=LOCMEM)
+class FacetCellTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def specialities(self):
+        return [entry["value"] for entry in facets.facet_counts({})[facets.SPECIALITY]]
+
+    def test_other_workers_change_reaches_cached_cells(self):
+        self.assertEqual(self.specialities(), [])
+        # Another worker adds a lawyer: the cell row and the generation
+        # move in the database, this process only has its cached cells.
+        LawyerFacetCell.objects.create(
+            speciality_key="tax",
+            speciality_label="Tax",
+            experience_bucket="0-2",
+            fee_bucket=FEE_UNLISTED,
+            count=1,
+        )
+        self.assertEqual(self.specialities(), [])
+        CacheGeneration.objects.filter(group=caching.LAWYERS).update(
+            generation=F("generation") + 1
+        )
+        self.assertEqual(self.specialities(), ["tax"])
+
+    @override_settings(PAGE_CACHE_SECONDS=1)
+    def test_cells_expire(self):
+        self.assertEqual(self.specialities(), [])
+        LawyerFacetCell.objects.create(
+            speciality_key="tax", experience_bucket="0-2", fee_bucket=FEE_UNLISTED, count=1
+        )
+        time.sleep(1.1)
+        self.assertEqual(self.specialities(), ["tax"])
@@ -0,0 +1,157 @@
+"""
+Live chat. On the event loop (core.chat_hub, core.async_views), waiters
+share one check for new messages posted by any process, and the async
+endpoints return what was posted. Sync workers never wait for messages.
+"""
+import asyncio
+import json
+import time
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from core import async_views, chat_hub
+from core.chat_hub import ChatHub
+from core.models import ChatRoom, CustomerProfile, LawyerProfile
+
+FAST = {"CHAT_POLL_INTERVAL": 0.05, "CHAT_STREAM_SECONDS": 2, "CHAT_LONGPOLL_TIMEOUT": 2}
+
+
+def make_room(n=1):
+    customer = CustomerProfile.objects.create(user=User.objects.create(username=f"cora{n}"))
+    lawyer = LawyerProfile.objects.create(user=User.objects.create(username=f"lee{n}"))
+    return ChatRoom.objects.create(customer=customer, lawyer=lawyer)
+
+
+def get(path, user, **params):
+    request = AsyncRequestFactory().get(path, params)
+    request.user = user
+
+    async def auser():
+        return user
+
+    request.auser = auser
+    return request
+
+
+@override_settings(**FAST)
+class ChatHubTests(TestCase):
+    def setUp(self):
+        self.room = make_room()
+        self.post = sync_to_async(self.room.post_message)
+
+    async def test_waiters_share_a_message_posted_elsewhere(self):
+        hub = ChatHub()
+        # Posted with no hub involved, as by another worker.
+        waiters = [hub.wait(self.room.pk, 0, timeout=2) for _ in range(3)]
+        posting = self.post(self.room.customer.user, "Hello?")
+        *results, message = await asyncio.gather(*waiters, posting)
+        for messages in results:
+            self.assertEqual([m["id"] for m in messages], [message.pk])
+        self.assertEqual(hub._channels, {})
+
+    async def test_only_rooms_with_new_messages_are_read(self):
+        quiet = await sync_to_async(make_room)(2)
+        hub = ChatHub()
+        with mock.patch.object(
+            chat_hub, "afetch_messages", wraps=chat_hub.afetch_messages
+        ) as fetch:
+            busy_wait = hub.wait(self.room.pk, 0, timeout=1)
+            quiet_wait = hub.wait(quiet.pk, 0, timeout=0.5)
+            busy, still, message = await asyncio.gather(
+                busy_wait, quiet_wait, self.post(self.room.customer.user, "Hello?")
+            )
+        self.assertEqual([m["id"] for m in busy], [message.pk])
+        self.assertEqual(still, [])
+        self.assertEqual({call.args[0] for call in fetch.call_args_list}, {self.room.pk})
+
+    async def test_bogus_after_does_not_stall_the_room(self):
+        hub = ChatHub()
+        bogus = hub.wait(self.room.pk, 10**12, timeout=2)
+        normal = hub.wait(self.room.pk, 0, timeout=2)
+        first, second, message = await asyncio.gather(
+            bogus, normal, self.post(self.room.customer.user, "Hello?")
+        )
+        self.assertEqual([m["id"] for m in first], [message.pk])
+        self.assertEqual([m["id"] for m in second], [message.pk])
+
+    async def test_times_out_empty(self):
+        self.assertEqual(await ChatHub().wait(self.room.pk, 0, timeout=0.1), [])
+
+    async def test_catch_up_below_the_buffer(self):
+        first = await self.post(self.room.customer.user, "One")
+        second = await self.post(self.room.lawyer.user, "Two")
+        messages = await ChatHub().wait(self.room.pk, 0, timeout=1)
+        self.assertEqual([m["id"] for m in messages], [first.pk, second.pk])
+
+
+@override_settings(**FAST)
+class AsyncChatViewTests(TestCase):
+    def setUp(self):
+        self.room = make_room()
+        self.user = self.room.customer.user
+
+    async def test_stream_sends_new_messages(self):
+        request = get(f"/chat/{self.room.pk}/stream/", self.user, after=0)
+        response = await async_views.chat_stream(request, chat_id=self.room.pk)
+        self.assertTrue(response.is_async)
+        body = aiter(response.streaming_content)
+        self.assertEqual(await anext(body), b"retry: 2000\n\n")
+
+        message = await sync_to_async(self.room.post_message)(self.room.lawyer.user, "Hi")
+        event = (await anext(body)).decode()
+        self.assertIn(f"id: {message.pk}\n", event)
+        data = json.loads(event.split("data: ", 1)[1])
+        self.assertEqual(data["message"], "Hi")
+        await body.aclose()
+
+    async def test_poll(self):
+        message = await sync_to_async(self.room.post_message)(self.room.lawyer.user, "Hi")
+        request = get(f"/chat/{self.room.pk}/poll/", self.user, after=0)
+        response = await async_views.chat_poll(request, chat_id=self.room.pk)
+        self.assertEqual(
+            [m["id"] for m in json.loads(response.content)["messages"]], [message.pk]
+        )
+
+    async def test_other_users_get_404(self):
+        stranger = await User.objects.acreate(username="stranger")
+        with self.assertRaises(Http404):
+            await async_views.chat_poll(get("/", stranger), chat_id=self.room.pk)
+
+
+class SyncChatViewTests(TestCase):
+    def setUp(self):
+        self.room = make_room()
+        self.client.force_login(self.room.customer.user)
+
+    def test_no_stream_on_sync_workers(self):
+        response = self.client.get(reverse("chat_stream", args=[self.room.pk]))
+        self.assertEqual(response.status_code, 204)
+
+    def test_poll_answers_at_once(self):
+        url = reverse("chat_poll", args=[self.room.pk])
+        started = time.monotonic()
+        self.assertEqual(self.client.get(url, {"after": 0}).json(), {"messages": []})
+        self.assertLess(time.monotonic() - started, 1)
+
+        message = self.room.post_message(self.room.lawyer.user, "Hi")
+        data = self.client.get(url, {"after": 0}).json()
+        self.assertEqual([m["id"] for m in data["messages"]], [message.pk])
+
+    def test_page_is_revalidated_when_the_csrf_secret_changes(self):
+        url = reverse("chat_view", args=[self.room.pk])
+        self.client.get(url)  # sets the CSRF cookie
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 304)
+
+        # As after a re-login, which rotates the secret.
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = get_random_string(32)
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
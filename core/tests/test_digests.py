@@ -0,0 +1,131 @@
+"""
+Lawyer digests (core.digests): routing by the current specialities, and
+no lawyer mailed twice when a pass fails partway and is resumed.
+"""
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core import digests, facets, mailer
+from core.models import LawyerProfile, PublicQuestion, QuestionDigestRun
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+FLAKY = "core.tests.test_digests.FlakyBackend"
+
+
+class FlakyBackend(EmailBackend):
+    """The locmem backend, failing for the addresses in `failing`."""
+    failing = set()
+
+    def send_messages(self, messages):
+        if any(address in self.failing for m in messages for address in m.to):
+            raise SMTPException("mailbox unavailable")
+        return super().send_messages(messages)
+
+
+def make_lawyer(n, speciality="Tax"):
+    user = User.objects.create(username=f"lawyer{n}", email=f"lawyer{n}@example.com")
+    return LawyerProfile.objects.create(user=user, speciality=speciality, is_approved=True)
+
+
+def recipients():
+    return sorted(address for m in mail.outbox for address in m.to)
+
+
+@override_settings(CACHES=LOCMEM, EMAIL_POOL_SIZE=2, EMAIL_POOL_CHUNK_SIZE=2)
+class DigestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # The class get_connection() will load, whatever this module's name.
+        self.backend = import_string(FLAKY)
+        self.addCleanup(setattr, self.backend, "failing", set())
+        for n in range(6):
+            make_lawyer(n)
+
+    def ask(self, text="How is a tax audit handled?"):
+        return PublicQuestion.objects.create(question_text=text)
+
+    def test_specialities_are_read_fresh(self):
+        facets.facet_counts({})  # caches the cells
+        make_lawyer(10, speciality="Immigration")
+        self.assertIn("immigration", facets.specialities())
+
+    def test_one_digest_per_lawyer(self):
+        self.ask()
+        self.ask("Can the audit go back ten years?")
+        run = digests.send_digests()
+        self.assertEqual(run.emails, 6)
+        self.assertIsNotNone(run.completed_at)
+        self.assertEqual(recipients(), [f"lawyer{n}@example.com" for n in range(6)])
+        self.assertIsNone(digests.send_digests())
+
+    def test_resumed_run_skips_mailed_lawyers(self):
+        self.ask()
+        self.backend.failing = {"lawyer3@example.com"}
+        with self.assertRaises(SMTPException):
+            digests.send_digests(backend=FLAKY)
+        run = QuestionDigestRun.objects.get()
+        self.assertIsNone(run.completed_at)
+        mailed = recipients()
+        self.assertNotIn("lawyer3@example.com", mailed)
+        self.assertEqual(sorted(run.deliveries.values_list("email", flat=True)), mailed)
+
+        self.backend.failing = set()
+        self.assertEqual(digests.send_digests(backend=FLAKY), run)
+        self.assertEqual(recipients(), [f"lawyer{n}@example.com" for n in range(6)])
+        run.refresh_from_db()
+        self.assertEqual(run.emails, 6)
+        self.assertIsNotNone(run.completed_at)
+
+    def sending(self, before_record):
+        """Patch the mailer to call before_record(run) ahead of each on_sent."""
+        send = mailer.send_pooled
+
+        def send_pooled(messages, backend=None, on_sent=None):
+            def record(done):
+                before_record(QuestionDigestRun.objects.get())
+                on_sent(done)
+
+            return send(messages, backend=backend, chunk_size=1, on_sent=record)
+
+        return mock.patch.object(mailer, "send_pooled", send_pooled)
+
+    def test_lease_is_renewed_while_sending(self):
+        self.ask()
+        leases = []
+        with self.sending(lambda run: leases.append(run.locked_until)):
+            run = digests.send_digests()
+        self.assertEqual(run.emails, 6)
+        self.assertEqual(leases, sorted(set(leases)))
+        self.assertEqual(len(leases), 6)
+
+    def test_reclaimed_run_stops_sending(self):
+        self.ask()
+        other = timezone.now() + timedelta(hours=1)
+
+        def reclaim(run):
+            QuestionDigestRun.objects.update(locked_until=other)
+
+        with override_settings(EMAIL_POOL_SIZE=1), self.sending(reclaim):
+            self.assertIsNone(digests.send_digests())
+        run = QuestionDigestRun.objects.get()
+        self.assertEqual(run.locked_until, other)
+        self.assertIsNone(run.completed_at)
+        self.assertLess(len(mail.outbox), 6)
+        self.assertEqual(sorted(run.deliveries.values_list("email", flat=True)), recipients())
+
+    def test_run_being_sent_is_not_resumed(self):
+        self.ask()
+        run = digests._claim_new()
+        self.assertIsNone(digests.send_digests())
+        self.assertEqual(mail.outbox, [])
+        run.refresh_from_db()
+        self.assertIsNone(run.completed_at)
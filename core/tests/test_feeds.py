@@ -0,0 +1,122 @@
+"""
+Query counts for the list pages.
+
+Each page must cost the same fixed number of queries however many rows it
+shows: answers, lawyers and users come preloaded (core.feeds,
+select_related), never one lookup per row. Every test renders the page
+with a few rows and with many and expects the same count.
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import CustomerProfile, LawyerProfile, PublicAnswer, PublicQuestion
+
+# The page cache would hide the queries after the first request; with the
+# dummy cache every request does its full work.
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+# A logged-in request also loads the session and the user (with its roles,
+# core.roles.RolesBackend).
+SESSION_QUERIES = 2
+
+
+def make_lawyer(n, **fields):
+    user = User.objects.create(
+        username=f"lawyer{n}", email=f"lawyer{n}@example.com", first_name="Lee", last_name=f"L{n}"
+    )
+    values = {"speciality": "Family law", "years_of_practice": 5, "is_approved": True}
+    values.update(fields)
+    return LawyerProfile.objects.create(user=user, **values)
+
+
+def make_customer(name="customer"):
+    user = User.objects.create(username=name, email=f"{name}@example.com")
+    return CustomerProfile.objects.create(user=user)
+
+
+def make_answered_questions(count, customer=None):
+    customer = customer or make_customer(f"asker{count}")
+    for i in range(count):
+        question = PublicQuestion.objects.create(
+            customer=customer, question_text=f"Question {i}?", is_answered=True
+        )
+        PublicAnswer.objects.create(
+            question=question, lawyer=make_lawyer(f"{count}-{i}"), answer_text=f"Answer {i}."
+        )
+
+
+@override_settings(CACHES=NO_CACHE)
+class ListQueriesTestCase(TestCase):
+    context_name = None
+
+    def login(self):
+        self.client.force_login(make_customer().user)
+
+    def assertPageQueries(self, url, num, rows):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context[self.context_name]), rows)
+
+
+class PublicQuestionListQueriesTests(ListQueriesTestCase):
+    context_name = "questions"
+    # Cache generations + validators (one aggregate) + the page.
+    QUERIES = 3
+
+    def test_fixed_queries_for_few_and_many_rows(self):
+        url = reverse("public_questions")
+        make_answered_questions(2)
+        self.assertPageQueries(url, self.QUERIES, rows=2)
+        make_answered_questions(18)
+        self.assertPageQueries(url, self.QUERIES, rows=20)
+
+    def test_json_page(self):
+        make_answered_questions(15)
+        with self.assertNumQueries(self.QUERIES):
+            data = self.client.get(reverse("public_questions"), {"format": "json"}).json()
+        self.assertEqual(len(data["results"]), 15)
+        self.assertTrue(all(row["answered_by"] for row in data["results"]))
+
+    def test_logged_in(self):
+        make_answered_questions(15)
+        url = reverse("public_questions")
+        self.login()
+        self.assertPageQueries(url, self.QUERIES + SESSION_QUERIES, rows=15)
+
+
+class LawyerListQueriesTests(ListQueriesTestCase):
+    context_name = "lawyers"
+    # Cache generations + validators + facet cells + the page.
+    QUERIES = 4
+
+    def test_fixed_queries_for_few_and_many_rows(self):
+        url = reverse("lawyers_list")
+        for n in range(2):
+            make_lawyer(n)
+        self.assertPageQueries(url, self.QUERIES, rows=2)
+        for n in range(2, 20):
+            make_lawyer(n)
+        self.assertPageQueries(url, self.QUERIES, rows=20)
+
+    def test_filtered(self):
+        for n in range(12):
+            make_lawyer(n, speciality="Immigration" if n % 3 else "Tax")
+        self.assertPageQueries(
+            reverse("lawyers_list") + "?speciality=immigration", self.QUERIES, rows=8
+        )
+
+    def test_json_page(self):
+        for n in range(15):
+            make_lawyer(n)
+        with self.assertNumQueries(self.QUERIES):
+            data = self.client.get(reverse("lawyers_list"), {"format": "json"}).json()
+        self.assertEqual(len(data["results"]), 15)
+
+    def test_logged_in(self):
+        for n in range(15):
+            make_lawyer(n)
+        url = reverse("lawyers_list")
+        self.login()
+        self.assertPageQueries(url, self.QUERIES + SESSION_QUERIES, rows=15)
@@ -0,0 +1,108 @@
+"""
+core.quota under concurrency: however many submissions race for a
+customer's free questions, no more are spent than were left.
+"""
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, OperationalError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core import quota
+from core.models import CustomerProfile, PublicQuestion
+
+WORKERS = 8
+
+
+def make_customer(free=2):
+    user = User.objects.create(username="asker")
+    return CustomerProfile.objects.create(user=user, free_public_questions_remaining=free)
+
+
+def race(target, n=WORKERS):
+    """Run `target` in n threads released together; returns their results."""
+    barrier = threading.Barrier(n)
+    results = []
+
+    def run():
+        try:
+            barrier.wait()
+            results.append(target())
+        except OperationalError as exc:  # e.g. a lock timeout: nothing spent
+            results.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class ConcurrentConsumeTests(TransactionTestCase):
+    def test_consume_never_overspends(self):
+        customer = make_customer(free=2)
+        results = race(lambda: quota.consume(customer.pk))
+        self.assertEqual(results.count(True), 2)
+        self.assertEqual(quota.remaining(customer.pk), 0)
+
+    def test_ask_view_never_overspends(self):
+        customer = make_customer(free=3)
+
+        def submit():
+            client = Client()
+            client.force_login(customer.user)
+            response = client.post(
+                reverse("ask_public_question"), {"question_text": "Is this allowed?"}
+            )
+            return response.status_code
+
+        results = race(submit)
+        self.assertEqual(results.count(302), 3)
+        self.assertEqual(PublicQuestion.objects.filter(customer=customer).count(), 3)
+        self.assertEqual(quota.remaining(customer.pk), 0)
+
+
+class AskQuestionTests(TestCase):
+    def setUp(self):
+        self.customer = make_customer(free=1)
+        self.client.force_login(self.customer.user)
+        self.url = reverse("ask_public_question")
+
+    def test_spends_one_question(self):
+        response = self.client.post(self.url, {"question_text": "Can I break my lease?"})
+        self.assertRedirects(response, reverse("my_questions"), fetch_redirect_response=False)
+        self.assertEqual(quota.remaining(self.customer.pk), 0)
+        self.assertTrue(PublicQuestion.objects.filter(customer=self.customer).exists())
+
+    def test_refused_without_quota(self):
+        self.client.post(self.url, {"question_text": "First?"})
+        response = self.client.post(self.url, {"question_text": "Second?"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PublicQuestion.objects.filter(customer=self.customer).count(), 1)
+
+    def test_failed_insert_gives_the_question_back(self):
+        with mock.patch.object(
+            PublicQuestion.objects, "create", side_effect=IntegrityError("no")
+        ), self.assertRaises(IntegrityError):
+            self.client.post(self.url, {"question_text": "Can I break my lease?"})
+        self.assertEqual(quota.remaining(self.customer.pk), 1)
+
+    def test_empty_question_spends_nothing(self):
+        response = self.client.post(self.url, {"question_text": "  "})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(quota.remaining(self.customer.pk), 1)
+
+    def test_lawyers_are_sent_away(self):
+        from core.models import LawyerProfile
+
+        user = User.objects.create(username="lee")
+        LawyerProfile.objects.create(user=user)
+        self.client.force_login(user)
+        self.assertRedirects(
+            self.client.get(self.url), reverse("my_questions"), fetch_redirect_response=False
+        )
@@ -0,0 +1,57 @@
+"""
+core.roles: roles come with the session's user, so a change made anywhere
+shows up on the user's next request.
+"""
+from django.contrib.auth import get_user
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+
+from core import roles
+from core.models import CustomerProfile, LawyerProfile
+
+
+class RolesBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="lee")
+        self.lawyer = LawyerProfile.objects.create(user=self.user, is_approved=True)
+        self.backend = roles.RolesBackend()
+
+    def roles_for(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        return roles.for_request(request)
+
+    def test_roles_loaded_with_the_user(self):
+        with self.assertNumQueries(1):
+            user = self.backend.get_user(self.user.pk)
+            current = self.roles_for(user)
+        self.assertEqual(current, roles.Roles(None, self.lawyer.pk, True))
+        self.assertTrue(current.is_lawyer)
+
+    def test_revoked_approval_seen_on_next_load(self):
+        self.assertTrue(self.roles_for(self.backend.get_user(self.user.pk)).is_lawyer)
+        # Signals don't run for update(), and nothing is cached to go stale.
+        LawyerProfile.objects.filter(pk=self.lawyer.pk).update(is_approved=False)
+        self.assertFalse(self.roles_for(self.backend.get_user(self.user.pk)).is_lawyer)
+
+    def test_new_profile_seen_on_next_load(self):
+        customer = CustomerProfile.objects.create(user=self.user)
+        current = self.roles_for(self.backend.get_user(self.user.pk))
+        self.assertEqual(current.customer_id, customer.pk)
+
+    def test_user_from_elsewhere_is_loaded(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(self.roles_for(user).is_lawyer)
+
+    def test_session_login(self):
+        self.client.force_login(self.user)
+        backend = self.client.session["_auth_user_backend"]
+        self.assertEqual(backend, "core.roles.RolesBackend")
+
+    def test_session_from_model_backend_stays_logged_in(self):
+        self.client.force_login(self.user, backend="django.contrib.auth.backends.ModelBackend")
+        request = RequestFactory().get("/")
+        request.session = self.client.session
+        self.assertEqual(get_user(request), self.user)
+        self.assertTrue(self.roles_for(get_user(request)).is_lawyer)
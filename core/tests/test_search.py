@@ -0,0 +1,89 @@
+"""
+core.search: prefix matching in the python backend, index rows following
+deletes, and index failures never breaking the save that triggered them.
+"""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+
+from core import search
+from core.models import LawyerProfile, PublicAnswer, PublicQuestion, SearchDocument
+
+
+def ask(text, answered=True):
+    return PublicQuestion.objects.create(question_text=text, is_answered=answered)
+
+
+@override_settings(SEARCH_BACKEND="python")
+class PythonBackendTests(TestCase):
+    def test_prefix_match(self):
+        question = ask("How long does a divorce take?")
+        ask("Can my landlord keep the deposit?")
+        hits = search.search("divor")
+        self.assertEqual([hit.question.pk for hit in hits], [question.pk])
+
+    def test_prefix_range_stops_at_the_prefix(self):
+        ask("Is a divan a sofa?")
+        self.assertEqual(search.search("divor"), [])
+
+    def test_unanswered_not_indexed(self):
+        ask("How long does a divorce take?", answered=False)
+        self.assertEqual(search.search("divorce"), [])
+
+    def test_delete_answered_question(self):
+        question = ask("How long does a divorce take?")
+        lawyer = LawyerProfile.objects.create(user=User.objects.create(username="lee"))
+        PublicAnswer.objects.create(question=question, lawyer=lawyer, answer_text="A year.")
+        # The answer's delete runs inside the question's cascade; it must
+        # not index the question again on its way out.
+        with self.captureOnCommitCallbacks(execute=True):
+            question.delete()
+        connection.check_constraints()
+        self.assertFalse(SearchDocument.objects.exists())
+        self.assertEqual(search.search("divorce"), [])
+
+
+@override_settings(SEARCH_BACKEND="python")
+class SearchQueriesTests(TestCase):
+    # Postings for the terms, corpus stats, document lengths, and the hits'
+    # rows with answer, lawyer and user joined, however many hits.
+    QUERIES = 4
+
+    def answered(self, n):
+        question = ask(f"How long does divorce number {n} take?")
+        user = User.objects.create(username=f"lee{n}", first_name="Lee", last_name=f"L{n}")
+        lawyer = LawyerProfile.objects.create(user=user)
+        PublicAnswer.objects.create(question=question, lawyer=lawyer, answer_text="A year.")
+
+    def search_json(self):
+        url = reverse("search_public_questions")
+        return self.client.get(url, {"q": "divorce", "format": "json"}).json()["results"]
+
+    def test_fixed_queries_for_few_and_many_hits(self):
+        for n in range(2):
+            self.answered(n)
+        with self.assertNumQueries(self.QUERIES):
+            self.assertEqual(len(self.search_json()), 2)
+        for n in range(2, 12):
+            self.answered(n)
+        with self.assertNumQueries(self.QUERIES):
+            results = self.search_json()
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all(row["answered_by"] for row in results))
+
+
+@override_settings(SEARCH_BACKEND="fts5")
+class BrokenIndexTests(TestCase):
+    @skipUnlessDBFeature("can_rollback_ddl")
+    def test_missing_fts_table_does_not_break_saves(self):
+        if not search.fts5_available() or connection.vendor != "sqlite":
+            self.skipTest("needs SQLite with FTS5")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {search.FTS_TABLE}")
+        with self.assertLogs("core.search", "ERROR"):
+            question = ask("How long does a divorce take?")
+        question.question_text = "How long does a divorce take in Ontario?"
+        with self.assertLogs("core.search", "ERROR"):
+            question.save()
+        self.assertTrue(PublicQuestion.objects.filter(pk=question.pk).exists())
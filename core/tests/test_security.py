@@ -0,0 +1,34 @@
+"""
+core.middleware.security: the per-path policies from settings apply to
+their prefixes, and every other path gets the site-wide headers.
+"""
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core.middleware.security import SecurityHeadersMiddleware
+
+
+class SecurityHeadersTests(SimpleTestCase):
+    def headers_for(self, path):
+        middleware = SecurityHeadersMiddleware(lambda request: HttpResponse())
+        return middleware(RequestFactory().get(path))
+
+    def test_chat_gets_its_stricter_policy(self):
+        csp = self.headers_for("/chat/12/")["Content-Security-Policy"]
+        self.assertIn("default-src 'self';", csp)
+        self.assertIn("object-src 'none';", csp)
+        self.assertIn("frame-ancestors 'none';", csp)
+
+    def test_other_paths_get_the_default_policy(self):
+        response = self.headers_for("/questions/")
+        self.assertEqual(
+            response["Content-Security-Policy"],
+            "default-src 'self'; script-src 'self'; style-src 'self';"
+            " img-src 'self'; connect-src 'self';",
+        )
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+    def test_prefix_matches_whole_segments(self):
+        csp = self.headers_for("/chatroom/")["Content-Security-Policy"]
+        self.assertNotIn("object-src", csp)
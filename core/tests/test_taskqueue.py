@@ -0,0 +1,154 @@
+"""
+core.taskqueue: dedup on enqueue, leases on claim, retries with backoff,
+and batches whose failed payloads are retried without the rest.
+"""
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core import taskqueue
+from core.models import CustomerProfile, LawyerProfile, PublicAnswer, PublicQuestion, Task
+from core.taskqueue import BatchFailure, claim, enqueue, execute, task, units
+
+LEASE = 300
+FLAKY = "core.tests.test_taskqueue.FlakyBackend"
+
+@task("tests.flaky", max_attempts=2, backoff=60)
+def flaky(fail=False):
+    if fail:
+        raise ValueError("boom")
+
+
+@task("tests.flaky_batch", batch=True)
+def flaky_batch(payloads):
+    errors = {i: ValueError(p["n"]) for i, p in enumerate(payloads) if p.get("fail")}
+    if errors:
+        raise BatchFailure(errors)
+
+
+class FlakyBackend(EmailBackend):
+    """The locmem backend, failing for the addresses in `failing`."""
+    failing = set()
+
+    def send_messages(self, messages):
+        if any(address in self.failing for m in messages for address in m.to):
+            raise SMTPException("mailbox unavailable")
+        return super().send_messages(messages)
+
+
+def run_due():
+    return [execute(spec, tasks) for spec, tasks in units(claim(50, LEASE))]
+
+
+def make_due():
+    Task.objects.filter(status=Task.PENDING).update(run_at=timezone.now())
+
+
+class TaskQueueTests(TestCase):
+    def test_pending_duplicate_is_dropped(self):
+        enqueue(flaky, dedup_key="k")
+        enqueue(flaky, dedup_key="k")
+        self.assertEqual(Task.objects.count(), 1)
+
+        claim(10, LEASE)
+        # Once the first is running, a new one is queued behind it.
+        enqueue(flaky, dedup_key="k")
+        self.assertEqual(Task.objects.filter(status=Task.PENDING).count(), 1)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_failure_is_retried_with_backoff(self):
+        enqueue(flaky, {"fail": True})
+        before = timezone.now()
+        with self.assertLogs("core.taskqueue", "ERROR"):
+            self.assertEqual(run_due(), [False])
+        t = Task.objects.get()
+        self.assertEqual((t.status, t.attempts), (Task.PENDING, 1))
+        self.assertEqual(t.last_error, "ValueError: boom")
+        self.assertGreaterEqual(t.run_at, before + timedelta(seconds=30))
+        self.assertLessEqual(t.run_at, timezone.now() + timedelta(seconds=60))
+        # Not due until then.
+        self.assertEqual(claim(10, LEASE), [])
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertLessEqual(taskqueue.backoff_delay(60, 3), 240)
+        self.assertGreaterEqual(taskqueue.backoff_delay(60, 3), 120)
+        with self.settings(TASK_MAX_BACKOFF_SECONDS=100):
+            self.assertLessEqual(taskqueue.backoff_delay(60, 10), 100)
+
+    def test_failed_after_max_attempts(self):
+        enqueue(flaky, {"fail": True})
+        with self.assertLogs("core.taskqueue", "ERROR"):
+            run_due()
+            make_due()
+            run_due()
+        t = Task.objects.get()
+        self.assertEqual((t.status, t.attempts), (Task.FAILED, 2))
+        self.assertIsNotNone(t.finished_at)
+        make_due()
+        self.assertEqual(claim(10, LEASE), [])
+
+    def test_claim_skips_leased_tasks(self):
+        enqueue(flaky)
+        [t] = claim(10, LEASE)
+        self.assertEqual(t.status, Task.RUNNING)
+        self.assertEqual(claim(10, LEASE), [])
+
+        # Its worker died: once the lease runs out, the task is claimed again.
+        Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        [again] = claim(10, LEASE)
+        self.assertEqual((again.pk, again.attempts), (t.pk, 2))
+
+    def test_batch_retries_only_failed_payloads(self):
+        for n in range(3):
+            enqueue(flaky_batch, {"n": n, "fail": n == 1})
+        with self.assertLogs("core.taskqueue", "ERROR"):
+            self.assertEqual(run_due(), [False])
+        statuses = dict(Task.objects.values_list("payload__n", "status"))
+        self.assertEqual(statuses, {0: Task.DONE, 1: Task.PENDING, 2: Task.DONE})
+
+        # The retry is a batch of one; the others ran once.
+        Task.objects.filter(payload__n=1).update(payload={"n": 1})
+        make_due()
+        [(spec, retried)] = units(claim(50, LEASE))
+        self.assertEqual([t.payload["n"] for t in retried], [1])
+        self.assertTrue(execute(spec, retried))
+        attempts = dict(Task.objects.values_list("payload__n", "attempts"))
+        self.assertEqual(attempts, {0: 1, 1: 2, 2: 1})
+
+
+@override_settings(EMAIL_BACKEND=FLAKY)
+class QuestionAnsweredTests(TestCase):
+    def setUp(self):
+        self.backend = import_string(FLAKY)
+        self.addCleanup(setattr, self.backend, "failing", set())
+        lawyer = LawyerProfile.objects.create(user=User.objects.create(username="lee"))
+        for n in range(3):
+            user = User.objects.create(username=f"asker{n}", email=f"asker{n}@example.com")
+            question = PublicQuestion.objects.create(
+                customer=CustomerProfile.objects.create(user=user), question_text=f"Q{n}?"
+            )
+            PublicAnswer.objects.create(question=question, lawyer=lawyer, answer_text="A.")
+        Task.objects.exclude(name="notify_question_answered").delete()
+
+    def test_failed_email_is_the_only_one_retried(self):
+        self.backend.failing = {"asker1@example.com"}
+        with self.assertLogs("core.taskqueue", "ERROR"):
+            self.assertEqual(run_due(), [False])
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox), ["asker0@example.com", "asker2@example.com"]
+        )
+        self.assertEqual(Task.objects.filter(status=Task.PENDING).count(), 1)
+
+        self.backend.failing = set()
+        make_due()
+        self.assertEqual(run_due(), [True])
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox),
+            [f"asker{n}@example.com" for n in range(3)],
+        )
@@ -0,0 +1,374 @@
+"""
+Streaming import/export of the core tables as JSONL or CSV.
+
+Used by `manage.py export_data` and `manage.py import_data`. Rows are read
+and written one at a time and imported with bulk_create in fixed-size
+batches, one transaction per batch, so memory stays flat however large the
+file is. Primary keys are kept, so foreign keys line up between files;
+load them in ENTITIES order.
+
+Bulk writes skip model save() and signals, so finish_import() afterwards
+rebuilds what those would have maintained (lawyer facets, the search
+index, chat room counters, cache generations, id sequences).
+"""
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.utils import timezone
+
+from . import caching, facets, search
+from .models import (
+    ChatMessage,
+    ChatRoom,
+    CustomerProfile,
+    LawyerProfile,
+    PublicAnswer,
+    PublicQuestion,
+)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class Entity:
+    model: type
+    fields: tuple
+    # Importing these may read a "username" column instead of "user_id".
+    user_field: str | None = None
+    rebuild: tuple = field(default=())
+
+
+ENTITIES = {
+    "users": Entity(
+        User,
+        (
+            "id", "username", "email", "first_name", "last_name", "password",
+            "is_active", "is_staff", "is_superuser", "date_joined", "last_login",
+        ),
+        rebuild=("facets",),
+    ),
+    "customers": Entity(
+        CustomerProfile,
+        ("id", "user_id", "created_at", "free_public_questions_remaining"),
+        user_field="user_id",
+    ),
+    "lawyers": Entity(
+        LawyerProfile,
+        (
+            "id", "user_id", "speciality", "bar_number", "years_of_practice",
+            "bio", "fee_per_chat", "is_approved", "created_at",
+        ),
+        user_field="user_id",
+        rebuild=("facets",),
+    ),
+    "questions": Entity(
+        PublicQuestion,
+        ("id", "customer_id", "question_text", "created_at", "is_answered"),
+        rebuild=("search", "questions"),
+    ),
+    "answers": Entity(
+        PublicAnswer,
+        ("id", "question_id", "lawyer_id", "answer_text", "created_at"),
+        rebuild=("search", "questions"),
+    ),
+    "chatrooms": Entity(
+        ChatRoom,
+        (
+            "id", "customer_id", "lawyer_id", "created_at", "last_activity_at",
+            "last_message_id", "customer_last_read_id", "lawyer_last_read_id",
+            "customer_unread", "lawyer_unread",
+        ),
+    ),
+    "messages": Entity(
+        ChatMessage,
+        ("id", "room_id", "sender_id", "message", "created_at"),
+        rebuild=("rooms",),
+    ),
+}
+
+
+def detect_format(path, explicit=None) -> str:
+    if explicit:
+        return explicit
+    return "csv" if str(path).lower().endswith(".csv") else "jsonl"
+
+
+# EXPORT ----------------------------------------------------------------------
+
+def export_rows(entity: Entity, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield one dict per row, streamed from the database in pk order."""
+    rows = entity.model.objects.order_by("pk").values_list(*entity.fields)
+    for values in rows.iterator(chunk_size=batch_size):
+        yield dict(zip(entity.fields, values))
+
+
+def write_rows(rows, fh, fmt, fields):
+    """Write dicts to `fh` as JSONL or CSV. Returns the row count."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(fh, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: "" if v is None else _plain(v) for k, v in row.items()})
+            count += 1
+    else:
+        for row in rows:
+            fh.write(json.dumps({k: _plain(v) for k, v in row.items()}))
+            fh.write("\n")
+            count += 1
+    return count
+
+
+def _plain(value):
+    # Full precision: DjangoJSONEncoder would cut datetimes to milliseconds.
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+# IMPORT ----------------------------------------------------------------------
+
+def read_rows(fh, fmt, renames=None):
+    """Yield one dict per input row, with columns renamed per `renames`."""
+    renames = renames or {}
+    if fmt == "csv":
+        source = csv.DictReader(fh)
+    else:
+        source = (json.loads(line) for line in fh if line.strip())
+    for row in source:
+        yield {renames.get(k, k): v for k, v in row.items()}
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@contextmanager
+def preserve_timestamps(model):
+    """
+    Let bulk_create keep imported created_at values; auto_now_add would
+    otherwise overwrite them with the import time. Importer fills the
+    field in itself for rows that do not carry it.
+    """
+    patched = [f for f in model._meta.concrete_fields if getattr(f, "auto_now_add", False)]
+    for f in patched:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f in patched:
+            f.auto_now_add = True
+
+
+def _is_hashed(value) -> bool:
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return False
+    return True
+
+
+class Importer:
+    """
+    Turns batches of raw rows into model instances and bulk-inserts them.
+
+    Raw passwords (a "raw_password" column, or a "password" column that is
+    not already a hash) are hashed for a whole batch at once on a thread
+    pool before the batch's transaction opens; PBKDF2 releases the GIL, so
+    this scales with --hash-workers instead of costing a hash per row
+    inside the insert loop.
+    """
+
+    def __init__(self, entity: Entity, update=False, hash_workers=None):
+        self.entity = entity
+        self.update = update
+        self.hash_workers = hash_workers or os.cpu_count() or 1
+        self.model_fields = {
+            f.attname: f for f in entity.model._meta.concrete_fields
+        }
+        self.stamp_fields = [
+            f.attname
+            for f in entity.model._meta.concrete_fields
+            if getattr(f, "auto_now_add", False)
+        ]
+
+    def _convert(self, name, value):
+        model_field = self.model_fields[name]
+        if value == "" and model_field.null:
+            return None
+        try:
+            return model_field.to_python(value)
+        except ValidationError as exc:
+            raise ValueError(f"{name}={value!r}: {'; '.join(exc.messages)}")
+
+    def _hash_passwords(self, rows):
+        pending = []
+        for row in rows:
+            raw = row.pop("raw_password", None)
+            if raw is None and row.get("password") and not _is_hashed(row["password"]):
+                raw = row["password"]
+            if raw is not None:
+                pending.append((row, raw))
+        if not pending:
+            return
+        if len(pending) == 1 or self.hash_workers == 1:
+            hashes = [make_password(raw) for _, raw in pending]
+        else:
+            with ThreadPoolExecutor(max_workers=self.hash_workers) as pool:
+                hashes = list(pool.map(make_password, [raw for _, raw in pending]))
+        for (row, _), hashed in zip(pending, hashes):
+            row["password"] = hashed
+
+    def _resolve_usernames(self, rows):
+        name = self.entity.user_field
+        wanted = {row["username"] for row in rows if "username" in row and not row.get(name)}
+        if not wanted:
+            return
+        ids = dict(User.objects.filter(username__in=wanted).values_list("username", "id"))
+        for row in rows:
+            username = row.pop("username", None)
+            if username is not None and not row.get(name):
+                if username not in ids:
+                    raise ValueError(f"Unknown username {username!r}.")
+                row[name] = ids[username]
+
+    def instances(self, rows):
+        if self.entity.model is User:
+            self._hash_passwords(rows)
+        elif self.entity.user_field:
+            self._resolve_usernames(rows)
+
+        now = timezone.now()
+        objs = []
+        for row in rows:
+            values = {
+                name: self._convert(name, value)
+                for name, value in row.items()
+                if name in self.model_fields
+            }
+            for name in self.stamp_fields:
+                if values.get(name) is None:
+                    values[name] = now
+            objs.append(self.entity.model(**values))
+        return objs
+
+    def write(self, rows) -> int:
+        columns = set(rows[0])
+        if "raw_password" in columns:
+            columns.add("password")
+        if self.entity.user_field and "username" in columns:
+            columns.add(self.entity.user_field)
+        objs = self.instances(rows)
+        model = self.entity.model
+        with transaction.atomic():
+            if not self.update:
+                model.objects.bulk_create(objs)
+                return len(objs)
+
+            # Rows whose id already exists only update the columns the file
+            # carries; the rest are inserted.
+            ids = [obj.pk for obj in objs if obj.pk is not None]
+            existing = set(model.objects.filter(pk__in=ids).values_list("pk", flat=True))
+            updates = [obj for obj in objs if obj.pk in existing]
+            fields = [
+                self.model_fields[name].name
+                for name in self.model_fields
+                if name in columns and name != "id"
+            ]
+            if updates and fields:
+                model.objects.bulk_update(updates, fields)
+            model.objects.bulk_create([obj for obj in objs if obj.pk not in existing])
+        return len(objs)
+
+
+def import_rows(entity: Entity, rows, batch_size=DEFAULT_BATCH_SIZE, update=False,
+                hash_workers=None, progress=None):
+    """
+    Bulk-insert `rows` (an iterable of dicts) in batches of `batch_size`,
+    one transaction each. Returns the number of rows written.
+    """
+    importer = Importer(entity, update=update, hash_workers=hash_workers)
+    total = 0
+    with preserve_timestamps(entity.model):
+        for batch in batched(rows, batch_size):
+            total += importer.write(batch)
+            if progress:
+                progress(total)
+    return total
+
+
+# AFTER IMPORT ----------------------------------------------------------------
+
+def refresh_room_counters(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recompute every room's last message / activity and unread counts from
+    its messages and read cursors.
+    """
+    newest = ChatMessage.objects.filter(room=OuterRef("pk")).order_by("-id")
+    ChatRoom.objects.filter(pk__in=ChatMessage.objects.values("room_id")).update(
+        last_message_id=Subquery(newest.values("id")[:1]),
+        last_activity_at=Subquery(newest.values("created_at")[:1]),
+    )
+
+    def unread(side):
+        rows = (
+            ChatMessage.objects.filter(id__gt=F(f"room__{side}_last_read_id"))
+            .exclude(sender=F(f"room__{side}__user"))
+            .values("room")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        return {row["room"]: row["n"] for row in rows}
+
+    customer_unread = unread("customer")
+    lawyer_unread = unread("lawyer")
+    rooms = ChatRoom.objects.only("id", "customer_unread", "lawyer_unread")
+    for batch in batched(rooms.iterator(chunk_size=batch_size), batch_size):
+        for room in batch:
+            room.customer_unread = customer_unread.get(room.pk, 0)
+            room.lawyer_unread = lawyer_unread.get(room.pk, 0)
+        ChatRoom.objects.bulk_update(batch, ["customer_unread", "lawyer_unread"])
+
+
+def reset_sequences(models):
+    statements = connection.ops.sequence_reset_sql(no_style(), list(models))
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def finish_import(entities):
+    """Rebuild derived data for the entities just imported."""
+    reset_sequences({entity.model for entity in entities})
+    steps = {step for entity in entities for step in entity.rebuild}
+    if "facets" in steps:
+        facets.rebuild()
+    if "search" in steps:
+        search.rebuild()
+    if "questions" in steps:
+        caching.bump_generation(caching.QUESTIONS)
+    if "rooms" in steps:
+        refresh_room_counters()
+    return sorted(steps)
@@ -6,6 +6,16 @@ urlpatterns = [
     path("", views.home, name="home"),
     path("pricing/", views.pricing, name="pricing"),
     path("public-questions/", views.public_questions, name="public_questions"),
+    path(
+        "public-questions/search/",
+        views.search_public_questions,
+        name="search_public_questions",
+    ),
+    path(
+        "public-questions/ask/",
+        views.ask_public_question,
+        name="ask_public_question",
+    ),
     path("lawyers/", views.lawyers_list, name="lawyers_list"),
 
     path("register/customer/", views.register_customer, name="register_customer"),
@@ -19,6 +29,16 @@ urlpatterns = [
     path("my-questions/", views.my_questions, name="my_questions"),
     path("my-customers/", views.my_customers, name="my_customers"),
     path("chat/<int:chat_id>/", views.chat_view, name="chat_view"),
+    path("chat/<int:chat_id>/stream/", views.chat_stream, name="chat_stream"),
+    path("chat/<int:chat_id>/poll/", views.chat_poll, name="chat_poll"),
+    path("chat/<int:chat_id>/messages/", views.chat_messages, name="chat_messages"),
+    path("chat/<int:chat_id>/read/", views.chat_mark_read, name="chat_mark_read"),
+
+    path(
+        "ops/instrumentation/",
+        views.instrumentation_report,
+        name="instrumentation_report",
+    ),
 
     path(
         "public-questions/<int:question_id>/answer/",
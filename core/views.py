@@ -1,18 +1,80 @@
+from django.conf import settings
 from django.contrib.auth import login
-from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import transaction
-from django.shortcuts import render, redirect
-
+from django.db.models import Q
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+)
+from django.shortcuts import get_object_or_404, render, redirect
+from django.utils.crypto import salted_hmac
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from . import accounts, caching, facets, feeds, quota, roles, search, streaming, tasks
+from .chat_hub import fetch_messages, message_dict
+from .middleware import instrumentation
+from .pagination import page_json_response, paginate_request, wants_json
 from .models import (
+    ChatRoom,
     CustomerProfile,
     LawyerProfile,
     PublicQuestion,
 )
 
 
+# Keyset orderings for the paginated lists. Each ends in a unique column so
+# the order is total and cursors never skip or repeat a row.
+QUESTION_KEYS = (("created_at", True), ("id", True))
+LAWYER_KEYS = (
+    ("user__last_name", False),
+    ("user__first_name", False),
+    ("user__username", False),
+)
+INBOX_KEYS = (("last_activity_at", True), ("id", True))
+INBOX_PREVIEW_SIZE = 10
+
+
+def _question_json(q):
+    answer = getattr(q, "answer_obj", None)
+    lawyer = answer.lawyer if answer else None
+    return {
+        "id": q.pk,
+        "question_text": q.question_text,
+        "answer": q.answer,
+        "answered_by": lawyer.name if lawyer else None,
+        "is_answered": q.is_answered,
+        "created_at": q.created_at.isoformat(),
+    }
+
+
+def _lawyer_json(lawyer):
+    return {
+        "id": lawyer.pk,
+        "name": lawyer.name,
+        "speciality": lawyer.speciality,
+        "years_of_practice": lawyer.years_of_practice,
+        "bio": lawyer.bio,
+        "fee_per_chat": (
+            str(lawyer.fee_per_chat) if lawyer.fee_per_chat is not None else None
+        ),
+    }
+
+
+def _inbox_json(room, side):
+    other = room.customer if side == "lawyer" else room.lawyer
+    return {
+        "id": room.pk,
+        "with": other.user.username if side == "lawyer" else other.name,
+        "unread": getattr(room, f"{side}_unread"),
+        "last_activity_at": room.last_activity_at.isoformat(),
+    }
+
+
 # HOME / ABOUT ---------------------------------------------------------------
 
+@caching.cache_page_for_anonymous(caching.MARKETING)
 def home(request):
     # Your "About Us" content lives in about.html and is styled via base.html.
     return render(request, "about.html")
@@ -20,31 +82,87 @@ def home(request):
 
 # PUBLIC QUESTIONS -----------------------------------------------------------
 
+@condition(
+    etag_func=caching.list_etag(caching.QUESTIONS),
+    last_modified_func=caching.list_last_modified(caching.QUESTIONS),
+)
+@caching.cache_page_for_anonymous(caching.QUESTIONS)
 def public_questions(request):
     """
     Show answered public questions.
 
     Template: public_questions.html
     Expects 'questions' with .question_text and .answer.
+    Answers and lawyers come preloaded from the feed (no per-row queries).
+    Paginated by cursor; ?format=json returns the page as JSON, ?stream=1
+    streams the whole list (core.streaming).
+    """
+    if streaming.wants_stream(request):
+        return streaming.stream_list(
+            request, "public_questions.html", {}, feeds.answered_questions(),
+            "includes/question_card.html", "q", caching.fragment_versions(request),
+        )
+    page = paginate_request(request, feeds.answered_questions(), QUESTION_KEYS)
+    if wants_json(request):
+        return page_json_response(page, _question_json)
+    return render(
+        request,
+        "public_questions.html",
+        {"questions": page.items, "page": page, **caching.fragment_versions(request)},
+    )
+
+
+SEARCH_RESULTS = 20
+
+
+def search_public_questions(request):
+    """
+    Full-text search over answered questions and answers (?q=).
+    Results are BM25-ranked with highlighted snippets; ?format=json for
+    API clients.
     """
-    questions = (
-        PublicQuestion.objects.filter(is_answered=True)
-        .order_by("-created_at")
+    query = request.GET.get("q", "").strip()
+    hits = search.search(query, limit=SEARCH_RESULTS) if query else []
+
+    if wants_json(request):
+        return JsonResponse(
+            {
+                "query": query,
+                "results": [
+                    {
+                        **_question_json(hit.question),
+                        "score": round(hit.score, 4),
+                        "snippet": str(hit.snippet),
+                    }
+                    for hit in hits
+                ],
+            }
+        )
+    return render(
+        request,
+        "search_results.html",
+        {"query": query, "hits": hits},
     )
-    return render(request, "public_questions.html", {"questions": questions})
 
 
 # PRICING --------------------------------------------------------------------
 
+@caching.cache_page_for_anonymous(caching.MARKETING)
 def pricing(request):
     return render(request, "pricing.html")
 
 
 # LAWYERS LIST ---------------------------------------------------------------
 
+@condition(
+    etag_func=caching.list_etag(caching.LAWYERS),
+    last_modified_func=caching.list_last_modified(caching.LAWYERS),
+)
+@caching.cache_page_for_anonymous(caching.LAWYERS)
 def lawyers_list(request):
     """
-    Show all approved lawyers.
+    Show approved lawyers, optionally filtered by ?speciality=, ?experience=
+    and ?fee= (bucket keys), with facet counts for each filter.
 
     Template: lawyers_list.html
     Expects 'lawyers' queryset with:
@@ -53,18 +171,43 @@ def lawyers_list(request):
       - years_of_practice
       - bio
       - fee_per_chat
+
+    ?stream=1 streams every matching lawyer instead of one page.
     """
-    lawyers = (
-        LawyerProfile.objects.filter(is_approved=True)
-        .select_related("user")
-        .order_by("user__last_name", "user__first_name", "user__username")
+    filters = facets.parse_filters(request.GET)
+    lawyers = facets.filter_lawyers(
+        LawyerProfile.objects.filter(is_approved=True).select_related("user"),
+        filters,
+    )
+    facet_counts = facets.facet_counts(filters, request)
+    if streaming.wants_stream(request):
+        return streaming.stream_list(
+            request,
+            "lawyers_list.html",
+            {"facets": facet_counts, "filters": filters},
+            lawyers.order_by(*(("-" if desc else "") + key for key, desc in LAWYER_KEYS)),
+            "includes/lawyer_card.html",
+            "lawyer",
+            caching.fragment_versions(request),
+        )
+    page = paginate_request(request, lawyers, LAWYER_KEYS)
+    if wants_json(request):
+        return page_json_response(page, _lawyer_json, facets=facet_counts)
+    return render(
+        request,
+        "lawyers_list.html",
+        {
+            "lawyers": page.items,
+            "page": page,
+            "facets": facet_counts,
+            "filters": filters,
+            **caching.fragment_versions(request),
+        },
     )
-    return render(request, "lawyers_list.html", {"lawyers": lawyers})
 
 
 # REGISTRATION ---------------------------------------------------------------
 
-@transaction.atomic
 def register_customer(request):
     """
     Register a regular customer.
@@ -76,19 +219,13 @@ def register_customer(request):
         password = request.POST.get("password", "")
 
         if username and password:
-            user = User.objects.create_user(
-                username=username,
-                password=password,
-                email=email or "",
-            )
-            CustomerProfile.objects.create(user=user)
+            user = accounts.create_account(username, email, password, CustomerProfile)
             login(request, user)
             return redirect("my_questions")
 
     return render(request, "register_customer.html")
 
 
-@transaction.atomic
 def register_lawyer(request):
     """
     Register a lawyer.
@@ -108,22 +245,62 @@ def register_lawyer(request):
             years_of_practice = 0
 
         if username and password:
-            user = User.objects.create_user(
-                username=username,
-                password=password,
-                email=email or "",
-            )
-            LawyerProfile.objects.create(
-                user=user,
+            user = accounts.create_account(
+                username,
+                email,
+                password,
+                LawyerProfile,
                 speciality=speciality,
                 years_of_practice=years_of_practice,
             )
+            tasks.queue_lawyer_registered(user.lawyer_profile.pk)
             login(request, user)
             return redirect("my_questions")
 
     return render(request, "register_lawyer.html")
 
 
+# ASK A QUESTION -------------------------------------------------------------
+
+@login_required
+def ask_public_question(request):
+    """
+    A customer posts a public question, spending one free question.
+
+    Template: ask_public_question.html
+    Expects 'remaining' (free questions left) and 'error'.
+
+    The quota is spent by core.quota.consume(), a single conditional
+    UPDATE, in the same transaction as the INSERT: two tabs submitting at
+    once can't both spend the last free question, and a failed INSERT
+    gives it back.
+    """
+    current = roles.for_request(request)
+    if not current.is_customer:
+        return redirect("my_questions")
+
+    error = None
+    if request.method == "POST":
+        text = request.POST.get("question_text", "").strip()
+        if not text:
+            error = "Please enter your question."
+        else:
+            with transaction.atomic():
+                if quota.consume(current.customer_id):
+                    PublicQuestion.objects.create(
+                        customer_id=current.customer_id, question_text=text
+                    )
+                    return redirect("my_questions")
+            error = "You have no free questions left. See Pricing for more."
+
+    return render(
+        request,
+        "ask_public_question.html",
+        {"remaining": quota.remaining(current.customer_id), "error": error},
+        status=400 if error else 200,
+    )
+
+
 # MY QUESTIONS ---------------------------------------------------------------
 
 @login_required
@@ -133,24 +310,272 @@ def my_questions(request):
 
     - Customers: see their own public questions (if you later add creation).
     - Lawyers: for now, show answered public questions (read-only).
+
+    ?stream=1 streams all of them instead of one page.
     """
-    customer = getattr(request.user, "customer_profile", None)
-    lawyer = getattr(request.user, "lawyer_profile", None)
+    current = roles.for_request(request)
+    chats = []
+
+    if current.is_customer:
+        questions = feeds.customer_questions(current.customer_id)
+        chats = ChatRoom.objects.inbox_for_customer(current.customer_id)[:INBOX_PREVIEW_SIZE]
+    elif current.lawyer_id:
+        questions = feeds.answered_questions()
+    else:
+        questions = PublicQuestion.objects.none()
 
-    if customer:
-        questions = (
-            PublicQuestion.objects.filter(customer=customer)
-            .order_by("-created_at")
+    if streaming.wants_stream(request):
+        return streaming.stream_list(
+            request, "my_questions.html", {"chats": chats}, questions,
+            "includes/my_question_card.html", "q",
         )
-    elif lawyer:
-        questions = (
-            PublicQuestion.objects.filter(is_answered=True)
-            .order_by("-created_at")
+    page = paginate_request(request, questions, QUESTION_KEYS)
+    if wants_json(request):
+        return page_json_response(page, _question_json)
+    return render(
+        request,
+        "my_questions.html",
+        {"questions": page.items, "page": page, "chats": chats},
+    )
+
+
+@login_required
+def my_customers(request):
+    """
+    Lawyer inbox: their chat rooms, most recent activity first, with the
+    unread count for each. One indexed query on ChatRoom however many
+    rooms or messages the lawyer has.
+    """
+    lawyer_id = roles.for_request(request).lawyer_id
+    if lawyer_id is None:
+        return redirect("my_questions")
+
+    page = paginate_request(
+        request, ChatRoom.objects.inbox_for_lawyer(lawyer_id), INBOX_KEYS
+    )
+    if wants_json(request):
+        return page_json_response(page, lambda room: _inbox_json(room, "lawyer"))
+    return render(
+        request,
+        "chats/my_customers.html",
+        {"chats": page.items, "page": page},
+    )
+
+
+# CHAT -----------------------------------------------------------------------
+
+def _get_room(request, chat_id):
+    """
+    The ChatRoom if the logged-in user is its customer or lawyer, else 404.
+    """
+    return get_object_or_404(
+        ChatRoom.objects.select_related("customer__user", "lawyer__user"),
+        Q(customer__user=request.user) | Q(lawyer__user=request.user),
+        pk=chat_id,
+    )
+
+
+def _after_id(request):
+    raw = request.GET.get("after") or request.headers.get("Last-Event-ID") or "0"
+    try:
+        return max(int(raw), 0)
+    except ValueError:
+        return 0
+
+
+def _room_state(request, chat_id):
+    """
+    The denormalized room fields the chat validators need, fetched once per
+    request (or None if the user is not in the room; the view then 404s).
+    """
+    if not hasattr(request, "_room_state"):
+        request._room_state = (
+            ChatRoom.objects.filter(
+                Q(customer__user=request.user) | Q(lawyer__user=request.user),
+                pk=chat_id,
+            )
+            .values(
+                "last_message_id",
+                "customer_unread",
+                "lawyer_unread",
+                "lawyer__user_id",
+            )
+            .first()
         )
+    return request._room_state
+
+
+def _chat_etag(request, chat_id):
+    """
+    The page embeds the user's CSRF token, so the validator covers the CSRF
+    secret too: after a re-login rotates it, a cached page would post a
+    stale token. There is no Last-Modified for the same reason.
+    """
+    state = _room_state(request, chat_id)
+    if state is None:
+        return None
+    side = "lawyer" if state["lawyer__user_id"] == request.user.pk else "customer"
+    csrf = salted_hmac("core.views.chat_etag", request.META.get("CSRF_COOKIE", ""))
+    return (
+        f"room-{chat_id}-{state['last_message_id']}"
+        f"-u{request.user.pk}-{state[f'{side}_unread']}-{csrf.hexdigest()[:16]}"
+    )
+
+
+@login_required
+@condition(etag_func=_chat_etag)
+def chat_view(request, chat_id):
+    """
+    Chat page. The history is rendered once; new messages then arrive over
+    the event stream (chat_stream) and are sent with a background POST that
+    gets back JSON instead of a re-rendered page.
+    """
+    room = _get_room(request, chat_id)
+
+    if request.method == "POST":
+        text = request.POST.get("message", "").strip()
+        if text:
+            message = room.post_message(request.user, text)
+            tasks.queue_unread_messages(room, request.user)
+            if "application/json" in request.headers.get("Accept", ""):
+                return JsonResponse(message_dict(message), status=201)
+        return redirect("chat_view", chat_id=room.pk)
+
+    window = getattr(settings, "CHAT_WINDOW_SIZE", 50)
+    chat_messages, has_older = room.latest_messages(window)
+    if chat_messages:
+        room.mark_read(request.user, chat_messages[-1].pk)
+    return render(
+        request,
+        "chat.html",
+        {
+            "chat": room,
+            "chat_messages": chat_messages,
+            "has_older": has_older,
+            "first_id": chat_messages[0].pk if chat_messages else 0,
+            "last_id": chat_messages[-1].pk if chat_messages else 0,
+        },
+    )
+
+
+@login_required
+@require_POST
+def chat_mark_read(request, chat_id):
+    """
+    Called by chat.js as streamed messages are shown: moves the user's
+    read cursor to ?last_id= (POST field).
+    """
+    room = _get_room(request, chat_id)
+    try:
+        last_id = int(request.POST.get("last_id", ""))
+    except ValueError:
+        return HttpResponseBadRequest("last_id is required.")
+    room.mark_read(request.user, last_id)
+    return HttpResponse(status=204)
+
+
+MAX_MESSAGE_WINDOW = 200
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+@login_required
+@require_GET
+def chat_messages(request, chat_id):
+    """
+    One window of a room's history:
+
+        ?before=<id>   messages older than id (lazy-loading history)
+        ?after=<id>    messages newer than id
+        (neither)      the latest messages
+
+    &limit= caps the window (max MAX_MESSAGE_WINDOW). Returns JSON, or an
+    HTML fragment of message bubbles with ?format=html.
+    """
+    room = _get_room(request, chat_id)
+    limit = _int_param(request, "limit") or getattr(settings, "CHAT_WINDOW_SIZE", 50)
+    limit = max(1, min(limit, MAX_MESSAGE_WINDOW))
+
+    before = _int_param(request, "before")
+    after = _int_param(request, "after")
+    if before is not None:
+        rows, has_more = room.messages_before(before, limit)
+    elif after is not None:
+        rows, has_more = room.messages_after(after, limit)
     else:
-        questions = PublicQuestion.objects.none()
+        rows, has_more = room.latest_messages(limit)
+
+    if request.GET.get("format") == "html":
+        response = render(
+            request,
+            "includes/chat_messages.html",
+            {"chat_messages": rows},
+        )
+        response["X-Has-More"] = "1" if has_more else "0"
+        return response
+
+    return JsonResponse(
+        {"messages": [message_dict(m) for m in rows], "has_more": has_more}
+    )
+
 
-    return render(request, "my_questions.html", {"questions": questions})
+# Live streams and long-polls are served by the ASGI profile only
+# (core.async_views): on a sync worker each open one would hold the whole
+# worker. These sync versions answer at once and chat.js polls instead.
+
+@login_required
+@require_GET
+def chat_stream(request, chat_id):
+    """
+    No event stream on sync workers. 204 tells EventSource not to
+    reconnect; chat.js then polls chat_poll.
+    """
+    _get_room(request, chat_id)
+    return HttpResponse(status=204)
+
+
+@login_required
+@require_GET
+def chat_poll(request, chat_id):
+    """
+    Messages newer than ?after=, returned at once rather than waited for;
+    chat.js asks again every few seconds.
+    """
+    room = _get_room(request, chat_id)
+    return JsonResponse({"messages": fetch_messages(room.pk, _after_id(request))})
+
+
+# INSTRUMENTATION ------------------------------------------------------------
+
+@user_passes_test(lambda u: u.is_active and u.is_staff)
+def instrumentation_report(request):
+    """
+    Staff-only dump of this worker's request instrumentation:
+
+        GET                  per-route histograms + slowest query fingerprints
+                             (&top=N, default 20)
+        GET ?profile=<name>  accumulated cProfile output for one URL name
+        POST                 reset everything
+    """
+    registry = instrumentation.registry
+    if request.method == "POST":
+        registry.reset()
+        return HttpResponse(status=204)
+
+    name = request.GET.get("profile")
+    if name:
+        text = registry.profile_text(name)
+        if text is None:
+            return HttpResponse("No profile samples for that route.", status=404)
+        return HttpResponse(text, content_type="text/plain")
+
+    top = _int_param(request, "top") or instrumentation.DEFAULT_TOP_QUERIES
+    return JsonResponse(registry.snapshot(top=max(1, min(top, 200))))
 
 
 # CUSTOM 404 (optional hook) -------------------------------------------------
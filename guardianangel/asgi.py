@@ -0,0 +1,17 @@
+import os
+from django.core.asgi import get_asgi_application
+
+# Tell Django which settings file to use
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'guardianangel.settings')
+
+# ASGI serves the async versions of the read-only views and the live chat
+# endpoints (core/async_views.py)
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'guardianangel.urls_async')
+
+# No persistent connections: every request runs its sync code on a thread
+# of its own, so a kept connection would never be reused
+# (guardianangel/database.py)
+os.environ.setdefault('DJANGO_CONN_MAX_AGE', '0')
+
+# Create the ASGI application object (used for long-lived chat streams)
+application = get_asgi_application()
@@ -0,0 +1,39 @@
+"""
+Database routers.
+
+ReplicaRouter sends ORM reads to the "replica" alias (see
+guardianangel.database) only while the current request has been marked
+replica-safe by core.middleware.replica.ReplicaRoutingMiddleware: a GET
+to one of the read-only pages in REPLICA_READ_VIEWS from a client that
+has not written recently. Everything else reads and writes "default".
+Reads made while "default" is inside a transaction also stay there, so a
+request always sees its own uncommitted writes.
+"""
+from contextvars import ContextVar
+
+from django.db import connections
+
+from .database import REPLICA_ALIAS
+
+# Set per request by ReplicaRoutingMiddleware; False outside requests
+# (management commands, background threads).
+use_replica = ContextVar("use_replica", default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not use_replica.get() or REPLICA_ALIAS not in connections:
+            return "default"
+        if connections["default"].in_atomic_block:
+            return "default"
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as default.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == "default"
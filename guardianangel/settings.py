@@ -1,6 +1,9 @@
 import os
+import sys
 from pathlib import Path
 
+from .database import databases_from_env
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "change-me-in-prod")
@@ -25,15 +28,18 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.static.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.replica.ReplicaRoutingMiddleware",
 ]
 
-ROOT_URLCONF = "guardianangel.urls"
+# guardianangel/asgi.py switches this to guardianangel.urls_async.
+ROOT_URLCONF = os.environ.get("DJANGO_ROOT_URLCONF", "guardianangel.urls")
 
 TEMPLATES = [
     {
@@ -46,19 +52,79 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "core.context_processors.user_roles",
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = "guardianangel.wsgi.application"
+ASGI_APPLICATION = "guardianangel.asgi.application"
+
+# Databases from the environment (guardianangel/database.py). Without
+# DATABASE_URL: SQLite tuned for several gunicorn workers (WAL + pragmas,
+# persistent connections under WSGI, IMMEDIATE transactions). With
+# DATABASE_URL=postgres://...: PostgreSQL with a psycopg connection pool.
+# DATABASE_REPLICA_URL (or SQLITE_READONLY_CONNECTION=1) adds a "replica"
+# alias that the read-only pages below read from.
+DATABASES = databases_from_env(BASE_DIR / "db.sqlite3")
+DATABASE_ROUTERS = ["guardianangel.routers.ReplicaRouter"]
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Views served from the replica, and how long a client that just wrote
+# stays on the primary so it sees its own writes (core.middleware.replica).
+REPLICA_READ_VIEWS = ["home", "public_questions", "lawyers_list"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "10"))
+
+# Bounded caches for anonymous pages and template fragments. Local memory
+# by default (per worker); set DJANGO_CACHE_DIR to share a file-based cache
+# between workers so they also share entries. Invalidation reaches every
+# worker either way (core.caching keeps the generations in the database).
+CACHE_DIR = os.environ.get("DJANGO_CACHE_DIR")
+if CACHE_DIR:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_DIR,
+            "OPTIONS": {"MAX_ENTRIES": 10000, "CULL_FREQUENCY": 4},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "guardianangel",
+            "OPTIONS": {"MAX_ENTRIES": 5000, "CULL_FREQUENCY": 4},
+        }
     }
+
+PAGE_CACHE_SECONDS = 300
+
+# Password hashing profile for new passwords: "pbkdf2" (Django's default),
+# "argon2" (needs argon2-cffi) or "scrypt". Every profile keeps the other
+# hashers listed so existing hashes still verify (and are upgraded on login).
+PASSWORD_HASHER_PROFILE = os.environ.get("PASSWORD_HASHER_PROFILE", "pbkdf2")
+_PASSWORD_HASHER_FIRST = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "argon2": "core.hashers.TunedArgon2PasswordHasher",
+    "scrypt": "core.hashers.TunedScryptPasswordHasher",
 }
+PASSWORD_HASHERS = [_PASSWORD_HASHER_FIRST[PASSWORD_HASHER_PROFILE]] + [
+    hasher
+    for hasher in (
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+        "core.hashers.TunedArgon2PasswordHasher",
+        "core.hashers.TunedScryptPasswordHasher",
+    )
+    if hasher != _PASSWORD_HASHER_FIRST[PASSWORD_HASHER_PROFILE]
+]
+# Cost parameters (OWASP's recommended minimums).
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_ARGON2_TIME_COST", "2"))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get("PASSWORD_ARGON2_MEMORY_COST", str(19 * 1024)))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get("PASSWORD_ARGON2_PARALLELISM", "1"))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get("PASSWORD_SCRYPT_WORK_FACTOR", str(2**16)))
+PASSWORD_SCRYPT_BLOCK_SIZE = int(os.environ.get("PASSWORD_SCRYPT_BLOCK_SIZE", "8"))
+PASSWORD_SCRYPT_PARALLELISM = int(os.environ.get("PASSWORD_SCRYPT_PARALLELISM", "2"))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -89,7 +155,138 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Static pipeline (core/staticfiles.py): collectstatic writes hashed names,
+# .gz/.br copies and lossless WebP/resized image variants; WhiteNoise serves
+# them with a one-year immutable Cache-Control.
+#
+# The hashed names come from the manifest collectstatic writes, so
+# `manage.py collectstatic --noinput` is a deploy step: without it every
+# page fails to render. DEBUG and the test runner use plain storage
+# instead, which needs no collectstatic; STATIC_MANIFEST=True/False
+# overrides the choice.
+TESTING = sys.argv[1:2] == ["test"]
+STATIC_MANIFEST = os.environ.get("STATIC_MANIFEST", str(not (DEBUG or TESTING))) == "True"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "core.staticfiles.OptimizedStaticFilesStorage"
+            if STATIC_MANIFEST
+            else "django.contrib.staticfiles.storage.StaticFilesStorage"
+        )
+    },
+}
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_IMAGE_WIDTHS = [96, 192, 384, 768]
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Per-path policies for core.middleware.security.SecurityHeadersMiddleware,
+# by path prefix (the longest match wins). CSP directives merge over the
+# site-wide CSP_* ones; "headers" replace whole headers.
+SECURITY_HEADERS_PATH_OVERRIDES = {
+    # Chat carries private messages: no plugins, no <base> rewrites, posts
+    # only back to this site, never framed.
+    "/chat/": {
+        "csp": {
+            "object-src": ("'none'",),
+            "base-uri": ("'none'",),
+            "form-action": ("'self'",),
+            "frame-ancestors": ("'none'",),
+        },
+    },
+    # The Django admin's templates use inline style attributes.
+    "/admin/": {
+        "csp": {"style-src": ("'self'", "'unsafe-inline'")},
+    },
+}
+
+# RolesBackend loads the session's user with its profiles' ids annotated
+# (core.roles). ModelBackend stays listed so sessions it logged in keep
+# working; core.roles.for_request loads their roles on demand.
+AUTHENTICATION_BACKENDS = [
+    "core.roles.RolesBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 LOGIN_REDIRECT_URL = 'my_questions'
 LOGOUT_REDIRECT_URL = 'home'
+
+# Live chat (served by the ASGI profile, core/chat_hub.py): how often each
+# process checks the rooms clients are waiting on for new messages (one
+# query for all of them), and how long a single SSE response stays open
+# before the browser reconnects. The sync stack serves no streams.
+CHAT_POLL_INTERVAL = 0.25
+CHAT_STREAM_SECONDS = 55
+CHAT_LONGPOLL_TIMEOUT = 25
+# Messages rendered with the chat page; older ones are lazy-loaded.
+CHAT_WINDOW_SIZE = 50
+
+# Free public questions a customer gets each month (core/quota.py;
+# `manage.py question_quota reset` from cron on the 1st).
+FREE_PUBLIC_QUESTIONS_PER_MONTH = int(os.environ.get("FREE_PUBLIC_QUESTIONS_PER_MONTH", "2"))
+
+# Request instrumentation (core.middleware.instrumentation) is opt-in: add
+# its middleware to MIDDLEWARE to collect per-route timings, readable by
+# staff at /ops/instrumentation/. A non-zero rate also cProfiles that
+# fraction of requests.
+INSTRUMENTATION_PROFILE_RATE = float(os.environ.get("INSTRUMENTATION_PROFILE_RATE", "0"))
+
+# Background tasks (core/taskqueue.py, core/tasks.py): enqueued into the
+# database by views and signals, run by `manage.py run_tasks`.
+TASK_WORKER_THREADS = int(os.environ.get("TASK_WORKER_THREADS", "4"))
+TASK_BATCH_SIZE = int(os.environ.get("TASK_BATCH_SIZE", "50"))
+TASK_LEASE_SECONDS = 300
+TASK_MAX_BACKOFF_SECONDS = 3600
+TASK_KEEP_DONE_SECONDS = 24 * 60 * 60
+# A chat recipient is emailed if a message is still unread this long after.
+CHAT_UNREAD_EMAIL_DELAY = int(os.environ.get("CHAT_UNREAD_EMAIL_DELAY", "600"))
+
+# Outgoing email (sent from background tasks only).
+SITE_URL = os.environ.get("SITE_URL", "https://guardianangelconsulting.ca")
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "no-reply@guardianangelconsulting.ca")
+SERVER_EMAIL = DEFAULT_FROM_EMAIL
+EMAIL_SUBJECT_PREFIX = "[Guardian Angel] "
+# Comma-separated; they get the "new lawyer registered" emails.
+ADMINS = [(email, email) for email in os.environ.get("DJANGO_ADMINS", "").split(",") if email]
+
+# SMTP by default. Setting EMAIL_FILE_PATH writes every message to files in
+# that directory instead, for local testing.
+EMAIL_FILE_PATH = os.environ.get("EMAIL_FILE_PATH")
+if EMAIL_FILE_PATH:
+    EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+else:
+    EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", "587"))
+EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "True") == "True"
+EMAIL_TIMEOUT = 30
+# Bulk sends (core/mailer.py): connections opened in parallel, and
+# messages sent over one connection per chunk.
+EMAIL_POOL_SIZE = int(os.environ.get("EMAIL_POOL_SIZE", "4"))
+EMAIL_POOL_CHUNK_SIZE = 100
+
+# Lawyer digests of new public questions (core/digests.py): at most one pass
+# per interval, and questions listed per email.
+DIGEST_INTERVAL_SECONDS = int(os.environ.get("DIGEST_INTERVAL_SECONDS", "3600"))
+DIGEST_QUESTIONS_PER_EMAIL = 20
+DIGEST_MAX_QUESTIONS_PER_RUN = 5000
+# How long a sending pass holds its run; an unfinished run past its lease
+# is resumed by the next pass.
+DIGEST_LEASE_SECONDS = 600
+# Extra words, per speciality key, that route a question to that speciality.
+# The words of the speciality's own name always count.
+DIGEST_SPECIALITY_KEYWORDS = {
+    "family law": ["divorce", "custody", "separation", "child", "spouse", "marriage", "support"],
+    "immigration": ["visa", "permit", "citizenship", "refugee", "sponsorship", "deportation"],
+    "employment": ["employer", "employee", "dismissal", "severance", "wage", "workplace"],
+    "real estate": ["landlord", "tenant", "lease", "eviction", "mortgage", "deposit", "property"],
+    "criminal defence": ["charge", "arrest", "police", "bail"],
+    "wills and estates": ["probate", "inheritance", "executor", "trust"],
+    "tax": ["audit", "cra", "gst", "hst"],
+    "corporate": ["company", "shareholder", "incorporation", "partnership"],
+    "intellectual property": ["trademark", "copyright", "patent"],
+    "personal injury": ["accident", "insurance", "claim", "damages"],
+}
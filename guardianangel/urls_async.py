@@ -0,0 +1,24 @@
+"""
+URLconf for the ASGI profile (guardianangel/asgi.py): guardianangel.urls
+with the read-only pages and the live chat endpoints served by
+core.async_views. Patterns are matched in order, so these win over the
+sync routes for the same paths.
+"""
+from django.urls import path
+
+from core import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path("public-questions/", async_views.public_questions, name="public_questions"),
+    path("lawyers/", async_views.lawyers_list, name="lawyers_list"),
+    path(
+        "chat/<int:chat_id>/messages/",
+        async_views.chat_messages,
+        name="chat_messages",
+    ),
+    path("chat/<int:chat_id>/stream/", async_views.chat_stream, name="chat_stream"),
+    path("chat/<int:chat_id>/poll/", async_views.chat_poll, name="chat_poll"),
+    *sync_urlpatterns,
+]
@@ -0,0 +1,45 @@
+"""
+Gunicorn settings, picked up automatically from the working directory.
+
+    gunicorn                      # sync stack: WSGI, one request per worker
+    SERVER_STACK=async gunicorn   # ASGI on uvicorn workers (guardianangel/asgi.py)
+
+The sync stack runs guardianangel.wsgi with sync workers, sized for CPU
+since each worker handles one request at a time. It serves no live chat
+streams or long-polls, which would hold a worker each: the browser polls
+for new messages instead. The async stack runs guardianangel.asgi (which
+serves core.async_views for the read-only pages and live chat) on
+uvicorn's event loop; a worker keeps serving other requests while one
+waits on the database, a long poll or a chat stream, so fewer workers
+are needed. `manage.py bench_stacks` compares the two.
+"""
+import multiprocessing
+import os
+
+stack = os.environ.get("SERVER_STACK", "sync")
+cpus = multiprocessing.cpu_count()
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+if stack == "async":
+    wsgi_app = "guardianangel.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+    workers = int(os.environ.get("WEB_CONCURRENCY", cpus + 1))
+else:
+    wsgi_app = "guardianangel.wsgi:application"
+    worker_class = "sync"
+    workers = int(os.environ.get("WEB_CONCURRENCY", 2 * cpus + 1))
+
+# Pending connections the kernel queues while every worker is busy.
+backlog = int(os.environ.get("GUNICORN_BACKLOG", "2048"))
+# Above CHAT_STREAM_SECONDS, so chat streams (async stack) end on their own
+# first.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "75"))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then to bound slow memory growth.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = 200
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"